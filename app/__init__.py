@@ -81,6 +81,18 @@ def create_app(config_class=Config):
     app.register_blueprint(errors)
     app.register_blueprint(api)
 
+    # Keep the budget rollups in sync with Expense/Paycheck writes
+    from app.utils import budget_rollup
+
+    # Record deletions and change versions of synced rows for /api/changes
+    from app.utils import change_tracking
+
+    # Full-text index over expense descriptions and categories
+    from app.utils import expense_search
+
+    # Drop cached category stats and names when they are written
+    from app.utils import category_cache
+
     # Register CLI commands
     from app.cli import register_commands
 
@@ -92,7 +104,7 @@ def create_app(config_class=Config):
         AuthorizationError,
         handle_validation_error,
     )
-    from flask import request, jsonify
+    from flask import request, jsonify, render_template
 
     @app.errorhandler(ValidationError)
     def handle_validation_exception(error):
@@ -1,8 +1,10 @@
 # app/admin.py
-from flask import Blueprint, render_template, flash, redirect, url_for, request
+from flask import Blueprint, render_template, flash, redirect, url_for, request, jsonify
 from flask_login import login_required, current_user
 from app import db
 from app.models import User, Role
+from app.utils.category_cache import names_cache, stats_cache
+from app.utils.recurrence import rule_cache
 from flask_wtf import FlaskForm
 from wtforms import StringField, SelectField, BooleanField, SubmitField, PasswordField
 from wtforms.validators import DataRequired, Email, ValidationError
@@ -122,6 +124,34 @@ def edit_user(id):
     return render_template("admin/user_form.html", form=form, title="Edit User")
 
 
+@admin.route("/admin/recurrence-cache")
+@login_required
+def recurrence_cache_stats():
+    """Report the recurrence rule cache counters for monitoring"""
+    if not current_user.can_manage_users():
+        logger.warning(
+            f"Unauthorized access attempt to cache stats by {current_user.username}"
+        )
+        return jsonify({"error": "Forbidden"}), 403
+
+    return jsonify(rule_cache.stats())
+
+
+@admin.route("/admin/category-cache")
+@login_required
+def category_cache_stats():
+    """Report the category stats and names cache counters for monitoring"""
+    if not current_user.can_manage_users():
+        logger.warning(
+            f"Unauthorized access attempt to cache stats by {current_user.username}"
+        )
+        return jsonify({"error": "Forbidden"}), 403
+
+    return jsonify(
+        {"category_stats": stats_cache.stats(), "category_names": names_cache.stats()}
+    )
+
+
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required
 from urllib.parse import urlparse
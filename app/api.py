@@ -1,12 +1,62 @@
 # app/api.py
-from flask import Blueprint, request, jsonify, render_template, redirect, url_for, flash
+from flask import (
+    Blueprint,
+    Response,
+    flash,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    stream_with_context,
+    url_for,
+)
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
 from wtforms import StringField, FloatField, DateField, SelectField, SubmitField
 from wtforms.validators import DataRequired, NumberRange
-from datetime import datetime
+import base64
+import json
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from sqlalchemy import tuple_
 from app import db
-from app.models import Paycheck, Expense, User
+from app.errors import ResourceNotFoundError, ValidationError
+from app.models import Paycheck, Expense, ExpenseCategory, User
+from app.utils.account_export import EXPORT_FORMATS, EXPORT_TABLES, export_account
+from app.utils.budget_engine import income_type_for
+from app.utils.bulk_ingest import (
+    BulkIngest,
+    expense_values,
+    income_values,
+    link_categories,
+    withhold_taxes,
+)
+from app.utils.change_tracking import (
+    SYNCED_MODELS,
+    changed_since,
+    decode_change_token,
+    deleted_since,
+    encode_change_token,
+    sync_position,
+)
+from app.utils.expense_search import (
+    fts_query,
+    matching_expense_ids,
+    search_occurrences,
+    search_statement,
+)
+from app.utils.read_model import (
+    CATEGORY_NAME,
+    compile_serializer,
+    expense_statement,
+    iso_date,
+    to_float,
+)
+from app.utils.expense_series import (
+    expand_occurrences,
+    series_storage_enabled,
+    set_occurrence_override,
+)
 
 api = Blueprint("api", __name__)
 
@@ -20,51 +70,9 @@ def add_income():
         return jsonify({"error": "No data provided"}), 400
 
     try:
-        # Parse the date
-        date = datetime.strptime(data.get("date"), "%Y-%m-%d").date()
-
-        # Determine pay type based on income_type
-        income_type = data.get("income_type")
-        description = data.get("description", "")
-
-        if income_type == "salary":
-            pay_type = "Regular"
-        elif income_type == "phoneStipend":
-            pay_type = "Phone Stipend"
-        elif income_type == "otherIncome":
-            pay_type = "Other Income"
-        elif income_type == "taxReturn":
-            pay_type = "Tax Return"
-        elif income_type == "transfer":
-            pay_type = "Transfer"
-        else:
-            pay_type = income_type.capitalize()
-
-        # Get amount
-        amount = float(data.get("amount", 0))
-
-        # Simple tax calculation - assume 75% is taxable for regular income, 0% for other types
-        if income_type == "salary":
-            taxable = amount * 0.75
-            non_taxable = amount * 0.25
-            net_amount = amount * 0.85  # Simplified calculation assuming 15% tax
-        else:
-            # For non-salary income, assume no tax
-            taxable = 0
-            non_taxable = amount
-            net_amount = amount
-
         # Create new paycheck
-        paycheck = Paycheck(
-            date=date,
-            pay_type=pay_type,
-            gross_amount=amount,
-            taxable_amount=taxable,
-            non_taxable_amount=non_taxable,
-            net_amount=net_amount,
-            phone_stipend=(income_type == "phoneStipend"),
-            user_id=current_user.id,
-        )
+        values = withhold_taxes([income_values(data, current_user.id)])[0]
+        paycheck = Paycheck(**values)
 
         db.session.add(paycheck)
         db.session.commit()
@@ -100,19 +108,10 @@ def add_expense():
         return jsonify({"error": "No data provided"}), 400
 
     try:
-        # Parse the date
-        date = datetime.strptime(data.get("date"), "%Y-%m-%d").date()
-
         # Create new expense
-        expense = Expense(
-            date=date,
-            category=data.get("category"),
-            description=data.get("description", ""),
-            amount=float(data.get("amount", 0)),
-            recurring=data.get("recurring", False),
-            frequency=data.get("frequency") if data.get("recurring", False) else None,
-            user_id=current_user.id,
-        )
+        values = expense_values(data, current_user.id)
+        link_categories(current_user.id, [values])
+        expense = Expense(**values)
 
         db.session.add(expense)
         db.session.commit()
@@ -124,54 +123,470 @@ def add_expense():
         return jsonify({"error": str(e)}), 500
 
 
+@api.route("/api/bulk", methods=["POST"])
+@login_required
+def bulk_ingest():
+    """Insert many expense and income records from an NDJSON body
+
+    Each line is a JSON object with "type" set to "expense" or "income" and
+    the same fields /api/expense and /api/income accept. The body is read
+    as a stream and written in batches of batch_size records (default 500),
+    each in its own transaction. Invalid lines are reported by line number
+    and skipped without affecting the rest.
+    """
+    batch_size = request.args.get("batch_size", 500, type=int)
+    if not batch_size or batch_size < 1:
+        raise ValidationError(
+            "batch_size must be a positive integer", field="batch_size"
+        )
+
+    ingest = BulkIngest(current_user.id, batch_size=min(batch_size, 5000))
+    try:
+        report = ingest.run(request.stream)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify(dict(ingest.summary(), error=str(e))), 500
+
+    return jsonify(dict(report, success=report["error_count"] == 0))
+
+
+# Fields clients can request from /api/budget_data, per record type
+INCOME_FIELDS = {
+    "id": Paycheck.id,
+    "date": Paycheck.date,
+    "income_type": Paycheck.pay_type,
+    "amount": Paycheck.gross_amount,
+    "net_amount": Paycheck.net_amount,
+}
+EXPENSE_FIELDS = {
+    "id": Expense.id,
+    "date": Expense.date,
+    "category": CATEGORY_NAME,
+    "category_id": Expense.category_id,
+    "description": Expense.description,
+    "amount": Expense.amount,
+    "recurring": Expense.recurring,
+    "frequency": Expense.frequency,
+    "parent_expense_id": Expense.parent_expense_id,
+    "paid": Expense.paid,
+}
+BUDGET_DATA_TYPES = {
+    "income": (Paycheck, INCOME_FIELDS),
+    "expenses": (Expense, EXPENSE_FIELDS),
+}
+BUDGET_DATA_DEFAULT_LIMIT = 500
+BUDGET_DATA_MAX_LIMIT = 5000
+
+
+# How each /api/budget_data field is converted for JSON
+BUDGET_FIELD_CONVERTERS = {
+    "date": iso_date,
+    "amount": to_float,
+    "net_amount": to_float,
+    "income_type": income_type_for,
+}
+
+
+@lru_cache(maxsize=256)
+def _budget_serializer(fields):
+    """Compile a row serializer for a tuple of requested fields"""
+    return compile_serializer(
+        (field, field, BUDGET_FIELD_CONVERTERS.get(field)) for field in fields
+    )
+
+
+def _encode_cursor(positions):
+    """Encode per-type keyset positions as an opaque URL-safe token"""
+    return base64.urlsafe_b64encode(json.dumps(positions).encode()).decode()
+
+
+def _decode_cursor(token):
+    try:
+        positions = json.loads(base64.urlsafe_b64decode(token.encode()))
+        for key, position in positions.items():
+            if position != "done":
+                positions[key] = (
+                    datetime.strptime(position[0], "%Y-%m-%d").date(),
+                    int(position[1]),
+                )
+        return positions
+    except (ValueError, TypeError, AttributeError, IndexError):
+        raise ValidationError("Invalid cursor", field="cursor")
+
+
+def _parse_budget_date(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValidationError(f"Invalid {name}, expected YYYY-MM-DD", field=name)
+
+
+def _budget_data_page(model, fields, start_date, end_date, after, limit, search_text=None):
+    """Fetch one keyset page of a user's records, selecting only some columns
+
+    search_text narrows expenses to full-text matches; a limit of None
+    fetches every remaining record.
+
+    Returns:
+        tuple: (records, (date, id) of the last record or None if no more)
+    """
+    columns = BUDGET_DATA_TYPES["income" if model is Paycheck else "expenses"][1]
+    query = db.session.query(*[columns[field].label(field) for field in fields]).filter(
+        model.user_id == current_user.id
+    )
+    if start_date:
+        query = query.filter(model.date >= start_date)
+    if end_date:
+        query = query.filter(model.date <= end_date)
+    if search_text and model is Expense:
+        query = query.filter(Expense.id.in_(matching_expense_ids(search_text)))
+    if after:
+        query = query.filter(tuple_(model.date, model.id) > tuple_(*after))
+
+    query = query.order_by(model.date, model.id)
+    if limit is None:
+        rows = query.all()
+        has_more = False
+    else:
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+    serialize = _budget_serializer(tuple(fields))
+    records = [serialize(row) for row in rows]
+    last = (rows[-1].date, rows[-1].id) if has_more else None
+    return records, last
+
+
 @api.route("/api/budget_data", methods=["GET"])
 @login_required
 def get_budget_data():
-    """Get all budget data for the current user"""
+    """Page through the current user's income and expense records
+
+    Query parameters:
+        type: income, expenses or all (default)
+        start_date, end_date: Optional YYYY-MM-DD bounds on the record date
+        fields: Comma-separated fields to return; id and date are always
+            included since pages are ordered and resumed by (date, id)
+        limit: Records per type per page (at most 5000)
+        cursor: The next_cursor of the previous page
+        q: Only expenses whose description or category match these words
+
+    Paging is opt in: without limit or cursor every matching record is
+    returned, as before pagination existed, and next_cursor is null. A
+    cursor without limit continues with pages of 500.
+
+    Recurring series stored as rules have no rows to page through; their
+    occurrences within the date range (up to a year ahead by default) are
+    returned under "occurrences" on the first page.
+    """
+    record_type = request.args.get("type", "all")
+    if record_type == "all":
+        types = list(BUDGET_DATA_TYPES)
+    elif record_type in BUDGET_DATA_TYPES:
+        types = [record_type]
+    else:
+        raise ValidationError("type must be income, expenses or all", field="type")
+
+    start_date = _parse_budget_date("start_date")
+    end_date = _parse_budget_date("end_date")
+
+    cursor = request.args.get("cursor")
+    limit = None
+    if "limit" in request.args or cursor:
+        limit = request.args.get("limit", BUDGET_DATA_DEFAULT_LIMIT, type=int)
+        if not limit or limit < 1:
+            raise ValidationError("limit must be a positive integer", field="limit")
+        limit = min(limit, BUDGET_DATA_MAX_LIMIT)
+
+    requested = None
+    if request.args.get("fields"):
+        requested = [f.strip() for f in request.args["fields"].split(",") if f.strip()]
+        known = set().union(*(BUDGET_DATA_TYPES[t][1] for t in types))
+        unknown = [field for field in requested if field not in known]
+        if unknown:
+            raise ValidationError(
+                f"Unknown fields: {', '.join(unknown)}", field="fields"
+            )
+
+    positions = _decode_cursor(cursor) if cursor else {}
+
+    search_text = request.args.get("q", "").strip()
+    if not fts_query(search_text):
+        search_text = None
+
     try:
-        # Get income data
-        paychecks = Paycheck.query.filter_by(user_id=current_user.id).all()
-        income_data = []
-
-        for paycheck in paychecks:
-            income_type = "salary"
-            if paycheck.pay_type == "Phone Stipend":
-                income_type = "phoneStipend"
-            elif paycheck.pay_type == "Other Income":
-                income_type = "otherIncome"
-
-            income_data.append(
-                {
-                    "id": paycheck.id,
-                    "date": paycheck.date.strftime("%Y-%m-%d"),
-                    "income_type": income_type,
-                    "amount": float(paycheck.gross_amount),
-                    "net_amount": float(paycheck.net_amount),
-                }
+        response = {}
+        next_positions = {}
+
+        for name in types:
+            model, columns = BUDGET_DATA_TYPES[name]
+            if positions.get(name) == "done":
+                response[name] = []
+                next_positions[name] = "done"
+                continue
+
+            fields = ["id", "date"] + [
+                field
+                for field in (requested or columns)
+                if field in columns and field not in ("id", "date")
+            ]
+            records, last = _budget_data_page(
+                model,
+                fields,
+                start_date,
+                end_date,
+                positions.get(name),
+                limit,
+                search_text,
+            )
+            response[name] = records
+            next_positions[name] = (
+                [last[0].strftime("%Y-%m-%d"), last[1]] if last else "done"
             )
 
-        # Get expense data
-        expenses = Expense.query.filter_by(user_id=current_user.id).all()
-        expense_data = []
+        # Recurring series stored as rules contribute their expanded occurrences
+        if "expenses" in types and not cursor and series_storage_enabled():
+            # Occurrences are not stored, so they have a date but no id
+            fields = ["date"] + [
+                field
+                for field in (requested or EXPENSE_FIELDS)
+                if field in EXPENSE_FIELDS and field not in ("id", "date")
+            ]
+            occurrences = expand_occurrences(
+                current_user.id,
+                start_date or date.min,
+                end_date or date.today() + timedelta(days=365),
+            )
+            if search_text:
+                occurrences = search_occurrences(occurrences, search_text)
+            serialize = _budget_serializer(tuple(fields))
+            response["occurrences"] = [serialize(occurrence) for occurrence in occurrences]
 
-        for expense in expenses:
-            expense_data.append(
-                {
-                    "id": expense.id,
-                    "date": expense.date.strftime("%Y-%m-%d"),
-                    "category": expense.category,
-                    "description": expense.description,
-                    "amount": float(expense.amount),
-                    "recurring": expense.recurring,
-                    "frequency": expense.frequency,
-                }
+        more = any(position != "done" for position in next_positions.values())
+        response["next_cursor"] = _encode_cursor(next_positions) if more else None
+        return jsonify(response)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+SEARCH_DEFAULT_LIMIT = 50
+SEARCH_MAX_LIMIT = 500
+
+_serialize_search_result = compile_serializer(
+    (
+        ("id", "id", None),
+        ("date", "date", iso_date),
+        ("description", "description", None),
+        ("category", "category", None),
+        ("amount", "amount", to_float),
+        ("paid", "paid", None),
+        ("parent_expense_id", "parent_expense_id", None),
+        ("rank", "rank", None),
+    )
+)
+
+
+@api.route("/api/expenses/search", methods=["GET"])
+@login_required
+def search_expenses():
+    """Full-text search over the current user's expenses, best match first
+
+    Query parameters:
+        q: Words to look for in descriptions and categories; each word
+            also matches as a prefix ("groc" finds "Groceries")
+        limit: Maximum results (default 50, at most 500)
+
+    Results carry their bm25 "rank"; lower is a better match.
+    """
+    search_text = request.args.get("q", "").strip()
+    if not fts_query(search_text):
+        raise ValidationError("q must contain at least one word", field="q")
+
+    limit = request.args.get("limit", SEARCH_DEFAULT_LIMIT, type=int)
+    if not limit or limit < 1:
+        raise ValidationError("limit must be a positive integer", field="limit")
+    limit = min(limit, SEARCH_MAX_LIMIT)
+
+    try:
+        rows = db.session.execute(
+            search_statement(
+                expense_statement(current_user.id).add_columns(
+                    CATEGORY_NAME.label("category")
+                ),
+                search_text,
+            ).limit(limit)
+        )
+        return jsonify(
+            {
+                "query": search_text,
+                "results": [_serialize_search_result(row) for row in rows],
+            }
+        )
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+CATEGORY_FIELDS = {
+    "id": ExpenseCategory.id,
+    "name": ExpenseCategory.name,
+    "description": ExpenseCategory.description,
+    "color": ExpenseCategory.color,
+}
+CHANGES_FIELDS = {
+    "income": INCOME_FIELDS,
+    "expenses": EXPENSE_FIELDS,
+    "categories": CATEGORY_FIELDS,
+}
+
+
+@api.route("/api/changes", methods=["GET"])
+@login_required
+def get_changes():
+    """Return the current user's rows changed since a change token
+
+    Query parameters:
+        since: next_token of the previous call; without it every row is
+            returned, as for an initial sync
+
+    The response holds the created or updated rows of each table, the ids
+    of rows deleted since the token under "deleted", and the next_token to
+    pass on the next call. Apply deletions before upserting the rows. A row
+    can be sent again by a later call without having changed, so clients
+    should upsert by id. Recurring series stored as rules are sent as their
+    parent rows.
+    """
+    since = request.args.get("since")
+    since_version, tombstone_id = 0, 0
+    if since:
+        try:
+            since_version, tombstone_id = decode_change_token(since)
+        except ValueError as e:
+            raise ValidationError(str(e), field="since")
+
+    try:
+        connection = db.session.connection()
+        next_version, next_tombstone_id = sync_position(
+            connection, current_user.id
+        )
+
+        response = {}
+        for name, model in SYNCED_MODELS.items():
+            fields = list(CHANGES_FIELDS[name])
+            query = db.session.query(
+                *[CHANGES_FIELDS[name][field].label(field) for field in fields]
+            ).filter(model.user_id == current_user.id)
+            if since:
+                query = query.filter(changed_since(model, since_version))
+
+            serialize = _budget_serializer(tuple(fields))
+            response[name] = [serialize(row) for row in query.order_by(model.id)]
+
+        response["deleted"] = (
+            deleted_since(connection, current_user.id, tombstone_id, next_tombstone_id)
+            if since
+            else {name: [] for name in SYNCED_MODELS}
+        )
+        response["next_token"] = encode_change_token(next_version, next_tombstone_id)
+        return jsonify(response)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+EXPORT_MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+@api.route("/api/export", methods=["GET"])
+@login_required
+def export_data():
+    """Stream all of the current user's data as NDJSON or CSV
+
+    Query parameters:
+        format: ndjson (default) or csv
+        tables: Comma-separated subset of paycheck, expense, category and
+            salary_projection (default all)
+
+    Rows are read from the database and written out as the response is
+    sent, so memory use does not grow with the size of the account.
+    """
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        raise ValidationError("format must be ndjson or csv", field="format")
+
+    tables = None
+    if request.args.get("tables"):
+        tables = [t.strip() for t in request.args["tables"].split(",") if t.strip()]
+        unknown = [table for table in tables if table not in EXPORT_TABLES]
+        if unknown:
+            raise ValidationError(
+                f"Unknown tables: {', '.join(unknown)}", field="tables"
             )
 
-        return jsonify({"income": income_data, "expenses": expense_data})
+    chunks = export_account(current_user.id, export_format, tables)
+    filename = f"budget-export-{date.today().isoformat()}.{export_format}"
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_MIMETYPES[export_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+@api.route("/api/expense/<int:id>/occurrences/<occurrence_date>", methods=["POST"])
+@login_required
+def update_occurrence(id, occurrence_date):
+    """Record paid, amount or skipped changes for one occurrence of a series"""
+    expense = Expense.query.filter_by(
+        id=id, user_id=current_user.id, recurring=True
+    ).first()
+    if not expense:
+        raise ResourceNotFoundError("Expense", id)
+
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+
+    try:
+        occurrence_date = datetime.strptime(occurrence_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValidationError("Invalid occurrence date", field="occurrence_date")
+
+    changes = {}
+    if "paid" in data:
+        changes["paid"] = bool(data["paid"])
+    if "skipped" in data:
+        changes["skipped"] = bool(data["skipped"])
+    if "amount" in data:
+        changes["amount"] = None if data["amount"] is None else float(data["amount"])
 
+    try:
+        override = set_occurrence_override(expense, occurrence_date, **changes)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        raise ValidationError(str(e), field="occurrence_date")
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+    return jsonify(
+        {
+            "success": True,
+            "occurrence": {
+                "parent_expense_id": expense.id,
+                "date": override.date.strftime("%Y-%m-%d"),
+                "paid": override.paid,
+                "amount": override.amount,
+                "skipped": override.skipped,
+            },
+        }
+    )
+
 
 @api.route("/api/income/add", methods=["GET", "POST"])
 @login_required
@@ -198,48 +613,18 @@ def add_one_time_income():
     form = IncomeForm()
 
     if form.validate_on_submit():
-        # Process form data
-        income_type = form.income_type.data
-
-        # Determine pay type based on income_type
-        if income_type == "salary":
-            pay_type = "Regular"
-        elif income_type == "phoneStipend":
-            pay_type = "Phone Stipend"
-        elif income_type == "otherIncome":
-            pay_type = "Other Income"
-        elif income_type == "taxReturn":
-            pay_type = "Tax Return"
-        elif income_type == "transfer":
-            pay_type = "Transfer"
-        else:
-            pay_type = income_type.capitalize()
-
-        # Get amount
-        amount = form.amount.data
-
-        # Simple tax calculation - assume 75% is taxable for regular income, 0% for other types
-        if income_type == "salary":
-            taxable = amount * 0.75
-            non_taxable = amount * 0.25
-            net_amount = amount * 0.85  # Simplified calculation assuming 15% tax
-        else:
-            # For non-salary income, assume no tax
-            taxable = 0
-            non_taxable = amount
-            net_amount = amount
-
-        # Create new paycheck
-        paycheck = Paycheck(
-            date=form.date.data,
-            pay_type=pay_type,
-            gross_amount=amount,
-            taxable_amount=taxable,
-            non_taxable_amount=non_taxable,
-            net_amount=net_amount,
-            phone_stipend=(income_type == "phoneStipend"),
-            user_id=current_user.id,
+        # Same row building as POST /api/income, including tax withholding
+        values = income_values(
+            {
+                "date": form.date.data,
+                "income_type": form.income_type.data,
+                "amount": form.amount.data,
+            },
+            current_user.id,
         )
+        paycheck = Paycheck(**withhold_taxes([values])[0])
+        pay_type = paycheck.pay_type
+        amount = form.amount.data
 
         db.session.add(paycheck)
         try:
@@ -1,7 +1,34 @@
+import json
+import os
+from datetime import date, timedelta
+
 import click
+from flask import current_app
 from flask.cli import with_appcontext
 from app import db
 from app.models import User, Role
+from app.utils.account_export import EXPORT_FORMATS, EXPORT_TABLES, export_account
+from app.utils.batch_runner import BATCH_TASKS, run_batch
+from app.utils.budget_rollup import rebuild_rollups
+from app.utils.expense_search import (
+    REBUILD_BATCH_SIZE,
+    create_search_index,
+    rebuild_search_index,
+)
+from app.utils.expense_materializer import (
+    extend_materialization,
+    series_behind_horizon,
+)
+from app.utils.expense_series import series_storage_enabled
+from app.utils.paycheck_generator import parse_pay_frequency
+from app.utils.statement_import import (
+    STATEMENT_FORMATS,
+    CategoryRules,
+    StatementImporter,
+    describe_import,
+    detect_format,
+    parse_statement,
+)
 
 
 def register_commands(app):
@@ -30,3 +57,249 @@ def register_commands(app):
         db.session.add(user)
         db.session.commit()
         click.echo(f"Created {'admin ' if admin else ''}user {username}")
+
+    @app.cli.command("rebuild-rollups")
+    @click.option("--user-id", type=int, help="Only rebuild this user's rollups")
+    @with_appcontext
+    def rebuild_budget_rollups(user_id):
+        """Recompute the per-day budget rollups from scratch."""
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            user_ids = [row.id for row in db.session.query(User.id).all()]
+
+        try:
+            written = rebuild_rollups(db.session.connection(), user_ids)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"Error rebuilding rollups: {str(e)}")
+            return
+
+        click.echo(f"Rebuilt {written} rollup rows for {len(user_ids)} users")
+
+    @app.cli.command("rebuild-search-index")
+    @click.option(
+        "--batch-size",
+        default=REBUILD_BATCH_SIZE,
+        show_default=True,
+        help="Expenses indexed per statement",
+    )
+    @with_appcontext
+    def rebuild_expense_search_index(batch_size):
+        """Reindex every expense for full-text search."""
+        connection = db.session.connection()
+        try:
+            create_search_index(connection)
+            indexed = rebuild_search_index(
+                connection,
+                batch_size=max(1, batch_size),
+                report=lambda count: click.echo(f"Indexed {count} expenses..."),
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"Error rebuilding search index: {str(e)}")
+            return
+
+        click.echo(f"Rebuilt the search index over {indexed} expenses")
+
+    @app.cli.command("materialize-horizon")
+    @click.option(
+        "--days",
+        default=365,
+        show_default=True,
+        help="Materialize recurring expenses up to today + DAYS",
+    )
+    @click.option("--user-id", type=int, help="Only extend this user's series")
+    @with_appcontext
+    def materialize_horizon(days, user_id):
+        """Extend every recurring expense from its watermark to the horizon.
+
+        Safe to run repeatedly (e.g. nightly): each series resumes from its
+        materialized_through date and each user is committed separately.
+        """
+        if series_storage_enabled():
+            click.echo("Recurring expenses use series storage; nothing to materialize")
+            return
+
+        through = date.today() + timedelta(days=days)
+
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            user_ids = [row.id for row in db.session.query(User.id).all()]
+
+        total = 0
+        for current_id in user_ids:
+            series = series_behind_horizon(current_id, through)
+            if not series:
+                continue
+
+            try:
+                inserted = extend_materialization(series, through)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                click.echo(f"User {current_id}: error extending series: {str(e)}")
+                continue
+
+            total += inserted
+            click.echo(
+                f"User {current_id}: {inserted} new instances across {len(series)} series"
+            )
+
+        click.echo(f"Materialized {total} instances through {through.isoformat()}")
+
+    @app.cli.command("batch-run")
+    @click.argument("task", type=click.Choice(sorted(BATCH_TASKS)))
+    @click.option(
+        "--workers",
+        default=os.cpu_count() or 1,
+        show_default=True,
+        help="Worker processes (1 runs everything in this process)",
+    )
+    @click.option("--chunk-size", default=20, show_default=True, help="Users per chunk")
+    @click.option(
+        "--days",
+        default=365,
+        show_default=True,
+        help="Horizon in days from today for materialization or paychecks",
+    )
+    @click.option(
+        "--frequency",
+        help=(
+            "Pay frequency for the paychecks task (days or a schedule name), "
+            "used only for users whose own frequency can't be worked out"
+        ),
+    )
+    @click.option(
+        "--state-file",
+        type=click.Path(dir_okay=False),
+        help="Record progress here; rerun with the same file to resume",
+    )
+    @click.option(
+        "--user-id", "user_ids", type=int, multiple=True, help="Only these users"
+    )
+    @with_appcontext
+    def batch_run(task, workers, chunk_size, days, frequency, state_file, user_ids):
+        """Run TASK (materialize or paychecks) for every user in parallel."""
+        if task == "materialize" and series_storage_enabled():
+            click.echo("Recurring expenses use series storage; nothing to materialize")
+            return
+
+        options = {"days": days}
+        if task == "paychecks" and frequency:
+            try:
+                options["frequency"] = parse_pay_frequency(frequency)
+            except ValueError as e:
+                click.echo(str(e))
+                return
+
+        if not user_ids:
+            user_ids = [row.id for row in db.session.query(User.id).order_by(User.id)]
+        # Workers open their own connections; don't hold this one meanwhile
+        db.session.remove()
+
+        try:
+            result = run_batch(
+                current_app._get_current_object(),
+                task,
+                list(user_ids),
+                options,
+                workers=max(1, workers),
+                chunk_size=max(1, chunk_size),
+                state_path=state_file,
+                report=click.echo,
+            )
+        except ValueError as e:
+            click.echo(str(e))
+            return
+
+        click.echo(
+            f"Processed {result['users']} users and wrote {result['rows']} rows "
+            f"in {result['elapsed']:.1f}s ({result['users_per_second']:.1f} users/s, "
+            f"{result['rows_per_second']:.1f} rows/s); {result['failed']} failed"
+        )
+
+    @app.cli.command("import-statement")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--user-id", type=int, required=True, help="User to import for")
+    @click.option(
+        "--format",
+        "statement_format",
+        type=click.Choice(("auto",) + STATEMENT_FORMATS),
+        default="auto",
+        show_default=True,
+        help="Statement format (auto detects from the file)",
+    )
+    @click.option(
+        "--rules",
+        type=click.Path(exists=True, dir_okay=False),
+        help='JSON file mapping description keywords to categories, e.g. {"uber": "Transport"}',
+    )
+    @click.option("--batch-size", default=5000, show_default=True, help="Rows per transaction")
+    @with_appcontext
+    def import_statement(path, user_id, statement_format, rules, batch_size):
+        """Import a CSV or OFX/QFX bank statement, skipping rows seen before."""
+        if db.session.get(User, user_id) is None:
+            click.echo(f"User {user_id} not found")
+            return
+
+        keywords = None
+        if rules:
+            with open(rules) as f:
+                keywords = json.load(f)
+
+        with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+            if statement_format == "auto":
+                statement_format = detect_format(path, f.read(1024))
+                f.seek(0)
+
+            importer = StatementImporter(
+                user_id,
+                rules=CategoryRules.for_user(user_id, keywords),
+                batch_size=max(1, batch_size),
+            )
+            try:
+                summary = importer.run(parse_statement(f, statement_format))
+            except ValueError as e:
+                importer.flush()
+                click.echo(f"Error reading statement: {str(e)}")
+                summary = importer.summary()
+
+        for error in summary["errors"]:
+            click.echo(f"Row {error['row']}: {error['error']}")
+        click.echo(describe_import(summary))
+
+    @app.cli.command("export-account")
+    @click.option("--user-id", type=int, required=True, help="User to export")
+    @click.option(
+        "--format",
+        "export_format",
+        type=click.Choice(EXPORT_FORMATS),
+        default="ndjson",
+        show_default=True,
+    )
+    @click.option(
+        "--table",
+        "tables",
+        type=click.Choice(sorted(EXPORT_TABLES)),
+        multiple=True,
+        help="Only export these tables (default all)",
+    )
+    @click.option(
+        "--output",
+        type=click.File("w", encoding="utf-8"),
+        default="-",
+        help="File to write to (default stdout)",
+    )
+    @with_appcontext
+    def export_account_command(user_id, export_format, tables, output):
+        """Stream a user's paychecks, expenses, categories and projections."""
+        if db.session.get(User, user_id) is None:
+            click.echo(f"User {user_id} not found", err=True)
+            return
+
+        for chunk in export_account(user_id, export_format, tables or None):
+            output.write(chunk)
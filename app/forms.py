@@ -1,4 +1,5 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileAllowed, FileField, FileRequired
 from wtforms import (
     StringField,
     FloatField,
@@ -147,6 +148,7 @@ class ExpenseFilterForm(FlaskForm):
     start_date = DateField("Start Date", validators=[Optional()])
     end_date = DateField("End Date", validators=[Optional()])
     category = SelectField("Category", validators=[Optional()], coerce=int)
+    q = StringField("Search", validators=[Optional(), Length(max=200)])
     paid_status = SelectField(
         "Payment Status",
         choices=[
@@ -177,3 +179,14 @@ class ExpenseFilterForm(FlaskForm):
         default="desc",
     )
     submit = SubmitField("Apply Filters")
+
+
+class StatementImportForm(FlaskForm):
+    statement = FileField(
+        "Bank Statement",
+        validators=[
+            FileRequired(),
+            FileAllowed(["csv", "ofx", "qfx"], "CSV, OFX or QFX files only"),
+        ],
+    )
+    submit = SubmitField("Import")
@@ -7,6 +7,8 @@ from sqlalchemy.orm import validates
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from app import db, login_manager
+from app.utils.money import Money
+from app.utils.tax import paycheck_tax
 
 
 class Role(db.Model):
@@ -76,16 +78,34 @@ class User(UserMixin, db.Model):
 
 
 class Paycheck(db.Model):
+    __table_args__ = (
+        db.Index(
+            "uq_paycheck_user_import_hash", "user_id", "import_hash", unique=True
+        ),
+        # Delta sync reads a user's rows changed since a change version, and
+        # commits stamp the rows still waiting for one
+        db.Index("ix_paycheck_user_sync_version", "user_id", "sync_version"),
+        db.Index(
+            "ix_paycheck_sync_pending",
+            "id",
+            sqlite_where=db.text("sync_version IS NULL"),
+        ),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False, index=True)
     pay_type = db.Column(db.String(20), nullable=False)  # Regular, Third
-    gross_amount = db.Column(db.Float, nullable=False)
-    taxable_amount = db.Column(db.Float, nullable=False)
-    non_taxable_amount = db.Column(db.Float, nullable=False)
-    net_amount = db.Column(db.Float, nullable=False)
+    # Amounts are stored as integer cents and read back as dollars
+    gross_amount = db.Column(Money, nullable=False)
+    taxable_amount = db.Column(Money, nullable=False)
+    non_taxable_amount = db.Column(Money, nullable=False)
+    net_amount = db.Column(Money, nullable=False)
     phone_stipend = db.Column(db.Boolean, default=False)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sync_version = db.Column(db.Integer)  # ChangeSequence value of the last commit to change it
+    import_hash = db.Column(db.String(64))  # Content hash of an imported statement row
 
     @validates("gross_amount", "taxable_amount", "non_taxable_amount", "net_amount")
     def validate_amounts(self, key, value):
@@ -95,27 +115,36 @@ class Paycheck(db.Model):
             raise ValueError(f"{key} cannot be negative")
         return value
 
-    def calculate_net(self):
-        """Calculate net amount after taxes and deductions."""
-        # Implementation of proper tax calculation logic
-        tax_brackets = [
-            (0, 11000, 0.10),
-            (11001, 44725, 0.12),
-            (44726, 95375, 0.22),
-            # Add more brackets as needed
-        ]
-        taxable_income = self.taxable_amount
-        tax = 0
-
-        for lower, upper, rate in tax_brackets:
-            if taxable_income > lower:
-                bracket_income = min(taxable_income - lower, upper - lower)
-                tax += bracket_income * rate
-
+    def calculate_net(self, periods_per_year=26):
+        """Calculate net amount after taxes, using the pay date's tax year."""
+        # Brackets are annual, so the taxable amount is annualized first
+        tax = paycheck_tax(self.taxable_amount, self.date.year, periods_per_year)
         return self.gross_amount - tax + self.non_taxable_amount
 
 
 class Expense(db.Model):
+    # One materialized instance per parent and date; lets bulk materialization
+    # use INSERT ... ON CONFLICT DO NOTHING instead of checking existing rows
+    __table_args__ = (
+        db.UniqueConstraint(
+            "parent_expense_id", "date", name="uq_expense_parent_date"
+        ),
+        # Statement imports skip rows whose content hash is already stored
+        db.Index(
+            "uq_expense_user_import_hash", "user_id", "import_hash", unique=True
+        ),
+        db.Index("ix_expense_user_sync_version", "user_id", "sync_version"),
+        db.Index(
+            "ix_expense_sync_pending",
+            "id",
+            sqlite_where=db.text("sync_version IS NULL"),
+        ),
+        # /expenses pages through a user's rows by (date, id) with a keyset
+        db.Index("ix_expense_user_date_id", "user_id", "date", "id"),
+        # Category stats and renames find a category's expenses by id
+        db.Index("ix_expense_user_category", "user_id", "category_id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False, index=True)
     due_date = db.Column(db.Date, nullable=True, index=True)
@@ -124,11 +153,11 @@ class Expense(db.Model):
     start_date = db.Column(db.Date, nullable=True, index=True)  # When the expense starts (for recurring)
     end_date = db.Column(db.Date, nullable=True, index=True)    # When the expense ends (for recurring)
     parent_expense_id = db.Column(db.Integer, db.ForeignKey("expense.id"), nullable=True)  # For materialized instances
+    materialized_through = db.Column(db.Date, nullable=True)  # Last date materialized for a recurring parent
 
-    category = db.Column(db.String(50), nullable=False)
-    category_id = db.Column(db.Integer, db.ForeignKey("expense_category.id"), nullable=True)
+    category_id = db.Column(db.Integer, db.ForeignKey("expense_category.id"), nullable=False)
     description = db.Column(db.String(200))
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(Money, nullable=False)  # Stored as integer cents
     paid = db.Column(db.Boolean, default=False)
     recurring = db.Column(db.Boolean, default=False)
     frequency = db.Column(db.String(20))
@@ -137,10 +166,24 @@ class Expense(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sync_version = db.Column(db.Integer)  # ChangeSequence value of the last commit to change it
+    import_hash = db.Column(db.String(64))  # Content hash of an imported statement row
 
     # Add relationship for materialized instances
     materialized_instances = db.relationship("Expense", backref=db.backref("parent_expense", remote_side=[id]))
 
+    @property
+    def category(self):
+        """Name of the expense's category, from the user's category map
+
+        Only category_id is stored, so renaming a category updates one row.
+        The map is loaded once per transaction, so renames and deletes made
+        by other processes show up on the next request.
+        """
+        from app.utils.category_cache import category_names
+
+        return category_names(self.user_id).get(self.category_id)
+
     # Add method to show days until due
     def days_until_due(self):
         if not self.due_date:
@@ -206,9 +249,40 @@ class Expense(db.Model):
         return 14
 
 
+class ExpenseOverride(db.Model):
+    """Per-occurrence changes to a recurring expense stored as a series.
+
+    Only occurrences the user has touched get a row, so the table grows
+    with edits rather than with horizon x frequency.
+    """
+
+    __table_args__ = (db.UniqueConstraint("parent_expense_id", "date"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    parent_expense_id = db.Column(
+        db.Integer, db.ForeignKey("expense.id"), nullable=False, index=True
+    )
+    date = db.Column(db.Date, nullable=False)  # The occurrence being overridden
+    skipped = db.Column(db.Boolean, default=False)
+    paid = db.Column(db.Boolean, nullable=True)  # None keeps the default (unpaid)
+    amount = db.Column(Money, nullable=True)  # None keeps the parent amount
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class ExpenseCategory(db.Model):
+    __table_args__ = (
+        db.Index("ix_expense_category_user_sync_version", "user_id", "sync_version"),
+        db.Index(
+            "ix_expense_category_sync_pending",
+            "id",
+            sqlite_where=db.text("sync_version IS NULL"),
+        ),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(50), nullable=False, unique=True)
+    name = db.Column(db.String(50), nullable=False)  # Unique per user, checked by the views
     description = db.Column(db.String(200))
     color = db.Column(db.String(7), default="#6B7280")  # Default gray color in hex
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -219,11 +293,78 @@ class ExpenseCategory(db.Model):
         foreign_keys="Expense.category_id",
     )
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sync_version = db.Column(db.Integer)  # ChangeSequence value of the last commit to change it
 
     def __repr__(self):
         return f"<ExpenseCategory {self.name}>"
 
 
+class BudgetRollup(db.Model):
+    """Per-day income and expense totals for a user.
+
+    Rows are derived data: app.utils.budget_rollup keeps them current on
+    every flush and bulk statement touching Paycheck or Expense, and
+    `flask rebuild-rollups` recreates them from scratch.
+    """
+
+    __table_args__ = (db.UniqueConstraint("user_id", "day"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    day = db.Column(db.Date, nullable=False, index=True)
+
+    # Net income by budget income type; every total here is in integer
+    # cents, which the budget engine sums without converting
+    salary = db.Column(db.Integer, nullable=False, default=0)
+    phone_stipend = db.Column(db.Integer, nullable=False, default=0)
+    other_income = db.Column(db.Integer, nullable=False, default=0)
+    tax_return = db.Column(db.Integer, nullable=False, default=0)
+    transfer = db.Column(db.Integer, nullable=False, default=0)
+    income_total = db.Column(db.Integer, nullable=False, default=0)
+
+    # Expense totals; categories maps category id (as a string) to its unpaid total
+    expense_count = db.Column(db.Integer, nullable=False, default=0)
+    expense_total = db.Column(db.Integer, nullable=False, default=0)
+    unpaid_expense_total = db.Column(db.Integer, nullable=False, default=0)
+    categories = db.Column(db.JSON, nullable=False, default=dict)
+
+
+class Tombstone(db.Model):
+    """Record of a deleted row, so clients mirroring the data can drop it.
+
+    Written by app.utils.change_tracking whenever a synced row is deleted;
+    ids only ever grow, so the last one seen marks a sync position. SQLite
+    lets one transaction write at a time, so ids are also handed out in
+    commit order.
+    """
+
+    __table_args__ = (
+        db.Index("ix_tombstone_user_id_id", "user_id", "id"),
+        {"sqlite_autoincrement": True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    table_name = db.Column(db.String(30), nullable=False)
+    record_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class ChangeSequence(db.Model):
+    """Single-row counter marking the commit order of changes to synced rows.
+
+    app.utils.change_tracking bumps it once for each committing transaction
+    that wrote paychecks, expenses or categories, and stamps the new value
+    on those rows' sync_version. Only one SQLite transaction writes at a
+    time, so the values follow commit order and the current one is a sync
+    position no later commit can fall behind.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+
 class AuditLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
@@ -245,15 +386,22 @@ class SalaryProjection(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    def calculate_period_gross(self, periods_per_year=26):
+        """Calculate gross pay for one of the year's pay periods"""
+        return self.annual_salary / float(periods_per_year)
+
+    def calculate_period_net(self, periods_per_year=26):
+        """Calculate net pay for one pay period after estimated taxes"""
+        gross = self.calculate_period_gross(periods_per_year)
+        return gross * (1 - (self.tax_rate / 100))
+
     def calculate_biweekly_gross(self):
         """Calculate biweekly gross pay"""
-        return self.annual_salary / 26.0
+        return self.calculate_period_gross(26)
 
     def calculate_biweekly_net(self):
         """Calculate biweekly net pay after estimated taxes"""
-        gross_biweekly = self.calculate_biweekly_gross()
-        net_biweekly = gross_biweekly * (1 - (self.tax_rate / 100))
-        return net_biweekly
+        return self.calculate_period_net(26)
 
     def get_pay_periods(self):
         """Generate all biweekly pay periods between start and end date"""
@@ -1,26 +1,78 @@
 # app/routes.py
+import io
 import json
 from datetime import date, datetime, timedelta
 
 from flask import Blueprint, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
-from sqlalchemy import asc, desc
+from sqlalchemy import func, or_
 
 from app import db
-from app.errors import FinanceAppError
+from app.errors import FinanceAppError, ValidationError
 from app.forms import (
     ExpenseCategoryForm,
     ExpenseFilterForm,
     ExpenseForm,
     PaycheckForm,
     SalaryForecastForm,
+    StatementImportForm,
 )
-from app.models import Expense, ExpenseCategory, Paycheck, SalaryProjection
+from app.models import (
+    BudgetRollup,
+    Expense,
+    ExpenseCategory,
+    ExpenseOverride,
+    Paycheck,
+    SalaryProjection,
+)
+from app.utils.budget_engine import calculate_budget_from_rollups
+from app.utils.category_cache import EMPTY_STATS, category_names, category_stats
+from app.utils.money import from_cents
 from app.utils.paycheck_generator import create_salary_paychecks
-from app.utils.expense_materializer import materialize_expense
+from app.utils.read_model import (
+    EXPENSE_SORT_COLUMNS,
+    expense_page,
+    expense_rows,
+    expense_statement,
+    expense_summary,
+    paycheck_rows,
+    rollup_rows,
+    serialize_budget_expense,
+    serialize_budget_paycheck,
+    serialize_dashboard_expense,
+    serialize_dashboard_paycheck,
+)
+from app.utils.salary_index import SalaryIndex
+from app.utils.statement_import import (
+    StatementImporter,
+    describe_import,
+    detect_format,
+    parse_statement,
+)
+from app.utils.expense_materializer import (
+    materialize_expense,
+    propagate_series_edit,
+    update_future_instances,
+)
+from app.utils.expense_search import (
+    fts_query,
+    matching_expense_ids,
+    search_occurrences,
+)
+from app.utils.expense_series import (
+    expand_occurrences,
+    filter_occurrences,
+    is_occurrence,
+    series_storage_enabled,
+    set_occurrence_override,
+)
 
 main = Blueprint("main", __name__)
 
+# Rows per /expenses page, and the most a per_page argument may ask for
+EXPENSES_PER_PAGE = 100
+MAX_EXPENSES_PER_PAGE = 500
+
 
 @main.route("/")
 @main.route("/index")
@@ -103,27 +155,20 @@ def add_paycheck():
 @login_required
 def dashboard():
     # Fetch recent paychecks and expenses
-    recent_paychecks = (
-        Paycheck.query.filter_by(user_id=current_user.id)
-        .order_by(Paycheck.date.desc())
-        .limit(5)
-        .all()
-    )
-
-    recent_expenses = (
-        Expense.query.filter_by(user_id=current_user.id)
-        .order_by(Expense.date.desc())
-        .limit(5)
-        .all()
+    recent_paychecks = paycheck_rows(current_user.id, descending=True, limit=5)
+    recent_expenses = expense_rows(current_user.id, descending=True, limit=5)
+
+    # Calculate totals from the per-day rollups, which hold cents
+    total_income, total_expenses = (
+        from_cents(total)
+        for total in db.session.query(
+            func.coalesce(func.sum(BudgetRollup.income_total), 0),
+            func.coalesce(func.sum(BudgetRollup.expense_total), 0),
+        )
+        .filter(BudgetRollup.user_id == current_user.id)
+        .one()
     )
 
-    # Calculate totals
-    all_paychecks = Paycheck.query.filter_by(user_id=current_user.id).all()
-    all_expenses = Expense.query.filter_by(user_id=current_user.id).all()
-
-    total_income = sum(p.net_amount for p in all_paychecks)
-    total_expenses = sum(e.amount for e in all_expenses)
-
     # Get the current salary projection
     current_salary = SalaryProjection.query.filter_by(
         user_id=current_user.id, is_current=True
@@ -144,29 +189,12 @@ def dashboard():
 
     # Prepare data for charts
     paycheck_data = [
-        {
-            "date": paycheck.date.isoformat(),
-            "gross_amount": float(paycheck.gross_amount),
-            "net_amount": float(paycheck.net_amount),
-            "pay_type": paycheck.pay_type,
-        }
-        for paycheck in Paycheck.query.filter_by(user_id=current_user.id)
-        .order_by(Paycheck.date.asc())
-        .limit(12)
-        .all()
+        serialize_dashboard_paycheck(paycheck)
+        for paycheck in paycheck_rows(current_user.id, limit=12)
     ]
-
     expense_data = [
-        {
-            "date": expense.date.isoformat(),
-            "amount": float(expense.amount),
-            "category": expense.category,
-            "description": expense.description,
-        }
-        for expense in Expense.query.filter_by(user_id=current_user.id)
-        .order_by(Expense.date.asc())
-        .limit(12)
-        .all()
+        serialize_dashboard_expense(expense)
+        for expense in expense_rows(current_user.id, limit=12)
     ]
 
     # Convert data to JSON for JavaScript
@@ -236,211 +264,43 @@ def budget():
         end_date = start_date
 
     # Get all paychecks for the user within the selected date range
-    paychecks_in_range = (
-        Paycheck.query.filter_by(user_id=current_user.id)
-        .filter(Paycheck.date >= start_date_obj, Paycheck.date <= end_date_obj)
-        .order_by(Paycheck.date)
-        .all()
-    )
-
-    # Get the base expenses within the date range
-    base_expenses = (
-        Expense.query.filter_by(user_id=current_user.id)
-        .filter(Expense.date >= start_date_obj, Expense.date <= end_date_obj)
-        .order_by(Expense.date)
-        .all()
-    )
+    paychecks_in_range = paycheck_rows(current_user.id, start_date_obj, end_date_obj)
 
     # Get all expenses within the date range (no need to generate virtual ones)
-    all_expenses = (
-        Expense.query.filter_by(user_id=current_user.id)
-        .filter(Expense.date >= start_date_obj, Expense.date <= end_date_obj)
-        .order_by(Expense.date)
-        .all()
-    )
-    expenses = all_expenses  # Keep the original variable name for compatibility
-
-    # Determine the pay periods based on actual paycheck dates
-    # We'll group paychecks that fall on the same day
-    paycheck_dates = {}
-    for paycheck in paychecks_in_range:
-        date_str = paycheck.date.strftime("%Y-%m-%d")
-        if date_str not in paycheck_dates:
-            paycheck_dates[date_str] = []
-        paycheck_dates[date_str].append(paycheck)
-
-    # If no paychecks in the range, use biweekly periods as fallback
-    if not paycheck_dates:
-        # Start from start_date and generate biweekly periods
-        current_date = start_date_obj
-        while current_date <= end_date_obj:
-            date_str = current_date.strftime("%Y-%m-%d")
-            paycheck_dates[date_str] = (
-                []
-            )  # Empty list means no actual paychecks on this date
-            current_date += timedelta(days=14)  # Biweekly
-
-    # Sort the dates chronologically
-    sorted_dates = sorted(paycheck_dates.keys())
-
-    # Create the periods list
-    periods = []
-    for i, date_str in enumerate(sorted_dates):
-        period_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-        periods.append(
-            {
-                "id": i + 1,
-                "date": period_date.strftime("%m/%d/%Y"),
-                "date_obj": period_date,
-                "paychecks": paycheck_dates[date_str],
-            }
-        )
+    all_expenses = expense_rows(current_user.id, start_date_obj, end_date_obj)
 
-    # Calculate start and end date for each period
-    for i, period in enumerate(periods):
-        # For the first period, start from the selected start date
-        if i == 0:
-            period_start = start_date_obj
-        else:
-            # Start from the day after the previous period's date
-            period_start = periods[i - 1]["date_obj"] + timedelta(days=1)
-
-        # End date is either the day before the next period or the end_date_obj
-        if i < len(periods) - 1:
-            period_end = periods[i + 1]["date_obj"] - timedelta(days=1)
-        else:
-            period_end = end_date_obj
-
-        period["start_date"] = period_start
-        period["end_date"] = period_end
-
-    running_balance = starting_balance  # Start with the initial balance
-
-    # Initialize period_data structure
-    period_data = {}
-    for i, period in enumerate(periods):
-        period_id = period["id"]
-        period_data[period_id] = {
-            "income": {
-                "salary": 0,
-                "phoneStipend": 0,
-                "otherIncome": 0,
-                "taxReturn": 0,
-                "transfer": 0,
-                "total": 0,
-            },
-            "expenses": {},
-            "total_expenses": 0,  # Pre-calculated expense total
-            "startingBalance": 0,
-            "net": 0,
-            "endingBalance": 0,
-        }
-
-    # Process all paychecks and assign to periods
-    for period in periods:
-        period_id = period["id"]
-        for paycheck in period["paychecks"]:
-            income_type = "salary"
-            if paycheck.pay_type == "Phone Stipend":
-                income_type = "phoneStipend"
-            elif paycheck.pay_type == "Other Income":
-                income_type = "otherIncome"
-            elif paycheck.pay_type == "Tax Return":
-                income_type = "taxReturn"
-            elif paycheck.pay_type == "Transfer":
-                income_type = "transfer"
-
-            period_data[period_id]["income"][income_type] += float(paycheck.net_amount)
-            period_data[period_id]["income"]["total"] += float(paycheck.net_amount)
-
-    # Process all expenses and assign them to periods based on date ranges
-    expense_assignments = {period["id"]: [] for period in periods}
-
-    for expense in expenses:
-        expense_date = expense.date
-        assigned = False
-
-        for period in periods:
-            if period["start_date"] <= expense_date <= period["end_date"]:
-                period_id = period["id"]
-
-                # Add expense to this period's list of expenses
-                expense_assignments[period_id].append(expense)
-
-                # Add to expense categories for this period
-                category = expense.category.lower()
-                if category not in period_data[period_id]["expenses"]:
-                    period_data[period_id]["expenses"][category] = 0
-
-                # Only add unpaid expenses to the totals
-                if not expense.paid:
-                    period_data[period_id]["expenses"][category] += float(
-                        expense.amount
-                    )
-                    # Add to total expenses for the period
-                    period_data[period_id]["total_expenses"] += float(expense.amount)
-
-                assigned = True
-                break
-
-        if not assigned:
-            print(
-                f"Warning: Expense {expense.id} on {expense_date} couldn't be assigned to any period"
-            )
-
-    # Calculate running balance and net values
-    running_balance = starting_balance
-
-    for period in periods:
-        period_id = period["id"]
-
-        # Income and expense totals already calculated
-        income_total = period_data[period_id]["income"]["total"]
-        expense_total = period_data[period_id]["total_expenses"]
-
-        # Set starting balance for this period
-        period_data[period_id]["startingBalance"] = running_balance
-
-        # Calculate net for this period
-        period_data[period_id]["net"] = income_total - expense_total
-
-        # Calculate ending balance
-        period_data[period_id]["endingBalance"] = (
-            running_balance + period_data[period_id]["net"]
+    # Recurring series stored as rules are expanded here; they are not in the rollups
+    virtual_expenses = []
+    if series_storage_enabled():
+        virtual_expenses = expand_occurrences(
+            current_user.id, start_date_obj, end_date_obj
+        )
+        all_expenses = sorted(
+            all_expenses + virtual_expenses, key=lambda expense: expense.date
         )
 
-        # Update running balance for next period
-        running_balance = period_data[period_id]["endingBalance"]
-
-    # Calculate summary totals
-    total_income = sum(period_data[p["id"]]["income"]["total"] for p in periods)
-    total_expenses = sum(period_data[p["id"]]["total_expenses"] for p in periods)
-    net_amount = running_balance + total_income - total_expenses
-    projected_balance = (
-        running_balance  # This is the final running balance after all periods
+    # Period totals come from the per-day rollups rather than re-summing rows
+    rollups = rollup_rows(current_user.id, start_date_obj, end_date_obj)
+
+    # Build the pay periods and bucket income and expenses into them
+    periods, period_data, summary, unassigned = calculate_budget_from_rollups(
+        paychecks_in_range,
+        rollups,
+        start_date_obj,
+        end_date_obj,
+        starting_balance,
+        expenses=virtual_expenses,
+        category_names=category_names(current_user.id),
     )
 
-    summary = {
-        "totalIncome": float(total_income),
-        "totalExpenses": float(total_expenses),
-        "net": float(net_amount),
-        "startingBalance": float(starting_balance),
-        "projectedBalance": float(projected_balance),
-    }
+    for item in unassigned:
+        item_date = item.day if hasattr(item, "day") else item.date
+        print(f"Warning: Budget entry on {item_date} couldn't be assigned to any period")
 
     summary_json = json.dumps(summary)
     period_data_json = json.dumps(period_data)
     paycheck_data_json = json.dumps(
-        [
-            {
-                "id": paycheck.id,
-                "date": paycheck.date.strftime("%Y-%m-%d"),
-                "pay_type": paycheck.pay_type,
-                "gross_amount": float(paycheck.gross_amount),
-                "net_amount": float(paycheck.net_amount),
-            }
-            for paycheck in paychecks_in_range
-        ]
+        [serialize_budget_paycheck(paycheck) for paycheck in paychecks_in_range]
     )
     # Serialize periods for JSON
     serialized_periods = []
@@ -454,18 +314,9 @@ def budget():
         serialized_periods.append(serialized_period)
 
     # Serialize expenses for JSON
-    serialized_expenses = []
-    for expense in all_expenses:  # Using the all_expenses variable that already exists
-        serialized_expense = {
-            "id": expense.id,
-            "date": expense.date.strftime("%Y-%m-%d"),
-            "description": expense.description,
-            "category": expense.category,
-            "amount": float(expense.amount),
-            "paid": expense.paid,
-            "recurring": expense.recurring,
-        }
-        serialized_expenses.append(serialized_expense)
+    serialized_expenses = [
+        serialize_budget_expense(expense) for expense in all_expenses
+    ]
 
     # Convert to JSON for the template
     periods_json = json.dumps(serialized_periods)
@@ -551,9 +402,8 @@ def generate_paychecks():
             request.form.get("first_paycheck_date"), "%Y-%m-%d"
         ).date()
         end_date = datetime.strptime(request.form.get("end_date"), "%Y-%m-%d").date()
-        frequency = int(
-            request.form.get("frequency", "14")
-        )  # Default to biweekly (14 days)
+        # Days between paychecks (default biweekly) or a named schedule
+        frequency = request.form.get("frequency", "14")
         force_regenerate = "force_regenerate" in request.form
 
         # Generate paychecks
@@ -755,14 +605,9 @@ def edit_paycheck(id):
 
             # If this was part of a recurring income projection, update that too
             # First, find any related salary projection
-            related_projection = SalaryProjection.query.filter(
-                SalaryProjection.user_id == current_user.id,
-                SalaryProjection.start_date <= paycheck.date,
-                or_(
-                    SalaryProjection.end_date >= paycheck.date,
-                    SalaryProjection.end_date == None,
-                ),
-            ).first()
+            related_projection = SalaryIndex.for_user(current_user.id).find(
+                paycheck.date
+            )
 
             if related_projection:
                 # Update projection details
@@ -800,14 +645,9 @@ def delete_paycheck(id):
 
     try:
         # Optional: Delete related salary projection if it exists and no other paychecks use it
-        related_projection = SalaryProjection.query.filter(
-            SalaryProjection.user_id == current_user.id,
-            SalaryProjection.start_date <= paycheck.date,
-            or_(
-                SalaryProjection.end_date >= paycheck.date,
-                SalaryProjection.end_date == None,
-            ),
-        ).first()
+        related_projection = SalaryIndex.for_user(current_user.id).find(
+            paycheck.date
+        )
 
         # Check if this projection is used by other paychecks
         if related_projection:
@@ -861,6 +701,7 @@ def manage_expenses():
     end_date = request.args.get("end_date")
     category_id = request.args.get("category", type=int)
     paid_status = request.args.get("paid_status", "all")
+    search_text = request.args.get("q", "").strip()
     sort_by = request.args.get("sort_by", "date")
     sort_order = request.args.get("sort_order", "desc")
 
@@ -871,6 +712,8 @@ def manage_expenses():
         filter_form.end_date.data = datetime.strptime(end_date, "%Y-%m-%d").date()
     if category_id:
         filter_form.category.data = category_id
+    if search_text:
+        filter_form.q.data = search_text
     if paid_status:
         filter_form.paid_status.data = paid_status
     if sort_by:
@@ -878,88 +721,123 @@ def manage_expenses():
     if sort_order:
         filter_form.sort_order.data = sort_order
 
-    # Start building the query
-    query = Expense.query.filter_by(user_id=current_user.id)
+    # Start building the query; rows are read-only, so only columns are selected
+    query = expense_statement(current_user.id)
 
     # Apply date filters
     if start_date:
-        query = query.filter(
+        query = query.where(
             Expense.date >= datetime.strptime(start_date, "%Y-%m-%d").date()
         )
     if end_date:
-        query = query.filter(
+        query = query.where(
             Expense.date <= datetime.strptime(end_date, "%Y-%m-%d").date()
         )
 
     # Apply category filter
     if category_id and category_id > 0:
-        query = query.filter(Expense.category_id == category_id)
+        query = query.where(Expense.category_id == category_id)
+
+    # Apply the full-text search
+    if fts_query(search_text):
+        query = query.where(Expense.id.in_(matching_expense_ids(search_text)))
 
     # Apply paid status filter
     if paid_status == "paid":
-        query = query.filter(Expense.paid == True)
+        query = query.where(Expense.paid == True)
     elif paid_status == "unpaid":
-        query = query.filter(Expense.paid == False)
+        query = query.where(Expense.paid == False)
     elif paid_status == "overdue":
-        query = query.filter(
+        query = query.where(
             Expense.paid == False,
             Expense.due_date.isnot(None),
             Expense.due_date < date.today(),
         )
     elif paid_status == "due_soon":
-        query = query.filter(
+        query = query.where(
             Expense.paid == False,
             Expense.due_date.isnot(None),
             Expense.due_date >= date.today(),
             Expense.due_date <= date.today() + timedelta(days=7),
         )
 
-    # Apply sorting
-    sort_column = getattr(Expense, sort_by)
-    if sort_by == "category":
-        sort_column = Expense.category  # Use the category string field
-
-    if sort_order == "desc":
-        query = query.order_by(desc(sort_column))
-    else:
-        query = query.order_by(asc(sort_column))
-
-    # Execute the query
-    expenses = query.all()
-
-    # Compute summary statistics
-    total_amount = sum(expense.amount for expense in expenses)
-    unpaid_amount = sum(expense.amount for expense in expenses if not expense.paid)
-    overdue_amount = sum(
-        expense.amount
-        for expense in expenses
-        if not expense.paid and expense.due_date and expense.due_date < date.today()
+    # Summary cards cover every matching row, not only the page shown
+    occurrences = []
+    if series_storage_enabled():
+        today = date.today()
+        range_start = (
+            datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else today
+        )
+        range_end = (
+            datetime.strptime(end_date, "%Y-%m-%d").date()
+            if end_date
+            else today + timedelta(days=365)
+        )
+        occurrences = filter_occurrences(
+            expand_occurrences(current_user.id, range_start, range_end),
+            category_id=category_id,
+            paid_status=paid_status,
+        )
+        if fts_query(search_text):
+            occurrences = search_occurrences(occurrences, search_text)
+    summary = expense_summary(query, occurrences)
+
+    # Serve the table one keyset page at a time
+    if sort_by not in EXPENSE_SORT_COLUMNS:
+        sort_by = "date"
+    per_page = min(
+        max(request.args.get("per_page", EXPENSES_PER_PAGE, type=int), 1),
+        MAX_EXPENSES_PER_PAGE,
     )
+    after = request.args.get("after")
+    try:
+        expenses, next_cursor = expense_page(
+            query,
+            sort_by=sort_by,
+            descending=sort_order == "desc",
+            after=after,
+            per_page=per_page,
+            occurrences=occurrences,
+        )
+    except ValueError:
+        flash("That page link is no longer valid; showing the first page.")
+        after = None
+        expenses, next_cursor = expense_page(
+            query,
+            sort_by=sort_by,
+            descending=sort_order == "desc",
+            per_page=per_page,
+            occurrences=occurrences,
+        )
 
-    # Group expenses by category for the chart
-    category_totals = {}
-    for expense in expenses:
-        category = expense.category
-        if category not in category_totals:
-            category_totals[category] = 0
-        category_totals[category] += expense.amount
-
-    # Prepare category data for the template
-    category_data = [
-        {"name": cat, "amount": amt} for cat, amt in category_totals.items()
-    ]
-    category_data.sort(key=lambda x: x["amount"], reverse=True)
+    # Links keep the current filters and only move the cursor
+    page_args = {
+        key: value
+        for key, value in request.args.items()
+        if key not in ("after", "per_page")
+    }
+    if per_page != EXPENSES_PER_PAGE:
+        page_args["per_page"] = per_page
+    next_page_url = (
+        url_for("main.manage_expenses", after=next_cursor, **page_args)
+        if next_cursor
+        else None
+    )
+    first_page_url = url_for("main.manage_expenses", **page_args) if after else None
 
     return render_template(
         "finance/manage_expenses.html",
         title="Manage Expenses",
         expenses=expenses,
         filter_form=filter_form,
-        total_amount=total_amount,
-        unpaid_amount=unpaid_amount,
-        overdue_amount=overdue_amount,
-        category_data=category_data,
+        total_count=summary["count"],
+        total_amount=summary["total_amount"],
+        unpaid_amount=summary["unpaid_amount"],
+        overdue_amount=summary["overdue_amount"],
+        category_data=summary["category_data"],
         categories=user_categories,
+        next_page_url=next_page_url,
+        first_page_url=first_page_url,
     )
 
 
@@ -985,8 +863,6 @@ def add_expense():
         if form.category_id.data and form.category_id.data > 0:
             # Using an existing category
             category_id = form.category_id.data
-            category_obj = ExpenseCategory.query.get(category_id)
-            category_name = category_obj.name
         elif category_name:
             # Using a new category name - check if it already exists
             existing_category = ExpenseCategory.query.filter(
@@ -997,7 +873,6 @@ def add_expense():
             if existing_category:
                 # Use existing category with this name
                 category_id = existing_category.id
-                category_name = existing_category.name
             else:
                 # Create new category
                 new_category = ExpenseCategory(
@@ -1047,7 +922,6 @@ def add_expense():
             start_date=form.start_date.data if form.recurring.data else None,
             end_date=form.end_date.data if form.recurring.data else None,
             parent_expense_id=None,  # This is a parent expense, not materialized
-            category=category_name,
             category_id=category_id,
             description=form.description.data,
             amount=form.amount.data,
@@ -1065,11 +939,15 @@ def add_expense():
             # First save the expense to get an ID
             db.session.flush()
 
-            # If it's recurring, materialize it automatically
+            # If it's recurring, materialize it automatically (series storage
+            # expands occurrences on read instead)
             materialized_count = 0
-            if form.recurring.data and form.date.data < form.end_date.data:
-                materialized_expenses = materialize_expense(expense)
-                materialized_count = len(materialized_expenses)
+            if (
+                form.recurring.data
+                and not series_storage_enabled()
+                and form.date.data < form.end_date.data
+            ):
+                materialized_count = materialize_expense(expense)
 
             # Commit all changes
             db.session.commit()
@@ -1156,8 +1034,6 @@ def edit_expense(id):
         if form.category_id.data and form.category_id.data > 0:
             # Using an existing category
             category_id = form.category_id.data
-            category_obj = ExpenseCategory.query.get(category_id)
-            category_name = category_obj.name
         elif category_name:
             # Using a new category name - check if it already exists
             existing_category = ExpenseCategory.query.filter(
@@ -1168,7 +1044,6 @@ def edit_expense(id):
             if existing_category:
                 # Use existing category with this name
                 category_id = existing_category.id
-                category_name = existing_category.name
             else:
                 # Create new category
                 new_category = ExpenseCategory(
@@ -1214,7 +1089,6 @@ def edit_expense(id):
         if is_materialized:
             expense.date = form.date.data
             expense.due_date = form.due_date.data
-            expense.category = category_name
             expense.category_id = category_id
             expense.description = form.description.data
             expense.amount = form.amount.data
@@ -1233,12 +1107,19 @@ def edit_expense(id):
         else:
             # First, update the parent expense
             old_recurring = expense.recurring
+            old_schedule = (
+                expense.date,
+                expense.start_date,
+                expense.end_date,
+                expense.frequency,
+                expense.frequency_type,
+                expense.frequency_value,
+            )
 
             expense.date = form.date.data
             expense.due_date = form.due_date.data
             expense.start_date = form.start_date.data if form.recurring.data else None
             expense.end_date = form.end_date.data if form.recurring.data else None
-            expense.category = category_name
             expense.category_id = category_id
             expense.description = form.description.data
             expense.amount = form.amount.data
@@ -1260,27 +1141,24 @@ def edit_expense(id):
                 # If switching from non-recurring to recurring, or if it's already recurring
                 materialized_count = 0
                 if form.recurring.data:
-                    # Handle future materialized instances
-                    today = date.today()
+                    schedule_changed = not old_recurring or old_schedule != (
+                        expense.date,
+                        expense.start_date,
+                        expense.end_date,
+                        expense.frequency,
+                        expense.frequency_type,
+                        expense.frequency_value,
+                    )
 
-                    # Option 1: Find and update any future instances that haven't been modified
-                    # This updates future instances to match new details (amount, category, etc.)
-                    future_instances = Expense.query.filter(
-                        Expense.parent_expense_id == expense.id,
-                        Expense.date >= today,
-                        Expense.updated_at
-                        == Expense.created_at,  # Not manually modified
-                    ).all()
-
-                    for instance in future_instances:
-                        instance.category = category_name
-                        instance.category_id = category_id
-                        instance.description = expense.description
-                        instance.amount = expense.amount
-
-                    # Materialize new instances
-                    materialized_expenses = materialize_expense(expense)
-                    materialized_count = len(materialized_expenses)
+                    if series_storage_enabled():
+                        # Only instances stored before switching to series
+                        # storage are left; keep their details in sync
+                        update_future_instances(expense)
+                    else:
+                        # Update, prune and extend future instances set-wise
+                        materialized_count = propagate_series_edit(
+                            expense, schedule_changed
+                        )
 
                 # If switching from recurring to non-recurring, handle cleanup
                 elif old_recurring and not form.recurring.data:
@@ -1340,6 +1218,11 @@ def delete_expense(id):
             if deleted_count > 0:
                 message = f"Expense and {deleted_count} materialized instances deleted successfully."
 
+            # Drop any per-occurrence overrides of the series
+            ExpenseOverride.query.filter_by(
+                parent_expense_id=expense.id, user_id=current_user.id
+            ).delete()
+
         # Now delete the expense itself
         db.session.delete(expense)
         db.session.commit()
@@ -1388,6 +1271,113 @@ def toggle_expense_paid(id):
     return redirect(url_for("main.manage_expenses"))
 
 
+def _parse_occurrence_date(expense, value):
+    """Parse an occurrence date from the URL and check the series hits it"""
+    try:
+        occurrence_date = datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValidationError("Invalid occurrence date", field="occurrence_date")
+
+    if not is_occurrence(expense, occurrence_date):
+        raise ValidationError(
+            f"Expense has no occurrence on {occurrence_date.strftime('%m/%d/%Y')}",
+            field="occurrence_date",
+        )
+    return occurrence_date
+
+
+@main.route(
+    "/expenses/<int:id>/occurrences/<occurrence_date>/toggle-paid", methods=["POST"]
+)
+@login_required
+def toggle_occurrence_paid(id, occurrence_date):
+    """Toggle the paid status of one occurrence of a recurring series"""
+    expense = Expense.query.filter_by(
+        id=id, user_id=current_user.id, recurring=True
+    ).first_or_404()
+    occurrence_date = _parse_occurrence_date(expense, occurrence_date)
+
+    try:
+        override = ExpenseOverride.query.filter_by(
+            parent_expense_id=expense.id, date=occurrence_date
+        ).first()
+        paid = not (override is not None and override.paid)
+        set_occurrence_override(expense, occurrence_date, paid=paid)
+        db.session.commit()
+
+        if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+            return jsonify(
+                {
+                    "success": True,
+                    "paid": paid,
+                    "message": f"Expense marked as {'paid' if paid else 'unpaid'}.",
+                    "expense_id": expense.id,
+                    "occurrence_date": occurrence_date.isoformat(),
+                }
+            )
+
+        flash(f"Expense marked as {'paid' if paid else 'unpaid'}.")
+    except Exception as e:
+        db.session.rollback()
+
+        if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+            return jsonify({"success": False, "message": str(e)}), 500
+
+        flash(f"Error updating expense: {str(e)}")
+
+    return redirect(url_for("main.manage_expenses"))
+
+
+@main.route("/expenses/<int:id>/occurrences/<occurrence_date>/skip", methods=["POST"])
+@login_required
+def skip_occurrence(id, occurrence_date):
+    """Remove one occurrence from a recurring series"""
+    expense = Expense.query.filter_by(
+        id=id, user_id=current_user.id, recurring=True
+    ).first_or_404()
+    occurrence_date = _parse_occurrence_date(expense, occurrence_date)
+
+    try:
+        set_occurrence_override(expense, occurrence_date, skipped=True)
+        db.session.commit()
+        flash(f"Occurrence on {occurrence_date.strftime('%m/%d/%Y')} skipped.")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Error skipping occurrence: {str(e)}")
+
+    return redirect(url_for("main.manage_expenses"))
+
+
+@main.route("/expenses/import", methods=["GET", "POST"])
+@login_required
+def import_statement():
+    """Import expenses and income from an uploaded bank statement"""
+    form = StatementImportForm()
+
+    if form.validate_on_submit():
+        upload = form.statement.data
+        statement = io.TextIOWrapper(
+            upload.stream, encoding="utf-8-sig", errors="replace", newline=""
+        )
+        importer = StatementImporter(current_user.id)
+
+        try:
+            summary = importer.run(
+                parse_statement(statement, detect_format(upload.filename))
+            )
+            flash(describe_import(summary))
+            for error in summary["errors"][:5]:
+                flash(f"Row {error['row']}: {error['error']}")
+            return redirect(url_for("main.manage_expenses"))
+        except ValueError as e:
+            importer.flush()
+            flash(f"Error reading statement: {str(e)}")
+
+    return render_template(
+        "finance/import_statement.html", title="Import Statement", form=form
+    )
+
+
 # ============= CATEGORY MANAGEMENT =============
 
 
@@ -1401,21 +1391,17 @@ def manage_categories():
         .all()
     )
 
-    # Get expense counts and totals for each category
-    category_stats = {}
-    for category in categories:
-        expenses = Expense.query.filter_by(
-            category_id=category.id, user_id=current_user.id
-        ).all()
-        count = len(expenses)
-        total = sum(e.amount for e in expenses)
-        category_stats[category.id] = {"count": count, "total": total}
+    # Expense counts and totals for every category, from one cached query
+    stats = category_stats(current_user.id)
+    category_stats_by_id = {
+        category.id: stats.get(category.id, EMPTY_STATS) for category in categories
+    }
 
     return render_template(
         "finance/manage_categories.html",
         title="Manage Categories",
         categories=categories,
-        category_stats=category_stats,
+        category_stats=category_stats_by_id,
     )
 
 
@@ -1492,13 +1478,8 @@ def edit_category(id):
         category.color = form.color.data
 
         try:
-            # Also update any expenses using this category
-            expenses = Expense.query.filter_by(
-                category_id=category.id, user_id=current_user.id
-            ).all()
-            for expense in expenses:
-                expense.category = category.name  # Update the category name string too
-
+            # Expenses reference the category by id, so this is the only row
+            # a rename touches
             db.session.commit()
             flash("Category updated successfully!")
             return redirect(url_for("main.manage_categories"))
@@ -1522,7 +1503,8 @@ def delete_category(id):
         id=id, user_id=current_user.id
     ).first_or_404()
 
-    # Check if the category is in use
+    # Check if the category is in use, counting live rather than through
+    # the stats cache so the guard never depends on a cached value
     expense_count = Expense.query.filter_by(
         category_id=category.id, user_id=current_user.id
     ).count()
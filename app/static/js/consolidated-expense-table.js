@@ -186,9 +186,14 @@
       };
 
       // Handle toggle paid
-      const handleTogglePaid = async (expenseId) => {
+      const handleTogglePaid = async (expense) => {
+        // Occurrences expanded from a recurring series have no row of their own
+        const url = expense.id
+          ? `/expenses/toggle-paid/${expense.id}`
+          : `/expenses/${expense.parent_expense_id}/occurrences/${expense.date}/toggle-paid`;
+
         try {
-          const response = await fetch(`/expenses/toggle-paid/${expenseId}`, {
+          const response = await fetch(url, {
             method: "POST",
             headers: {
               "X-Requested-With": "XMLHttpRequest",
@@ -714,7 +719,7 @@
                                   ? "Mark as unpaid"
                                   : "Mark as paid",
                                 onClick: () =>
-                                  handleTogglePaid(item.allExpenses[0].id),
+                                  handleTogglePaid(item.allExpenses[0]),
                               },
                               React.createElement(
                                 "svg",
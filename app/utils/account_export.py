@@ -0,0 +1,151 @@
+# app/utils/account_export.py
+
+import csv
+import json
+from datetime import date, datetime
+
+from sqlalchemy import select
+
+from app import db
+from app.models import Expense, ExpenseCategory, Paycheck, SalaryProjection
+
+# Exported tables in output order, keyed by the record_type written for them
+EXPORT_TABLES = {
+    "paycheck": Paycheck,
+    "expense": Expense,
+    "category": ExpenseCategory,
+    "salary_projection": SalaryProjection,
+}
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+# Rows fetched from the cursor at a time
+YIELD_PER = 1000
+
+# Rows joined into one chunk of output
+CHUNK_ROWS = 500
+
+
+def export_columns(model):
+    """Columns exported for a model; user_id is implied by the export"""
+    return [column for column in model.__table__.columns if column.name != "user_id"]
+
+
+def iter_records(model, user_id, yield_per=YIELD_PER):
+    """Stream a user's rows of one model as column name -> value dicts
+
+    Only the columns are selected and the result is consumed yield_per rows
+    at a time, so no ORM objects are built and memory stays flat.
+    """
+    columns = export_columns(model)
+    names = [column.name for column in columns]
+    result = db.session.execute(
+        select(*columns)
+        .where(model.user_id == user_id)
+        .order_by(model.id)
+        .execution_options(yield_per=yield_per)
+    )
+    for row in result:
+        yield dict(zip(names, row))
+
+
+def _json_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _chunked(lines, size=CHUNK_ROWS):
+    """Join lines into larger chunks to cut per-write overhead"""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def export_ndjson(user_id, tables=None):
+    """Generate a user's records as NDJSON, one object per line
+
+    Each object carries a "record_type" key naming its table.
+
+    Args:
+        user_id: User whose data to export
+        tables: record_type keys of EXPORT_TABLES to include (default all)
+
+    Yields:
+        str: Chunks of NDJSON text
+    """
+
+    def lines():
+        for record_type in tables or EXPORT_TABLES:
+            for record in iter_records(EXPORT_TABLES[record_type], user_id):
+                record = {"record_type": record_type, **record}
+                yield json.dumps(record, default=_json_value) + "\n"
+
+    return _chunked(lines())
+
+
+class _LineBuffer:
+    """File-like target that hands back what csv.writer writes"""
+
+    def write(self, value):
+        return value
+
+
+def export_csv(user_id, tables=None):
+    """Generate a user's records as a single CSV
+
+    The header is record_type followed by the union of the tables' columns;
+    columns a table lacks are left empty.
+
+    Args:
+        user_id: User whose data to export
+        tables: record_type keys of EXPORT_TABLES to include (default all)
+
+    Yields:
+        str: Chunks of CSV text
+    """
+    tables = list(tables or EXPORT_TABLES)
+    header = ["record_type"]
+    for record_type in tables:
+        for column in export_columns(EXPORT_TABLES[record_type]):
+            if column.name not in header:
+                header.append(column.name)
+
+    writer = csv.writer(_LineBuffer())
+
+    def lines():
+        yield writer.writerow(header)
+        for record_type in tables:
+            for record in iter_records(EXPORT_TABLES[record_type], user_id):
+                record["record_type"] = record_type
+                yield writer.writerow(
+                    [
+                        _json_value(value)
+                        if isinstance(value, (date, datetime))
+                        else value
+                        for value in (record.get(name) for name in header)
+                    ]
+                )
+
+    return _chunked(lines())
+
+
+def export_account(user_id, export_format="ndjson", tables=None):
+    """Generate a user's export in one of EXPORT_FORMATS
+
+    Raises:
+        ValueError: If the format or a table is unknown
+    """
+    unknown = [table for table in tables or () if table not in EXPORT_TABLES]
+    if unknown:
+        raise ValueError(f"Unknown tables: {', '.join(unknown)}")
+    if export_format == "ndjson":
+        return export_ndjson(user_id, tables)
+    if export_format == "csv":
+        return export_csv(user_id, tables)
+    raise ValueError(f"Unknown export format: {export_format}")
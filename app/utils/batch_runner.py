@@ -0,0 +1,297 @@
+# app/utils/batch_runner.py
+
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+
+from app import db
+from app.models import Paycheck, SalaryProjection
+from app.utils.expense_materializer import (
+    extend_materialization,
+    series_behind_horizon,
+)
+from app.utils.paycheck_generator import create_salary_paychecks, infer_pay_frequency
+
+# Latest Regular paychecks a user's pay frequency is worked out from
+RECENT_PAYCHECKS = 6
+
+# The Flask app of a worker process, created once by _init_worker
+_worker_app = None
+
+
+def materialize_user(user_id, options):
+    """Extend a user's recurring series to today + options["days"]
+
+    Returns:
+        int: Number of materialized instances inserted
+    """
+    through = date.today() + timedelta(days=options["days"])
+    series = series_behind_horizon(user_id, through)
+    if not series:
+        return 0
+
+    inserted = extend_materialization(series, through)
+    db.session.commit()
+    return inserted
+
+
+def regenerate_user_paychecks(user_id, options):
+    """Bring a user's Regular paychecks in line with their salary projections
+
+    The schedule stays anchored at the user's next Regular paycheck (or their
+    latest one if none are upcoming) and runs to today + options["days"];
+    nothing before the anchor is touched. Each user keeps the pay frequency
+    their recent paychecks follow. options["frequency"], if set, is only
+    used for users whose frequency can't be worked out. Users without
+    projections, paychecks or a frequency are skipped.
+
+    Returns:
+        int: Number of paychecks inserted, updated or deleted
+    """
+    has_projection = (
+        db.session.query(SalaryProjection.id).filter_by(user_id=user_id).first()
+    )
+    if not has_projection:
+        return 0
+
+    today = date.today()
+    regular = Paycheck.query.filter_by(user_id=user_id, pay_type="Regular")
+    anchor = (
+        regular.filter(Paycheck.date >= today).order_by(Paycheck.date.asc()).first()
+        or regular.order_by(Paycheck.date.desc()).first()
+    )
+    if anchor is None:
+        return 0
+
+    recent_dates = [
+        row.date
+        for row in db.session.query(Paycheck.date)
+        .filter_by(user_id=user_id, pay_type="Regular")
+        .filter(Paycheck.date <= anchor.date)
+        .order_by(Paycheck.date.desc())
+        .limit(RECENT_PAYCHECKS)
+    ]
+    frequency = infer_pay_frequency(recent_dates) or options.get("frequency")
+    if frequency is None:
+        return 0
+
+    success, message, summary = create_salary_paychecks(
+        user_id=user_id,
+        first_paycheck_date=anchor.date,
+        end_date=today + timedelta(days=options["days"]),
+        frequency=frequency,
+        force_regenerate=True,
+        backfill_days=0,
+    )
+    if not success:
+        raise RuntimeError(message)
+
+    return len(summary["inserted"]) + len(summary["updated"]) + len(summary["deleted"])
+
+
+BATCH_TASKS = {
+    "materialize": materialize_user,
+    "paychecks": regenerate_user_paychecks,
+}
+
+
+def partition(user_ids, chunk_size):
+    """Split user ids into chunks that are handed to workers one at a time"""
+    return [
+        user_ids[start : start + chunk_size]
+        for start in range(0, len(user_ids), chunk_size)
+    ]
+
+
+def run_chunk(task_name, user_ids, options):
+    """Run a batch task for each user in a chunk, committing per user
+
+    Returns:
+        list: (user_id, rows, error) for each user; error is None on success
+    """
+    task = BATCH_TASKS[task_name]
+    results = []
+    for user_id in user_ids:
+        try:
+            results.append((user_id, task(user_id, options), None))
+        except Exception as e:
+            db.session.rollback()
+            results.append((user_id, 0, str(e)))
+    return results
+
+
+def _init_worker(config_overrides):
+    """Create the worker's own app, engine and connection pool"""
+    global _worker_app
+    from app import create_app
+    from config import Config
+
+    _worker_app = create_app(type("BatchConfig", (Config,), config_overrides))
+
+
+def _run_chunk_in_worker(task_name, user_ids, options):
+    with _worker_app.app_context():
+        try:
+            return run_chunk(task_name, user_ids, options)
+        finally:
+            db.session.remove()
+
+
+def worker_config(app):
+    """Config values a worker process needs to reach the same database"""
+    overrides = {
+        "SQLALCHEMY_DATABASE_URI": app.config["SQLALCHEMY_DATABASE_URI"],
+        "RECURRING_EXPENSE_STORAGE": app.config.get("RECURRING_EXPENSE_STORAGE"),
+    }
+    if overrides["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        # SQLite serializes writers, so wait for the lock instead of failing
+        overrides["SQLALCHEMY_ENGINE_OPTIONS"] = {"connect_args": {"timeout": 60}}
+    return overrides
+
+
+class BatchState:
+    """Progress of a batch run, saved to a JSON file so it can be resumed"""
+
+    def __init__(self, path, task_name, options):
+        self.path = path
+        self.task_name = task_name
+        self.options = options
+        self.done = set()
+        self.failed = {}
+        self.rows = 0
+
+    @classmethod
+    def load(cls, path, task_name, options):
+        """Load the saved state, or start fresh if there is none
+
+        Raises:
+            ValueError: If the saved run was for a different task or options
+        """
+        state = cls(path, task_name, options)
+        if not path or not os.path.exists(path):
+            return state
+
+        with open(path) as f:
+            saved = json.load(f)
+        if saved.get("task") != task_name or saved.get("options") != options:
+            raise ValueError(
+                f"{path} belongs to a different run "
+                f"({saved.get('task')} {saved.get('options')})"
+            )
+
+        state.done = set(saved.get("done", []))
+        state.failed = {int(k): v for k, v in saved.get("failed", {}).items()}
+        state.rows = saved.get("rows", 0)
+        return state
+
+    def record(self, results):
+        for user_id, rows, error in results:
+            if error is None:
+                self.done.add(user_id)
+                self.failed.pop(user_id, None)
+                self.rows += rows
+            else:
+                self.failed[user_id] = error
+
+    def save(self):
+        if not self.path:
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(
+                {
+                    "task": self.task_name,
+                    "options": self.options,
+                    "done": sorted(self.done),
+                    "failed": self.failed,
+                    "rows": self.rows,
+                },
+                f,
+            )
+        # Replace atomically so an interrupted run never leaves a torn file
+        os.replace(temp_path, self.path)
+
+
+def run_batch(
+    app,
+    task_name,
+    user_ids,
+    options,
+    workers=1,
+    chunk_size=20,
+    state_path=None,
+    report=print,
+):
+    """Run a batch task for many users, optionally across a process pool
+
+    With more than one worker, chunks of users are handed to a pool of
+    processes. Each process builds its own app and engine, so no connection
+    is shared across processes. Progress is saved after every chunk, and
+    users already done are skipped when the same state file is passed again.
+
+    Args:
+        app: The Flask app whose database to use
+        task_name: Key of BATCH_TASKS
+        user_ids: Users to process
+        options: JSON-serializable task options
+        workers: Number of worker processes (1 runs in this process)
+        chunk_size: Users per chunk
+        state_path: Optional JSON file to record progress in
+        report: Callable receiving progress lines
+
+    Returns:
+        dict: users, rows, failed, elapsed, users_per_second, rows_per_second
+    """
+    state = BatchState.load(state_path, task_name, options)
+    pending = [user_id for user_id in user_ids if user_id not in state.done]
+    chunks = partition(pending, chunk_size)
+    if len(pending) < len(user_ids):
+        report(f"Resuming: {len(user_ids) - len(pending)} users already done")
+
+    started = time.perf_counter()
+    processed = 0
+    rows = 0
+
+    def collect(results):
+        nonlocal processed, rows
+        state.record(results)
+        state.save()
+        processed += len(results)
+        rows += sum(result[1] for result in results)
+        for user_id, _, error in results:
+            if error is not None:
+                report(f"User {user_id}: {error}")
+        report(f"[{processed}/{len(pending)}] users processed, {rows} rows written")
+
+    if workers <= 1:
+        with app.app_context():
+            for chunk in chunks:
+                collect(run_chunk(task_name, chunk, options))
+    else:
+        # Spawn rather than fork so workers never inherit open connections
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(worker_config(app),),
+        ) as pool:
+            futures = [
+                pool.submit(_run_chunk_in_worker, task_name, chunk, options)
+                for chunk in chunks
+            ]
+            for future in as_completed(futures):
+                collect(future.result())
+
+    elapsed = time.perf_counter() - started
+    return {
+        "users": processed,
+        "rows": rows,
+        "failed": len(state.failed),
+        "elapsed": elapsed,
+        "users_per_second": processed / elapsed if elapsed else 0.0,
+        "rows_per_second": rows / elapsed if elapsed else 0.0,
+    }
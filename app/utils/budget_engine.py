@@ -0,0 +1,357 @@
+# app/utils/budget_engine.py
+
+from bisect import bisect_left
+from datetime import timedelta
+
+from app.utils.money import from_cents, to_cents
+from app.utils.recurrence import rule_for_days
+
+# Map Paycheck.pay_type values to the income keys used by the budget view
+INCOME_TYPES = {
+    "Phone Stipend": "phoneStipend",
+    "Other Income": "otherIncome",
+    "Tax Return": "taxReturn",
+    "Transfer": "transfer",
+}
+
+# Label for expense totals whose category no longer exists
+UNCATEGORIZED = "Uncategorized"
+
+# Budget income keys and the BudgetRollup columns holding them
+INCOME_COLUMNS = {
+    "salary": "salary",
+    "phoneStipend": "phone_stipend",
+    "otherIncome": "other_income",
+    "taxReturn": "tax_return",
+    "transfer": "transfer",
+}
+
+
+def income_type_for(pay_type):
+    """Return the budget income key for a paycheck pay type (defaults to salary)"""
+    return INCOME_TYPES.get(pay_type, "salary")
+
+
+def pay_type_for(income_type):
+    """Return the paycheck pay type for a budget income key
+
+    Salary maps to Regular pay; unknown keys are capitalized.
+    """
+    if income_type == "salary":
+        return "Regular"
+    for pay_type, key in INCOME_TYPES.items():
+        if key == income_type:
+            return pay_type
+    return income_type.capitalize()
+
+
+def build_periods(paychecks, start_date, end_date, fallback_frequency=14):
+    """Build the pay periods for a date range from the paychecks in it
+
+    Paychecks falling on the same day are grouped into one period. If there
+    are no paychecks in the range, biweekly periods starting at start_date
+    are used instead.
+
+    Args:
+        paychecks: Paychecks within the range, in any order
+        start_date: First day covered by the budget
+        end_date: Last day covered by the budget
+        fallback_frequency: Days between periods when there are no paychecks
+
+    Returns:
+        list: Period dicts ordered by date, each with id, date, date_obj,
+            paychecks, start_date and end_date
+    """
+    paycheck_dates = {}
+    for paycheck in paychecks:
+        paycheck_dates.setdefault(paycheck.date, []).append(paycheck)
+
+    if not paycheck_dates:
+        for period_date in rule_for_days(fallback_frequency).dates(
+            start_date, 0, end_date
+        ):
+            paycheck_dates[period_date] = []
+
+    sorted_dates = sorted(paycheck_dates)
+
+    periods = []
+    for i, period_date in enumerate(sorted_dates):
+        # A period spans from the day after the previous paycheck (or the
+        # range start) to the day before the next one (or the range end), so
+        # neighbouring periods overlap; expenses go to the first match
+        period_start = start_date if i == 0 else sorted_dates[i - 1] + timedelta(days=1)
+        if i < len(sorted_dates) - 1:
+            period_end = sorted_dates[i + 1] - timedelta(days=1)
+        else:
+            period_end = end_date
+
+        periods.append(
+            {
+                "id": i + 1,
+                "date": period_date.strftime("%m/%d/%Y"),
+                "date_obj": period_date,
+                "paychecks": paycheck_dates[period_date],
+                "start_date": period_start,
+                "end_date": period_end,
+            }
+        )
+
+    return periods
+
+
+def empty_period_totals():
+    """Return a zeroed period_data entry
+
+    Amounts are accumulated in integer cents; apply_running_balance
+    converts them to dollars once every total is in.
+    """
+    return {
+        "income": {
+            "salary": 0,
+            "phoneStipend": 0,
+            "otherIncome": 0,
+            "taxReturn": 0,
+            "transfer": 0,
+            "total": 0,
+        },
+        "expenses": {},
+        "total_expenses": 0,
+        "startingBalance": 0,
+        "net": 0,
+        "endingBalance": 0,
+    }
+
+
+def locate_period(period_ends, periods, day):
+    """Return the index of the first period containing day, or None
+
+    Period start and end dates both increase with the period index, so the
+    first period ending on or after day is the only candidate: if it starts
+    after day, every later period does too.
+
+    Args:
+        period_ends: Sorted list of period end dates
+        periods: Periods matching period_ends
+        day: The date to look up
+
+    Returns:
+        int or None: Index into periods
+    """
+    index = bisect_left(period_ends, day)
+    if index == len(periods) or periods[index]["start_date"] > day:
+        return None
+    return index
+
+
+def assign_expenses(periods, period_data, expenses):
+    """Bucket expenses into their periods, updating period_data in place
+
+    Each expense goes to the first period whose range contains its date,
+    found with a binary search over the period end dates instead of a scan.
+
+    Args:
+        periods: Periods from build_periods
+        period_data: Dict keyed by period id
+        expenses: Expenses to bucket
+
+    Returns:
+        list: Expenses that fell outside every period
+    """
+    period_ends = [period["end_date"] for period in periods]
+    unassigned = []
+
+    for expense in expenses:
+        index = locate_period(period_ends, periods, expense.date)
+        if index is None:
+            unassigned.append(expense)
+            continue
+
+        totals = period_data[periods[index]["id"]]
+        category = expense.category_id
+        if category not in totals["expenses"]:
+            totals["expenses"][category] = 0
+
+        # Only unpaid expenses count towards the totals
+        if not expense.paid:
+            amount = to_cents(expense.amount)
+            totals["expenses"][category] += amount
+            totals["total_expenses"] += amount
+
+    return unassigned
+
+
+def apply_running_balance(periods, period_data, starting_balance):
+    """Fill in starting/ending balances and build the summary dict
+
+    Balances are computed in cents, then every amount in period_data is
+    converted to dollars in place.
+
+    Args:
+        periods: Periods from build_periods
+        period_data: Dict keyed by period id with income and expenses
+            filled in, in cents
+        starting_balance: Balance in dollars before the first period
+
+    Returns:
+        dict: The budget summary, in dollars
+    """
+    starting_balance = to_cents(starting_balance)
+    running_balance = starting_balance
+    total_income = 0
+    total_expenses = 0
+
+    for period in periods:
+        totals = period_data[period["id"]]
+        income_total = totals["income"]["total"]
+        expense_total = totals["total_expenses"]
+
+        totals["startingBalance"] = running_balance
+        totals["net"] = income_total - expense_total
+        totals["endingBalance"] = running_balance + totals["net"]
+        running_balance = totals["endingBalance"]
+
+        total_income += income_total
+        total_expenses += expense_total
+
+    for totals in period_data.values():
+        for key, amount in totals["income"].items():
+            totals["income"][key] = from_cents(amount)
+        for category, amount in totals["expenses"].items():
+            totals["expenses"][category] = from_cents(amount)
+        for key in ("total_expenses", "startingBalance", "net", "endingBalance"):
+            totals[key] = from_cents(totals[key])
+
+    return {
+        "totalIncome": from_cents(total_income),
+        "totalExpenses": from_cents(total_expenses),
+        "net": from_cents(running_balance + total_income - total_expenses),
+        "startingBalance": from_cents(starting_balance),
+        "projectedBalance": from_cents(running_balance),
+    }
+
+
+def assign_rollups(periods, period_data, rollups):
+    """Bucket daily rollup rows into their periods, updating period_data in place
+
+    Rollup amounts are already in cents, so they are added as they are.
+
+    Args:
+        periods: Periods from build_periods
+        period_data: Dict keyed by period id
+        rollups: BudgetRollup rows within the range
+
+    Returns:
+        list: Rollup rows that fell outside every period
+    """
+    period_ends = [period["end_date"] for period in periods]
+    unassigned = []
+
+    for rollup in rollups:
+        index = locate_period(period_ends, periods, rollup.day)
+        if index is None:
+            unassigned.append(rollup)
+            continue
+
+        totals = period_data[periods[index]["id"]]
+        for income_type, column in INCOME_COLUMNS.items():
+            totals["income"][income_type] += getattr(rollup, column)
+        totals["income"]["total"] += rollup.income_total
+
+        for category, unpaid in rollup.categories.items():
+            category = int(category)
+            totals["expenses"][category] = totals["expenses"].get(category, 0) + unpaid
+        totals["total_expenses"] += rollup.unpaid_expense_total
+
+    return unassigned
+
+
+def label_categories(period_data, category_names):
+    """Re-key each period's expense totals from category id to name
+
+    Totals are accumulated by category id so grouping compares ints; names
+    are attached once per period and category at the end. Keys are the
+    lowercased names the budget view shows, so categories whose names only
+    differ in case are merged.
+
+    Args:
+        period_data: Dict keyed by period id with expenses filled in
+        category_names: Category name keyed by id
+    """
+    for totals in period_data.values():
+        labelled = {}
+        for category_id, amount in totals["expenses"].items():
+            name = category_names.get(category_id, UNCATEGORIZED).lower()
+            labelled[name] = labelled.get(name, 0) + amount
+        totals["expenses"] = labelled
+
+
+def calculate_budget_from_rollups(
+    paychecks,
+    rollups,
+    start_date,
+    end_date,
+    starting_balance=0,
+    expenses=(),
+    category_names=None,
+):
+    """Same as calculate_budget, but sums daily rollup rows instead of raw rows
+
+    Args:
+        paychecks: Paychecks within the range, used only to place the periods
+        rollups: BudgetRollup rows within the range
+        start_date: First day covered by the budget
+        end_date: Last day covered by the budget
+        starting_balance: Balance before the first period
+        expenses: Expenses not covered by the rollups, such as occurrences
+            expanded from recurring series
+        category_names: Category name keyed by id; expense totals are keyed
+            by category id when omitted
+
+    Returns:
+        tuple: (periods, period_data, summary, unassigned rollups and expenses)
+    """
+    periods = build_periods(paychecks, start_date, end_date)
+    period_data = {period["id"]: empty_period_totals() for period in periods}
+
+    unassigned = assign_rollups(periods, period_data, rollups)
+    unassigned += assign_expenses(periods, period_data, expenses)
+    if category_names is not None:
+        label_categories(period_data, category_names)
+    summary = apply_running_balance(periods, period_data, starting_balance)
+
+    return periods, period_data, summary, unassigned
+
+
+def calculate_budget(
+    paychecks, expenses, start_date, end_date, starting_balance=0, category_names=None
+):
+    """Build periods and bucket paychecks and expenses for the budget view
+
+    Args:
+        paychecks: Paychecks within the range
+        expenses: Expenses within the range
+        start_date: First day covered by the budget
+        end_date: Last day covered by the budget
+        starting_balance: Balance before the first period
+        category_names: Category name keyed by id; expense totals are keyed
+            by category id when omitted
+
+    Returns:
+        tuple: (periods, period_data, summary, unassigned expenses)
+    """
+    periods = build_periods(paychecks, start_date, end_date)
+    period_data = {period["id"]: empty_period_totals() for period in periods}
+
+    for period in periods:
+        income = period_data[period["id"]]["income"]
+        for paycheck in period["paychecks"]:
+            net_amount = to_cents(paycheck.net_amount)
+            income[income_type_for(paycheck.pay_type)] += net_amount
+            income["total"] += net_amount
+
+    unassigned = assign_expenses(periods, period_data, expenses)
+    if category_names is not None:
+        label_categories(period_data, category_names)
+    summary = apply_running_balance(periods, period_data, starting_balance)
+
+    return periods, period_data, summary, unassigned
@@ -0,0 +1,226 @@
+# app/utils/budget_rollup.py
+
+from collections import defaultdict
+
+from sqlalchemy import case, delete, event, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import BudgetRollup, Expense, Paycheck
+from app.utils.budget_engine import INCOME_COLUMNS, income_type_for
+from app.utils.money import cents
+
+# Keep IN (...) lists well under SQLite's bound parameter limit
+CHUNK_SIZE = 500
+
+TRACKED_MODELS = (Expense, Paycheck)
+
+
+def _chunks(values, size=CHUNK_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i : i + size]
+
+
+def _aggregate(connection, user_id, days=None):
+    """Aggregate source rows into rollup row dicts keyed by day
+
+    Args:
+        connection: Connection to run the queries on
+        user_id: User to aggregate
+        days: Days to aggregate, or None for every day
+
+    Returns:
+        dict: Rollup column values keyed by day, amounts in integer cents
+    """
+    rows = {}
+
+    def row_for(day):
+        if day not in rows:
+            rows[day] = {
+                "user_id": user_id,
+                "day": day,
+                "salary": 0,
+                "phone_stipend": 0,
+                "other_income": 0,
+                "tax_return": 0,
+                "transfer": 0,
+                "income_total": 0,
+                "expense_count": 0,
+                "expense_total": 0,
+                "unpaid_expense_total": 0,
+                "categories": {},
+            }
+        return rows[day]
+
+    day_filters = [None] if days is None else [chunk for chunk in _chunks(days)]
+
+    for chunk in day_filters:
+        paycheck_query = (
+            select(
+                Paycheck.date, Paycheck.pay_type, func.sum(cents(Paycheck.net_amount))
+            )
+            .where(Paycheck.user_id == user_id)
+            .group_by(Paycheck.date, Paycheck.pay_type)
+        )
+        if chunk is not None:
+            paycheck_query = paycheck_query.where(Paycheck.date.in_(chunk))
+
+        for day, pay_type, net_total in connection.execute(paycheck_query):
+            row = row_for(day)
+            row[INCOME_COLUMNS[income_type_for(pay_type)]] += net_total or 0
+            row["income_total"] += net_total or 0
+
+        expense_query = (
+            select(
+                Expense.date,
+                Expense.category_id,
+                func.count(Expense.id),
+                func.sum(cents(Expense.amount)),
+                func.sum(case((Expense.paid == True, 0), else_=cents(Expense.amount))),
+            )
+            .where(Expense.user_id == user_id)
+            .group_by(Expense.date, Expense.category_id)
+        )
+        if chunk is not None:
+            expense_query = expense_query.where(Expense.date.in_(chunk))
+
+        for day, category_id, count, total, unpaid in connection.execute(expense_query):
+            row = row_for(day)
+            row["expense_count"] += count
+            row["expense_total"] += total or 0
+            row["unpaid_expense_total"] += unpaid or 0
+            # JSON object keys are strings; the budget engine maps them back
+            row["categories"][str(category_id)] = unpaid or 0
+
+    return rows
+
+
+def refresh_rollups(connection, keys):
+    """Recompute the rollup rows for a set of (user_id, day) pairs
+
+    Args:
+        connection: Connection inside the caller's transaction
+        keys: Iterable of (user_id, day) tuples
+    """
+    days_by_user = defaultdict(set)
+    for user_id, day in keys:
+        if user_id is not None and day is not None:
+            days_by_user[user_id].add(day)
+
+    for user_id, days in days_by_user.items():
+        for chunk in _chunks(days):
+            connection.execute(
+                delete(BudgetRollup).where(
+                    BudgetRollup.user_id == user_id, BudgetRollup.day.in_(chunk)
+                )
+            )
+
+        rows = _aggregate(connection, user_id, days)
+        if rows:
+            connection.execute(insert(BudgetRollup), list(rows.values()))
+
+
+def rebuild_rollups(connection, user_ids):
+    """Drop and recreate every rollup row for the given users
+
+    Args:
+        connection: Connection inside the caller's transaction
+        user_ids: Users to rebuild
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    written = 0
+    for user_id in user_ids:
+        connection.execute(delete(BudgetRollup).where(BudgetRollup.user_id == user_id))
+        rows = _aggregate(connection, user_id)
+        if rows:
+            connection.execute(insert(BudgetRollup), list(rows.values()))
+        written += len(rows)
+    return written
+
+
+def _pending_keys(session):
+    return session.info.setdefault("budget_rollup_keys", set())
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_flush_keys(session, flush_context, instances):
+    """Record the (user_id, day) pairs touched by this flush
+
+    Old values are read back from the database, which still holds them at
+    this point, so changes to expired attributes are not missed.
+    """
+    keys = _pending_keys(session)
+    connection = session.connection()
+
+    for model in TRACKED_MODELS:
+        changed_ids = [
+            obj.id
+            for obj in list(session.dirty) + list(session.deleted)
+            if isinstance(obj, model) and obj.id is not None
+        ]
+        for chunk in _chunks(changed_ids):
+            keys.update(
+                connection.execute(
+                    select(model.user_id, model.date).where(model.id.in_(chunk))
+                ).all()
+            )
+
+        for obj in list(session.new) + list(session.dirty):
+            if isinstance(obj, model):
+                keys.add((obj.user_id, obj.date))
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_flush_keys(session, flush_context):
+    keys = session.info.pop("budget_rollup_keys", None)
+    if keys:
+        refresh_rollups(session.connection(), keys)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_statements(orm_execute_state):
+    """Keep rollups current for bulk INSERT/UPDATE/DELETE on tracked models"""
+    if not (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        return None
+
+    mapper = orm_execute_state.bind_mapper
+    model = mapper.class_ if mapper is not None else None
+    if model not in TRACKED_MODELS:
+        return None
+
+    session = orm_execute_state.session
+    connection = session.connection()
+    statement = orm_execute_state.statement
+    keys = set()
+
+    params = orm_execute_state.parameters or []
+    if isinstance(params, dict):
+        params = [params]
+
+    def affected_keys():
+        query = select(model.user_id, model.date)
+        if statement.whereclause is not None:
+            query = query.where(statement.whereclause)
+        elif params:
+            # Bulk UPDATE by primary key: the rows are named in the params
+            query = query.where(model.id.in_([row["id"] for row in params]))
+        return set(connection.execute(query).all())
+
+    if orm_execute_state.is_insert:
+        keys.update((row.get("user_id"), row.get("date")) for row in params)
+    else:
+        keys.update(affected_keys())
+
+    result = orm_execute_state.invoke_statement()
+
+    if orm_execute_state.is_update:
+        keys.update(affected_keys())
+
+    refresh_rollups(connection, keys)
+    return result
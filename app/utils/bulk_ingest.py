@@ -0,0 +1,306 @@
+# app/utils/bulk_ingest.py
+
+import json
+from datetime import date, datetime
+
+from sqlalchemy import insert
+
+from app import db
+from app.models import Expense, Paycheck
+from app.utils.budget_engine import pay_type_for
+from app.utils.category_cache import ensure_categories
+from app.utils.expense_materializer import bulk_materialize_expenses
+from app.utils.expense_series import series_storage_enabled
+from app.utils.tax import paycheck_nets
+
+# Records validated and written per transaction
+DEFAULT_BATCH_SIZE = 500
+
+# Per-line errors included in a report; the total is always counted
+MAX_REPORTED_ERRORS = 1000
+
+
+def _parse_date(value):
+    if isinstance(value, date):
+        return value
+    if not isinstance(value, str):
+        raise ValueError("date is required (YYYY-MM-DD)")
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"Invalid date {value!r}, expected YYYY-MM-DD")
+
+
+def _parse_amount(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError("amount must be a number")
+    try:
+        amount = float(value)
+    except ValueError:
+        raise ValueError(f"Invalid amount {value!r}")
+    if amount < 0:
+        raise ValueError("amount cannot be negative")
+    return amount
+
+
+def income_values(record, user_id):
+    """Build the Paycheck column values for an income record
+
+    Salary is assumed to be 75% taxable, with withholding from the pay
+    date's tax year worked out by withhold_taxes; other income types are
+    untaxed.
+
+    Args:
+        record: Dict with date, income_type and amount
+        user_id: Owner of the paycheck
+
+    Returns:
+        dict: Paycheck column values, with net_amount None for salary
+        until withhold_taxes runs
+
+    Raises:
+        ValueError: If a field is missing or invalid
+    """
+    pay_date = _parse_date(record.get("date"))
+    amount = _parse_amount(record.get("amount", 0))
+
+    income_type = record.get("income_type")
+    if not isinstance(income_type, str) or not income_type:
+        raise ValueError("income_type is required")
+
+    if income_type == "salary":
+        taxable = amount * 0.75
+        non_taxable = amount * 0.25
+        net_amount = None
+    else:
+        taxable = 0
+        non_taxable = amount
+        net_amount = amount
+
+    return {
+        "date": pay_date,
+        "pay_type": pay_type_for(income_type),
+        "gross_amount": amount,
+        "taxable_amount": taxable,
+        "non_taxable_amount": non_taxable,
+        "net_amount": net_amount,
+        "phone_stipend": income_type == "phoneStipend",
+        "user_id": user_id,
+    }
+
+
+def withhold_taxes(rows):
+    """Fill in the net_amount of income_values rows that are still missing it
+
+    Withholding comes from each pay date's tax year brackets, assuming
+    biweekly pay, and is computed with one paycheck_nets call per year.
+
+    Returns:
+        list: The same rows, updated in place
+    """
+    by_year = {}
+    for row in rows:
+        if row["net_amount"] is None:
+            by_year.setdefault(row["date"].year, []).append(row)
+
+    for year, year_rows in by_year.items():
+        nets = paycheck_nets(
+            [row["gross_amount"] for row in year_rows],
+            [row["taxable_amount"] for row in year_rows],
+            year,
+        )
+        for row, net_amount in zip(year_rows, nets):
+            row["net_amount"] = net_amount
+    return rows
+
+
+def expense_values(record, user_id):
+    """Build the Expense column values for an expense record
+
+    Args:
+        record: Dict with date, category, amount and optionally description,
+            paid, recurring and frequency
+        user_id: Owner of the expense
+
+    Returns:
+        dict: Expense column values, with the category name under
+        "category" in place of category_id until link_categories runs
+
+    Raises:
+        ValueError: If a field is missing or invalid
+    """
+    expense_date = _parse_date(record.get("date"))
+    amount = _parse_amount(record.get("amount", 0))
+
+    category = record.get("category")
+    if not isinstance(category, str) or not category.strip():
+        raise ValueError("category is required")
+    category = category.strip()
+
+    recurring = bool(record.get("recurring", False))
+    frequency = record.get("frequency") if recurring else None
+    if recurring and not frequency:
+        raise ValueError("frequency is required for recurring expenses")
+
+    return {
+        "date": expense_date,
+        "category": category,
+        "description": record.get("description", ""),
+        "amount": amount,
+        "paid": bool(record.get("paid", False)),
+        "recurring": recurring,
+        "frequency": frequency,
+        "user_id": user_id,
+    }
+
+
+def link_categories(user_id, rows):
+    """Replace the category name of expense_values rows with its category_id
+
+    Categories the user doesn't have yet are created in the current
+    transaction, so they roll back with the rows that needed them.
+
+    Returns:
+        list: The same rows, updated in place
+    """
+    category_ids = ensure_categories(user_id, [row["category"] for row in rows])
+    for row in rows:
+        row["category_id"] = category_ids[row.pop("category").lower()]
+    return rows
+
+
+def read_ndjson(lines):
+    """Parse NDJSON lines lazily, one record at a time
+
+    Blank lines are skipped, but line numbers still match the request body.
+
+    Yields:
+        tuple: (line number, record dict or None, error message or None)
+    """
+    for line_number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, "Each line must be a JSON object"
+            continue
+        yield line_number, record, None
+
+
+class BulkIngest:
+    """Validate and insert a stream of expense and income records in batches
+
+    Records are buffered until a batch is full, then written in one
+    transaction: plain expenses and income with one executemany each, and
+    recurring parents flushed together so their instances are materialized
+    with a single bulk insert. A failing batch is rolled back and reported
+    without stopping the ones after it.
+    """
+
+    def __init__(self, user_id, batch_size=DEFAULT_BATCH_SIZE):
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.lines = 0
+        self.inserted = {"expenses": 0, "income": 0, "materialized": 0}
+        self.error_count = 0
+        self.errors = []
+        self._batch = []
+
+    def add_error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_number, "error": message})
+
+    def add(self, line_number, record):
+        """Validate one record and queue it for the current batch"""
+        self.lines += 1
+        try:
+            record_type = record.get("type")
+            if record_type == "expense":
+                values = expense_values(record, self.user_id)
+            elif record_type == "income":
+                values = income_values(record, self.user_id)
+            else:
+                raise ValueError("type must be expense or income")
+        except ValueError as e:
+            self.add_error(line_number, str(e))
+            return
+
+        self._batch.append((line_number, record_type, values))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write the queued records in one transaction"""
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+
+        now = datetime.utcnow()
+        expenses = []
+        parents = []
+        income = []
+        for _, record_type, values in batch:
+            if record_type == "income":
+                income.append(dict(values, created_at=now))
+            elif values["recurring"]:
+                parents.append(dict(values))
+            else:
+                expenses.append(dict(values, created_at=now, updated_at=now))
+
+        try:
+            link_categories(self.user_id, expenses + parents)
+            withhold_taxes(income)
+            parents = [Expense(**values) for values in parents]
+            if expenses:
+                db.session.execute(insert(Expense), expenses)
+            if income:
+                db.session.execute(insert(Paycheck), income)
+
+            materialized = 0
+            if parents:
+                db.session.add_all(parents)
+                db.session.flush()
+                if not series_storage_enabled():
+                    materialized = bulk_materialize_expenses(parents)
+
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            for line_number, _, _ in batch:
+                self.add_error(line_number, f"Batch not saved: {e}")
+            return
+
+        self.inserted["expenses"] += len(expenses) + len(parents)
+        self.inserted["income"] += len(income)
+        self.inserted["materialized"] += materialized
+
+    def run(self, lines):
+        """Ingest every record of an NDJSON stream
+
+        Returns:
+            dict: The report from summary()
+        """
+        for line_number, record, error in read_ndjson(lines):
+            if error:
+                self.lines += 1
+                self.add_error(line_number, error)
+            else:
+                self.add(line_number, record)
+        self.flush()
+        return self.summary()
+
+    def summary(self):
+        return {
+            "lines": self.lines,
+            "inserted": dict(self.inserted),
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
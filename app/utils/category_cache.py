@@ -0,0 +1,193 @@
+# app/utils/category_cache.py
+
+import threading
+
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Expense, ExpenseCategory
+
+EMPTY_STATS = {"count": 0, "total": 0}
+
+
+def load_category_stats(connection, user_id):
+    """Count and sum a user's expenses per category in one GROUP BY query
+
+    Returns:
+        dict: {"count", "total"} keyed by category_id; categories without
+        expenses are left out
+    """
+    rows = connection.execute(
+        select(Expense.category_id, func.count(), func.sum(Expense.amount))
+        .where(Expense.user_id == user_id, Expense.category_id.isnot(None))
+        .group_by(Expense.category_id)
+    )
+    return {
+        category_id: {"count": count, "total": total}
+        for category_id, count, total in rows
+    }
+
+
+def load_category_names(connection, user_id):
+    """A user's category names keyed by category id"""
+    rows = connection.execute(
+        select(ExpenseCategory.id, ExpenseCategory.name).where(
+            ExpenseCategory.user_id == user_id
+        )
+    )
+    return dict(rows.all())
+
+
+class SessionCache:
+    """Per-user value cached on a session until its transaction ends.
+
+    Nothing is shared between sessions, so a value is never older than
+    the transaction that reads it: a change committed by another process,
+    such as a statement import or a batch run, shows up in the next
+    request. Within a transaction, a flush drops the entries of users
+    whose rows of the watched model it wrote, and a bulk statement on that
+    model drops all of the session's entries, so the session's own writes
+    are seen as well.
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def _values_key(self):
+        return f"{self.name}_values"
+
+    def get(self, session, user_id):
+        """Return a user's value from the loader"""
+        values = session.info.setdefault(self._values_key, {})
+        hit = user_id in values
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if not hit:
+            values[user_id] = self.loader(session.connection(), user_id)
+        return values[user_id]
+
+    def mark_written(self, session, user_ids):
+        """Drop the session's entries of users whose rows were written"""
+        values = session.info.get(self._values_key)
+        if values:
+            for user_id in user_ids:
+                values.pop(user_id, None)
+
+    def finish(self, session):
+        """Drop every entry held for a session"""
+        session.info.pop(self._values_key, None)
+
+    def stats(self):
+        """Return the cache counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self):
+        """Reset the counters"""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+# Other processes write expenses and categories too, so neither map is
+# kept beyond the transaction that loaded it
+stats_cache = SessionCache("category_stats", load_category_stats)
+names_cache = SessionCache("category_names", load_category_names)
+
+# Which cache each model's writes invalidate
+WATCHED_MODELS = {Expense: stats_cache, ExpenseCategory: names_cache}
+
+
+def category_stats(user_id):
+    """Return a user's category stats, cached for the transaction"""
+    return stats_cache.get(db.session, user_id)
+
+
+def category_names(user_id):
+    """Return a user's category id -> name map, cached for the transaction"""
+    return names_cache.get(db.session, user_id)
+
+
+def ensure_categories(user_id, names):
+    """Ids of a user's categories by lowercased name, creating missing ones
+
+    Names are matched case-insensitively; names the user has no category
+    for are inserted with one statement in the caller's transaction.
+
+    Args:
+        user_id: Owner of the categories
+        names: Category names that must exist
+
+    Returns:
+        dict: Category id keyed by lowercased name, for at least every name
+    """
+    category_ids = {
+        name.lower(): category_id
+        for category_id, name in category_names(user_id).items()
+    }
+    missing = {}
+    for name in names:
+        if name.lower() not in category_ids:
+            missing.setdefault(name.lower(), name)
+    if not missing:
+        return category_ids
+
+    db.session.execute(
+        insert(ExpenseCategory),
+        [{"name": name, "user_id": user_id} for name in missing.values()],
+    )
+    return {
+        name.lower(): category_id
+        for category_id, name in category_names(user_id).items()
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_flushed(session, flush_context):
+    for model, cache in WATCHED_MODELS.items():
+        user_ids = {
+            obj.user_id
+            for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+            if isinstance(obj, model)
+        }
+        if user_ids:
+            cache.mark_written(session, user_ids)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _invalidate_bulk_statements(orm_execute_state):
+    """Drop the session's entries when a bulk statement writes a watched model"""
+    if not (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        return None
+
+    mapper = orm_execute_state.bind_mapper
+    model = mapper.class_ if mapper is not None else None
+    if model in WATCHED_MODELS:
+        WATCHED_MODELS[model].finish(orm_execute_state.session)
+    return None
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _end_session_caches(session, transaction):
+    """Drop session-cached values however the outer transaction ends"""
+    if transaction.parent is None:
+        for cache in WATCHED_MODELS.values():
+            cache.finish(session)
@@ -0,0 +1,236 @@
+# app/utils/change_tracking.py
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import DDL, event, func, insert, or_, select, text, update
+from sqlalchemy.orm import Session
+
+from app.models import ChangeSequence, Expense, ExpenseCategory, Paycheck, Tombstone
+
+# Tables clients can mirror through /api/changes, keyed by Tombstone.table_name
+SYNCED_MODELS = {
+    "income": Paycheck,
+    "expenses": Expense,
+    "categories": ExpenseCategory,
+}
+_TABLE_NAMES = {model: name for name, model in SYNCED_MODELS.items()}
+
+# Session.info flag: this transaction wrote synced rows that need a version
+_PENDING_KEY = "sync_versions_pending"
+
+# Any change to a synced row, including raw SQL and bulk statements the ORM
+# hooks below don't see, clears its sync_version so the next commit that
+# stamps versions picks it up. Clearing it only when the update left it
+# alone keeps the stamping UPDATE from undoing itself.
+SYNC_TRIGGER_DDL = tuple(
+    f"""CREATE TRIGGER IF NOT EXISTS {model.__tablename__}_sync_au
+    AFTER UPDATE ON {model.__tablename__}
+    WHEN new.sync_version IS NOT NULL AND new.sync_version IS old.sync_version
+    BEGIN
+        UPDATE {model.__tablename__} SET sync_version = NULL WHERE id = new.id;
+    END"""
+    for model in SYNCED_MODELS.values()
+)
+
+
+def create_sync_triggers(connection):
+    """Create the triggers that mark changed synced rows as pending"""
+    for statement in SYNC_TRIGGER_DDL:
+        connection.execute(text(statement))
+
+
+# New databases get the triggers along with the tables
+for _model, _statement in zip(SYNCED_MODELS.values(), SYNC_TRIGGER_DDL):
+    event.listen(
+        _model.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite")
+    )
+
+
+def encode_change_token(version, tombstone_id):
+    """Encode a sync position as an opaque token
+
+    Args:
+        version: Rows stamped with a later change version are still to be sent
+        tombstone_id: Last tombstone id already sent
+    """
+    position = {"v": version, "d": tombstone_id}
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_change_token(token):
+    """Decode a token from encode_change_token
+
+    Tokens from before change versions held a timestamp instead; they
+    decode to version 0, so every row is sent once more.
+
+    Returns:
+        tuple: (version, tombstone_id)
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(token.encode()))
+        if "v" not in position:
+            datetime.fromisoformat(position["t"])
+            return 0, int(position["d"])
+        return int(position["v"]), int(position["d"])
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise ValueError("Invalid change token")
+
+
+def sync_position(connection, user_id):
+    """The position a sync reading the data right now should resume from
+
+    Taken before the changed rows are read, so anything committed meanwhile
+    has a later version or tombstone id and is sent by the next sync.
+
+    Returns:
+        tuple: (version, tombstone_id) for encode_change_token
+    """
+    version = connection.execute(select(ChangeSequence.value)).scalar()
+    last_tombstone = connection.execute(
+        select(func.max(Tombstone.id)).where(Tombstone.user_id == user_id)
+    ).scalar()
+    return version or 0, last_tombstone or 0
+
+
+def changed_since(model, version):
+    """Criterion for rows of a synced model changed after a change version
+
+    Rows committed without a version yet (written by raw SQL outside a
+    stamping commit) are included until one is stamped on them.
+    """
+    return or_(model.sync_version.is_(None), model.sync_version > version)
+
+
+def deleted_since(connection, user_id, tombstone_id, until_id):
+    """Ids deleted after a tombstone id, grouped by SYNCED_MODELS key"""
+    deleted = {name: [] for name in SYNCED_MODELS}
+    rows = connection.execute(
+        select(Tombstone.table_name, Tombstone.record_id)
+        .where(
+            Tombstone.user_id == user_id,
+            Tombstone.id > tombstone_id,
+            Tombstone.id <= until_id,
+        )
+        .order_by(Tombstone.id)
+    )
+    for table_name, record_id in rows:
+        deleted.setdefault(table_name, []).append(record_id)
+    return deleted
+
+
+def _tombstone_rows(model, rows, now):
+    return [
+        {
+            "user_id": user_id,
+            "table_name": _TABLE_NAMES[model],
+            "record_id": record_id,
+            "deleted_at": now,
+        }
+        for user_id, record_id in rows
+    ]
+
+
+@event.listens_for(Session, "before_flush")
+def _tombstone_deleted_objects(session, flush_context, instances):
+    """Add a tombstone for every synced object deleted in this flush"""
+    now = datetime.utcnow()
+    for obj in list(session.deleted):
+        model = type(obj)
+        if model in _TABLE_NAMES and obj.id is not None:
+            session.add(
+                Tombstone(
+                    user_id=obj.user_id,
+                    table_name=_TABLE_NAMES[model],
+                    record_id=obj.id,
+                    deleted_at=now,
+                )
+            )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _tombstone_bulk_deletes(orm_execute_state):
+    """Add tombstones for the rows a bulk DELETE on a synced model removes
+
+    The rows are selected with the statement's own criteria before it runs,
+    in the same transaction, so the tombstones commit or roll back with it.
+    """
+    if not orm_execute_state.is_delete:
+        return None
+
+    mapper = orm_execute_state.bind_mapper
+    model = mapper.class_ if mapper is not None else None
+    if model not in _TABLE_NAMES:
+        return None
+
+    statement = orm_execute_state.statement
+    query = select(model.user_id, model.id)
+    if statement.whereclause is not None:
+        query = query.where(statement.whereclause)
+
+    connection = orm_execute_state.session.connection()
+    rows = connection.execute(query).all()
+    if rows:
+        connection.execute(
+            insert(Tombstone), _tombstone_rows(model, rows, datetime.utcnow())
+        )
+    return None
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flushed_changes(session, flush_context):
+    if any(
+        type(obj) in _TABLE_NAMES for obj in list(session.new) + list(session.dirty)
+    ):
+        session.info[_PENDING_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_bulk_changes(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in _TABLE_NAMES:
+        orm_execute_state.session.info[_PENDING_KEY] = True
+    return None
+
+
+@event.listens_for(Session, "before_commit")
+def _stamp_sync_versions(session):
+    """Stamp this transaction's changed synced rows with the next version
+
+    Runs inside the committing transaction, after its last flush. The
+    transaction already holds SQLite's write lock, so no other commit can
+    take a version between this one and its own commit.
+    """
+    session.flush()
+    if not session.info.pop(_PENDING_KEY, False):
+        return
+
+    connection = session.connection()
+    sequence = ChangeSequence.__table__
+    version = connection.execute(
+        update(sequence).values(value=sequence.c.value + 1).returning(sequence.c.value)
+    ).scalar()
+    if version is None:
+        version = 1
+        connection.execute(insert(sequence).values(value=version))
+
+    for model in SYNCED_MODELS.values():
+        table = model.__table__
+        connection.execute(
+            update(table)
+            .where(table.c.sync_version.is_(None))
+            # Leave updated_at as the change set it, not the stamping time
+            .values(sync_version=version, updated_at=table.c.updated_at)
+        )
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_pending_changes(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
@@ -1,30 +1,41 @@
 from datetime import datetime, timedelta, date
-from dateutil.relativedelta import relativedelta
+from sqlalchemy import and_, delete, or_, update
+from sqlalchemy.dialects.sqlite import insert
 from app.models import Expense
 from app import db
+from app.utils.recurrence import compiled_rule
 
 
-def materialize_expense(expense, end_date=None):
+def materialization_end(expense, end_date=None):
     """
-    Materialize a single recurring expense as actual database records.
+    Return the last date materialization should cover for an expense.
+
+    Prioritize the passed end_date, then the expense's end_date,
+    otherwise default to one year from today.
+    """
+    if end_date is None:
+        end_date = expense.end_date or (date.today() + timedelta(days=365))
+    return end_date
+
+
+def materialization_dates(expense, end_date=None, after=None):
+    """
+    Compute the dates a recurring expense should be materialized on.
 
     Args:
         expense: The parent recurring expense
         end_date: Optional end date to limit materialization (defaults to specified expense end date)
+        after: Optional date to resume after, such as the series watermark;
+            by default materialization starts after the next occurrence
 
     Returns:
-        list: Newly created materialized expenses
+        list: Occurrence dates in ascending order
     """
-    if not expense.recurring:
-        return []
-
     # Skip if no valid frequency
-    freq_days = expense.get_frequency_days()
-    if not freq_days:
+    rule = compiled_rule(expense)
+    if rule is None:
         return []
 
-    # Determine materialization period
-    today = date.today()
     # Default start date is the expense date itself
     start_date = expense.date
 
@@ -32,97 +43,276 @@ def materialize_expense(expense, end_date=None):
     if expense.start_date and expense.start_date > start_date:
         start_date = expense.start_date
 
-    # If start date is in the past, move to the first future occurrence
-    if start_date < today:
-        # For monthly recurring, find the next occurrence
-        # by adding months while preserving the day of the month
-        if freq_days < 0:
-            months_to_add = (
-                (today.year - start_date.year) * 12
-                + (today.month - start_date.month)
-                + (1 if today.day > start_date.day else 0)
-            )
-            start_date = start_date + relativedelta(months=months_to_add)
-        else:
-            # Calculate how many periods have passed
-            days_passed = (today - start_date).days
-            periods_passed = (days_passed // abs(freq_days)) + 1
-
-            # Move start date to next occurrence
-            start_date = start_date + timedelta(days=periods_passed * abs(freq_days))
-
-    # Prioritize the passed end_date, then the expense's end_date,
-    # otherwise default to one year from today
-    if end_date is None:
-        end_date = expense.end_date or (today + timedelta(days=365))
+    if after is not None:
+        # Resume the schedule right after the watermark
+        first_index = max(rule.index_after(start_date, after), 0)
+    else:
+        # Start at the first occurrence AFTER the start date, jumping
+        # straight to the next one from today if the start is in the past
+        first_index = max(rule.index_on_or_after(start_date, date.today()), 1)
+
+    end_date = materialization_end(expense, end_date)
 
-    # Find existing materialized instances to avoid duplicates
-    existing_dates = set()
-    for instance in Expense.query.filter_by(
-        user_id=expense.user_id, parent_expense_id=expense.id
-    ).all():
-        existing_dates.add(instance.date)
+    # Never duplicate the parent expense's own date
+    return [
+        current_date
+        for current_date in rule.dates(start_date, first_index, end_date)
+        if current_date != expense.date
+    ]
 
-    # Make sure we don't duplicate the parent expense's date
-    existing_dates.add(expense.date)
+
+def materialization_rows(expense, dates, now=None):
+    """
+    Build the column values for materialized instances of an expense.
+
+    Args:
+        expense: The parent recurring expense (must already have an id)
+        dates: Occurrence dates to build rows for
+        now: Timestamp for created_at/updated_at (defaults to utcnow)
+
+    Returns:
+        list: One dict of Expense column values per date
+    """
+    now = now or datetime.utcnow()
 
     # Calculate the initial due date offset
     due_date_offset = None
     if expense.due_date:
         due_date_offset = expense.due_date - expense.date
 
-    # Generate occurrences
-    materialized_expenses = []
-    # Start at the first occurrence AFTER the expense date
-    current_date = start_date
+    return [
+        {
+            "date": occurrence_date,
+            # Calculate due date dynamically if offset exists
+            "due_date": (
+                occurrence_date + due_date_offset
+                if due_date_offset is not None
+                else None
+            ),
+            "start_date": None,  # Materialized instances don't need their own start/end dates
+            "end_date": None,
+            "parent_expense_id": expense.id,  # Link to the parent expense
+            "category_id": expense.category_id,
+            "description": expense.description,
+            "amount": expense.amount,
+            "paid": False,  # New instances are unpaid by default
+            "recurring": False,  # Materialized instances are not recurring themselves
+            "user_id": expense.user_id,
+            # Identical timestamps mark the instance as not manually modified
+            "created_at": now,
+            "updated_at": now,
+        }
+        for occurrence_date in dates
+    ]
 
-    # Increment for the first occurrence
-    if freq_days > 0:
-        # For regular frequency, add standard timedelta
-        current_date += timedelta(days=abs(freq_days))
-    else:
-        # For monthly, add a month while preserving the day
-        current_date += relativedelta(months=abs(freq_days))
-
-    while current_date <= end_date:
-        # Skip if this date already has an instance
-        if current_date in existing_dates:
-            # Increment based on frequency type
-            if freq_days > 0:
-                current_date += timedelta(days=abs(freq_days))
-            else:
-                current_date += relativedelta(months=abs(freq_days))
+
+def insert_materialized_rows(rows):
+    """
+    Insert materialized instances in one executemany, skipping existing ones.
+
+    The unique (parent_expense_id, date) constraint makes the database drop
+    occurrences that already exist, so no existing rows need to be loaded.
+
+    Args:
+        rows: Dicts from materialization_rows
+
+    Returns:
+        int: Number of rows actually inserted
+    """
+    if not rows:
+        return 0
+
+    statement = insert(Expense).on_conflict_do_nothing(
+        index_elements=["parent_expense_id", "date"]
+    )
+    result = db.session.execute(
+        statement, rows, execution_options={"dml_strategy": "raw"}
+    )
+    return result.rowcount
+
+
+def bulk_materialize_expenses(expenses, end_date=None):
+    """
+    Materialize several recurring expenses with a single bulk INSERT.
+
+    Args:
+        expenses: Parent recurring expenses (must already be flushed)
+        end_date: Optional end date to limit materialization
+
+    Returns:
+        int: Number of newly created materialized expenses
+    """
+    now = datetime.utcnow()
+    rows = []
+    for expense in expenses:
+        rows.extend(
+            materialization_rows(expense, materialization_dates(expense, end_date), now)
+        )
+
+        # Move the watermark so the horizon job resumes from here
+        through = materialization_end(expense, end_date)
+        if expense.materialized_through is None or expense.materialized_through < through:
+            expense.materialized_through = through
+
+    return insert_materialized_rows(rows)
+
+
+def extend_materialization(expenses, through):
+    """
+    Extend recurring expenses from their watermarks up to a horizon.
+
+    Only dates after each series' materialized_through watermark are
+    generated, so existing instances are never rescanned, and running this
+    again with the same horizon inserts nothing.
+
+    Args:
+        expenses: Parent recurring expenses
+        through: Last date to materialize
+
+    Returns:
+        int: Number of newly created materialized expenses
+    """
+    now = datetime.utcnow()
+    rows = []
+    extended_ids = []
+
+    for expense in expenses:
+        last = min(through, expense.end_date) if expense.end_date else through
+        if expense.materialized_through is not None and expense.materialized_through >= last:
             continue
 
-        # Calculate due date dynamically if offset exists
-        dynamic_due_date = None
-        if due_date_offset is not None:
-            dynamic_due_date = current_date + due_date_offset
-
-        # Create the materialized expense instance
-        materialized_expense = Expense(
-            date=current_date,
-            due_date=dynamic_due_date,  # Dynamically calculated due date
-            start_date=None,  # Materialized instances don't need their own start/end dates
-            end_date=None,
-            parent_expense_id=expense.id,  # Link to the parent expense
-            category=expense.category,
+        # Series that were never materialized start from today
+        after = expense.materialized_through or (date.today() - timedelta(days=1))
+        dates = materialization_dates(expense, last, after=after)
+        rows.extend(materialization_rows(expense, dates, now))
+        extended_ids.append(expense.id)
+
+    inserted = insert_materialized_rows(rows)
+
+    if extended_ids:
+        # Advancing the watermark is bookkeeping, not an edit of the series,
+        # so updated_at is kept as it was
+        db.session.execute(
+            update(Expense)
+            .where(Expense.id.in_(extended_ids))
+            .values(materialized_through=through, updated_at=Expense.updated_at),
+            execution_options={"synchronize_session": False},
+        )
+
+    return inserted
+
+
+def series_behind_horizon(user_id, through):
+    """
+    Load a user's recurring parents whose watermark is short of a horizon.
+
+    Args:
+        user_id: Owner of the series
+        through: The horizon date
+
+    Returns:
+        list: Parent expenses that extend_materialization would add rows to
+    """
+    return Expense.query.filter(
+        Expense.user_id == user_id,
+        Expense.recurring == True,
+        Expense.parent_expense_id == None,
+        or_(
+            Expense.materialized_through == None,
+            Expense.materialized_through < through,
+        ),
+        or_(
+            Expense.end_date == None,
+            Expense.materialized_through == None,
+            Expense.end_date > Expense.materialized_through,
+        ),
+    ).all()
+
+
+def unmodified_future_instances(expense):
+    """Filter for future instances of a series that were never edited by hand"""
+    return and_(
+        Expense.parent_expense_id == expense.id,
+        Expense.date >= date.today(),
+        Expense.updated_at == Expense.created_at,
+    )
+
+
+def update_future_instances(expense):
+    """
+    Copy a recurring parent's details to its unmodified future instances.
+
+    Runs as one UPDATE. Both timestamps are refreshed together so the
+    instances still count as unmodified afterwards.
+
+    Args:
+        expense: The recurring parent expense
+
+    Returns:
+        int: Number of instances updated
+    """
+    now = datetime.utcnow()
+    result = db.session.execute(
+        update(Expense)
+        .where(unmodified_future_instances(expense))
+        .values(
             category_id=expense.category_id,
             description=expense.description,
             amount=expense.amount,
-            paid=False,  # New instances are unpaid by default
-            recurring=False,  # Materialized instances are not recurring themselves
-            user_id=expense.user_id,
+            created_at=now,
+            updated_at=now,
+        ),
+        execution_options={"synchronize_session": False},
+    )
+    return result.rowcount
+
+
+def propagate_series_edit(expense, schedule_changed=False):
+    """
+    Push a recurring parent's edits to its future materialized instances.
+
+    Unmodified future instances are updated in place. If the schedule
+    changed, the ones no longer on it are removed with one DELETE and the
+    missing dates are added with one bulk INSERT. Instances edited by hand
+    are left alone either way.
+
+    Args:
+        expense: The recurring parent expense, already flushed
+        schedule_changed: True if the date, start/end dates or frequency changed
+
+    Returns:
+        int: Number of newly created materialized expenses
+    """
+    update_future_instances(expense)
+
+    # Keep covering the horizon the series was already materialized to
+    end_date = materialization_end(expense)
+    if expense.materialized_through and expense.materialized_through > end_date:
+        end_date = expense.materialized_through
+        if expense.end_date and expense.end_date < end_date:
+            end_date = expense.end_date
+
+    if schedule_changed:
+        dates = materialization_dates(expense, end_date)
+        db.session.execute(
+            delete(Expense).where(
+                unmodified_future_instances(expense), Expense.date.notin_(dates)
+            ),
+            execution_options={"synchronize_session": False},
         )
-        db.session.add(materialized_expense)
-        materialized_expenses.append(materialized_expense)
-
-        # Increment for the next occurrence
-        if freq_days > 0:
-            # For regular frequency, add standard timedelta
-            current_date += timedelta(days=abs(freq_days))
-        else:
-            # For monthly, add a month while preserving the day
-            current_date += relativedelta(months=abs(freq_days))
-
-    return materialized_expenses
+
+    return bulk_materialize_expenses([expense], end_date)
+
+
+def materialize_expense(expense, end_date=None):
+    """
+    Materialize a single recurring expense as actual database records.
+
+    Args:
+        expense: The parent recurring expense
+        end_date: Optional end date to limit materialization (defaults to specified expense end date)
+
+    Returns:
+        int: Number of newly created materialized expenses
+    """
+    return bulk_materialize_expenses([expense], end_date)
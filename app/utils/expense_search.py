@@ -0,0 +1,213 @@
+# app/utils/expense_search.py
+
+import re
+
+from sqlalchemy import DDL, column, event, func, select, table, text
+
+from app import db
+from app.models import Expense
+
+FTS_TABLE = "expense_fts"
+
+# Expenses indexed per statement when rebuilding the index
+REBUILD_BATCH_SIZE = 5000
+
+# Description matches count for more than category matches when ranking
+DESCRIPTION_WEIGHT = 2.0
+CATEGORY_WEIGHT = 1.0
+
+# The index keeps its own copy of each expense's description and category
+# name, since the name lives in expense_category. Triggers keep it in step
+# with every write to expense, including bulk inserts and raw SQL that ORM
+# events would not see, and with category renames. The prefix indexes make
+# 2 and 3 character prefix queries cheap.
+SEARCH_INDEX_DDL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        description, category,
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON expense BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, description, category)
+        VALUES (
+            new.id,
+            new.description,
+            (SELECT name FROM expense_category WHERE id = new.category_id)
+        );
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON expense BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF description, category_id ON expense BEGIN
+        UPDATE {FTS_TABLE}
+        SET description = new.description,
+            category = (SELECT name FROM expense_category WHERE id = new.category_id)
+        WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_category_au
+    AFTER UPDATE OF name ON expense_category BEGIN
+        UPDATE {FTS_TABLE} SET category = new.name
+        WHERE rowid IN (
+            SELECT id FROM expense
+            WHERE user_id = new.user_id AND category_id = new.id
+        );
+    END""",
+)
+DROP_SEARCH_INDEX_DDL = tuple(
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}"
+    for suffix in ("ai", "ad", "au", "category_au")
+) + (f"DROP TABLE IF EXISTS {FTS_TABLE}",)
+
+expense_fts = table(FTS_TABLE, column("rowid"), column(FTS_TABLE))
+
+
+def create_search_index(connection):
+    """Create the FTS5 table and its triggers if they don't exist yet
+
+    A newly created index is empty; fill it with rebuild_search_index.
+    """
+    for statement in SEARCH_INDEX_DDL:
+        connection.execute(text(statement))
+
+
+def drop_search_index(connection):
+    """Drop the FTS5 table and its triggers"""
+    for statement in DROP_SEARCH_INDEX_DDL:
+        connection.execute(text(statement))
+
+
+# New databases get the index along with the expense table
+for _statement in SEARCH_INDEX_DDL:
+    event.listen(
+        Expense.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite")
+    )
+for _statement in DROP_SEARCH_INDEX_DDL:
+    event.listen(
+        Expense.__table__, "before_drop", DDL(_statement).execute_if(dialect="sqlite")
+    )
+
+
+def rebuild_search_index(connection, batch_size=REBUILD_BATCH_SIZE, report=None):
+    """Reindex every expense from scratch
+
+    Rows are copied in id order, batch_size per statement. Everything runs
+    in the caller's transaction, so searches never see a half-built index
+    and writes to expense wait until the rebuild is committed.
+
+    Args:
+        connection: Connection to run the statements on
+        batch_size: Expenses indexed per statement
+        report: Optional callable given the running count after each batch
+
+    Returns:
+        int: Number of expenses indexed
+    """
+    connection.execute(text(f"DELETE FROM {FTS_TABLE}"))
+
+    indexed = 0
+    last_id = 0
+    while True:
+        ids = (
+            connection.execute(
+                select(Expense.id)
+                .where(Expense.id > last_id)
+                .order_by(Expense.id)
+                .limit(batch_size)
+            )
+            .scalars()
+            .all()
+        )
+        if not ids:
+            break
+
+        connection.execute(
+            text(
+                f"INSERT INTO {FTS_TABLE}(rowid, description, category) "
+                "SELECT expense.id, expense.description, expense_category.name "
+                "FROM expense LEFT JOIN expense_category "
+                "ON expense_category.id = expense.category_id "
+                "WHERE expense.id BETWEEN :first AND :last"
+            ),
+            {"first": ids[0], "last": ids[-1]},
+        )
+        indexed += len(ids)
+        last_id = ids[-1]
+        if report is not None:
+            report(indexed)
+
+    return indexed
+
+
+def fts_query(search_text):
+    """Turn free text into an FTS5 query matching every word as a prefix
+
+    Each word is quoted, so FTS5 operators and punctuation typed by the
+    user are searched for literally rather than parsed.
+
+    Returns:
+        str or None: The MATCH expression, or None if there are no words
+    """
+    words = re.findall(r"\w+", search_text or "")
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def matching_expense_ids(search_text):
+    """SELECT of the ids of expenses matching free text, for use in IN (...)"""
+    return select(expense_fts.c.rowid).where(
+        expense_fts.c[FTS_TABLE].match(fts_query(search_text))
+    )
+
+
+def search_occurrences(occurrences, search_text):
+    """Occurrences expanded from series whose row matches free text
+
+    Occurrences copy the description and category of their series' row,
+    so they match exactly when that row does.
+    """
+    parent_ids = {occurrence.parent_expense_id for occurrence in occurrences}
+    if not parent_ids:
+        return []
+    matched = set(
+        db.session.scalars(
+            matching_expense_ids(search_text).where(
+                expense_fts.c.rowid.in_(parent_ids)
+            )
+        )
+    )
+    return [
+        occurrence
+        for occurrence in occurrences
+        if occurrence.parent_expense_id in matched
+    ]
+
+
+def search_rank():
+    """bm25 relevance of the current match; lower is more relevant"""
+    return func.bm25(
+        expense_fts.c[FTS_TABLE], DESCRIPTION_WEIGHT, CATEGORY_WEIGHT
+    )
+
+
+def search_statement(statement, search_text):
+    """Narrow an expense SELECT to rows matching free text, best match first
+
+    Args:
+        statement: A SELECT over expense columns, e.g. an expense_statement
+        search_text: What the user typed
+
+    Returns:
+        Select: The statement joined to the index, with a "rank" column
+        and ordered by it (ties by newest date)
+    """
+    matches = (
+        select(expense_fts.c.rowid.label("id"), search_rank().label("rank"))
+        .where(expense_fts.c[FTS_TABLE].match(fts_query(search_text)))
+        .subquery()
+    )
+    return (
+        statement.join(matches, matches.c.id == Expense.id)
+        .add_columns(matches.c.rank)
+        .order_by(matches.c.rank, Expense.date.desc(), Expense.id.desc())
+    )
@@ -0,0 +1,222 @@
+# app/utils/expense_series.py
+
+from datetime import date, timedelta
+
+from flask import current_app
+from sqlalchemy import or_
+
+from app import db
+from app.models import Expense, ExpenseOverride
+from app.utils.recurrence import compiled_rule
+from app.utils.recurring_expense_generator import RecurringOccurrence
+
+
+def series_storage_enabled():
+    """Return True when recurring expenses are expanded on read"""
+    return current_app.config.get("RECURRING_EXPENSE_STORAGE") == "series"
+
+
+def occurrence_dates(expense, start_date, end_date):
+    """Yield the dates a recurring expense occurs on within a range
+
+    The parent row itself is the first occurrence, so only later ones are
+    produced. Each date is computed from the parent date rather than from
+    the previous occurrence, so monthly series keep their day of month.
+
+    Args:
+        expense: The recurring parent expense
+        start_date: First day of the range
+        end_date: Last day of the range
+
+    Yields:
+        date: Occurrence dates in ascending order
+    """
+    rule = compiled_rule(expense)
+    if rule is None:
+        return
+
+    first = max(start_date, expense.start_date or expense.date)
+    last = min(end_date, expense.end_date) if expense.end_date else end_date
+
+    # Jump straight to the first occurrence in range
+    first_index = max(rule.index_on_or_after(expense.date, first), 1)
+    yield from rule.dates(expense.date, first_index, last)
+
+
+def is_occurrence(expense, occurrence_date):
+    """Return True if the recurring expense occurs on the given date"""
+    return any(
+        current == occurrence_date
+        for current in occurrence_dates(expense, occurrence_date, occurrence_date)
+    )
+
+
+def build_occurrence(expense, occurrence_date, override=None):
+    """Build the RecurringOccurrence for one occurrence of a series
+
+    The override's amount and paid flag, where set, replace the series'.
+    """
+    due_date = None
+    if expense.due_date:
+        due_date = occurrence_date + (expense.due_date - expense.date)
+
+    amount = expense.amount
+    paid = False
+    if override is not None:
+        if override.amount is not None:
+            amount = override.amount
+        if override.paid is not None:
+            paid = override.paid
+
+    return RecurringOccurrence(
+        date=occurrence_date,
+        due_date=due_date,
+        amount=amount,
+        category_id=expense.category_id,
+        description=expense.description,
+        paid=paid,
+        parent_expense_id=expense.id,
+        user_id=expense.user_id,
+    )
+
+
+def expand_occurrences(user_id, start_date, end_date):
+    """Expand a user's recurring series into occurrences within a range
+
+    Dates that already have a stored instance (for example rows created
+    before switching to series storage) and skipped dates are left out.
+
+    Args:
+        user_id: User whose series to expand
+        start_date: First day of the range
+        end_date: Last day of the range
+
+    Returns:
+        list: RecurringOccurrence objects ordered by date
+    """
+    parents = (
+        Expense.query.filter_by(
+            user_id=user_id, recurring=True, parent_expense_id=None
+        )
+        .filter(
+            Expense.date <= end_date,
+            or_(Expense.end_date == None, Expense.end_date >= start_date),
+        )
+        .all()
+    )
+    if not parents:
+        return []
+
+    parent_ids = [parent.id for parent in parents]
+
+    overrides = {
+        (override.parent_expense_id, override.date): override
+        for override in ExpenseOverride.query.filter(
+            ExpenseOverride.parent_expense_id.in_(parent_ids),
+            ExpenseOverride.date >= start_date,
+            ExpenseOverride.date <= end_date,
+        )
+    }
+
+    stored = set(
+        db.session.query(Expense.parent_expense_id, Expense.date)
+        .filter(
+            Expense.parent_expense_id.in_(parent_ids),
+            Expense.date >= start_date,
+            Expense.date <= end_date,
+        )
+        .all()
+    )
+
+    occurrences = []
+    for parent in parents:
+        for occurrence_date in occurrence_dates(parent, start_date, end_date):
+            key = (parent.id, occurrence_date)
+            if key in stored:
+                continue
+
+            override = overrides.get(key)
+            if override is not None and override.skipped:
+                continue
+
+            occurrences.append(build_occurrence(parent, occurrence_date, override))
+
+    occurrences.sort(key=lambda occurrence: occurrence.date)
+    return occurrences
+
+
+def filter_occurrences(occurrences, category_id=None, paid_status="all"):
+    """Apply the /expenses list filters to expanded occurrences
+
+    Args:
+        occurrences: RecurringOccurrence objects from expand_occurrences
+        category_id: Category to keep, or None/0 for all
+        paid_status: One of all, paid, unpaid, overdue, due_soon
+
+    Returns:
+        list: The matching occurrences
+    """
+    today = date.today()
+    matching = []
+
+    for occurrence in occurrences:
+        if category_id and occurrence.category_id != category_id:
+            continue
+
+        if paid_status == "paid" and not occurrence.paid:
+            continue
+        if paid_status == "unpaid" and occurrence.paid:
+            continue
+        if paid_status == "overdue" and (
+            occurrence.paid
+            or not occurrence.due_date
+            or occurrence.due_date >= today
+        ):
+            continue
+        if paid_status == "due_soon" and (
+            occurrence.paid
+            or not occurrence.due_date
+            or not today <= occurrence.due_date <= today + timedelta(days=7)
+        ):
+            continue
+
+        matching.append(occurrence)
+
+    return matching
+
+
+def set_occurrence_override(expense, occurrence_date, **changes):
+    """Create or update the override for one occurrence of a series
+
+    Args:
+        expense: The recurring parent expense
+        occurrence_date: Date of the occurrence to change
+        **changes: Any of paid, amount and skipped
+
+    Returns:
+        ExpenseOverride: The override, added to the session but not committed
+
+    Raises:
+        ValueError: If the expense does not occur on occurrence_date
+    """
+    if not is_occurrence(expense, occurrence_date):
+        raise ValueError(
+            f"Expense {expense.id} has no occurrence on {occurrence_date.isoformat()}"
+        )
+
+    override = ExpenseOverride.query.filter_by(
+        parent_expense_id=expense.id, date=occurrence_date
+    ).first()
+    if override is None:
+        override = ExpenseOverride(
+            parent_expense_id=expense.id,
+            date=occurrence_date,
+            user_id=expense.user_id,
+        )
+        db.session.add(override)
+
+    for field in ("paid", "amount", "skipped"):
+        if field in changes:
+            setattr(override, field, changes[field])
+
+    return override
@@ -0,0 +1,57 @@
+# app/utils/money.py
+
+from decimal import Decimal
+
+from sqlalchemy import Integer, type_coerce
+from sqlalchemy.types import TypeDecorator
+
+CENTS = 100
+
+
+def to_cents(amount):
+    """Convert a dollar amount to integer cents
+
+    Rounds half away from zero, like SQLite's ROUND(), so values converted
+    here and by the migration agree.
+
+    Args:
+        amount: int, float or Decimal dollars, or None
+
+    Returns:
+        int or None: The amount in cents
+    """
+    if amount is None:
+        return None
+    cents = amount * CENTS
+    if isinstance(cents, int):
+        return cents
+    half = Decimal("0.5") if isinstance(cents, Decimal) else 0.5
+    return int(cents + half) if cents >= 0 else int(cents - half)
+
+
+def from_cents(cents):
+    """Convert integer cents to float dollars (None stays None)"""
+    return cents / CENTS if cents is not None else None
+
+
+class Money(TypeDecorator):
+    """Dollar amount stored as integer cents
+
+    Python code keeps reading and writing dollars, but the column holds
+    exact cents, so comparisons and SUM() in SQL are integer arithmetic and
+    an aggregate is converted to dollars once, not per row.
+    """
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return to_cents(value)
+
+    def process_result_value(self, value, dialect):
+        return from_cents(value)
+
+
+def cents(column):
+    """A Money column as its raw integer cents, for exact sums in Python"""
+    return type_coerce(column, Integer)
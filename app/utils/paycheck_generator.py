@@ -1,8 +1,88 @@
 # app/utils/paycheck_generator.py
 
+from calendar import monthrange
 from datetime import datetime, timedelta, date
 from app.models import SalaryProjection, Paycheck
+from sqlalchemy import delete, insert, select, update
 from app import db
+from app.utils.recurrence import MONTHS, RecurrenceRule, rule_for_days
+from app.utils.salary_index import SalaryIndex
+
+
+# Named pay schedules accepted as a frequency besides a number of days
+SEMI_MONTHLY = "semi-monthly"
+MONTHLY = "monthly"
+LAST_BUSINESS_DAY = "last-business-day"
+
+PAY_SCHEDULES = {
+    SEMI_MONTHLY: 24,
+    MONTHLY: 12,
+    LAST_BUSINESS_DAY: 12,
+}
+
+
+def parse_pay_frequency(value):
+    """Parse a pay frequency from a form value
+
+    Args:
+        value: A number of days between paychecks or a PAY_SCHEDULES name
+
+    Returns:
+        int or str: Days between paychecks, or the schedule name
+
+    Raises:
+        ValueError: If the value is neither
+    """
+    if isinstance(value, int):
+        frequency = value
+    elif str(value).strip().isdigit():
+        frequency = int(value)
+    elif value in PAY_SCHEDULES:
+        return value
+    else:
+        raise ValueError(f"Unknown pay frequency: {value}")
+
+    if frequency < 1:
+        raise ValueError(f"Unknown pay frequency: {value}")
+    return frequency
+
+
+def periods_per_year(frequency):
+    """Return how many paychecks a frequency produces in a year"""
+    if frequency in PAY_SCHEDULES:
+        return PAY_SCHEDULES[frequency]
+    return max(1, round(365 / frequency))
+
+
+def _last_day_of_month(year, month):
+    return date(year, month, monthrange(year, month)[1])
+
+
+def _month_dates(start_date, end_date, dates_in_month):
+    """Yield the dates a per-month schedule produces within a range
+
+    Walks month indexes (year * 12 + month) from the range's first month to
+    its last, so the cost is one step per month regardless of the anchor.
+    """
+    first = start_date.year * 12 + start_date.month - 1
+    last = end_date.year * 12 + end_date.month - 1
+    for index in range(first, last + 1):
+        year, month = divmod(index, 12)
+        for pay_date in dates_in_month(year, month + 1):
+            if start_date <= pay_date <= end_date:
+                yield pay_date
+
+
+def _semi_monthly_dates(year, month):
+    """The 15th and the last day of the month"""
+    return (date(year, month, 15), _last_day_of_month(year, month))
+
+
+def _last_business_day(year, month):
+    """The last weekday of the month (holidays are not accounted for)"""
+    last_day = _last_day_of_month(year, month)
+    # Saturday (5) moves back one day, Sunday (6) two
+    return (last_day - timedelta(days=max(0, last_day.weekday() - 4)),)
 
 
 def generate_paycheck_dates(start_date, end_date, first_paycheck_date, frequency=14):
@@ -12,33 +92,51 @@ def generate_paycheck_dates(start_date, end_date, first_paycheck_date, frequency
         start_date: Starting date range
         end_date: Ending date range
         first_paycheck_date: Date of the first paycheck to anchor the schedule
-        frequency: Days between paychecks (14 for biweekly)
+        frequency: Days between paychecks (14 for biweekly), or one of
+            "semi-monthly" (15th and last day), "monthly" (the anchor's day of
+            the month) and "last-business-day"
 
     Returns:
         list: List of paycheck dates within the range
     """
-    paycheck_dates = []
+    if frequency == SEMI_MONTHLY:
+        return list(_month_dates(start_date, end_date, _semi_monthly_dates))
+    if frequency == LAST_BUSINESS_DAY:
+        return list(_month_dates(start_date, end_date, _last_business_day))
 
-    # Calculate all possible paychecks based on the first date
-    current_date = first_paycheck_date
+    if frequency == MONTHLY:
+        rule = RecurrenceRule(MONTHS, 1)
+    else:
+        rule = rule_for_days(frequency)
 
-    # Generate backward if needed
-    if first_paycheck_date > start_date:
-        backwards_date = first_paycheck_date
-        while True:
-            backwards_date = backwards_date - timedelta(days=frequency)
-            if backwards_date < start_date:
-                break
-            # Insert at the beginning to maintain chronological order
-            paycheck_dates.insert(0, backwards_date)
+    # Jump straight to the first paycheck in range, before or after the anchor
+    return list(rule.dates_between(first_paycheck_date, start_date, end_date))
 
-    # Generate forward
-    while current_date <= end_date:
-        if current_date >= start_date:  # Only include dates in our range
-            paycheck_dates.append(current_date)
-        current_date = current_date + timedelta(days=frequency)
 
-    return paycheck_dates
+def infer_pay_frequency(pay_dates):
+    """Work out which schedule a run of consecutive paycheck dates follows
+
+    Args:
+        pay_dates: Dates of a user's consecutive Regular paychecks
+
+    Returns:
+        int or str or None: Days between paychecks or a PAY_SCHEDULES name,
+            or None if there are fewer than two dates or no schedule fits
+    """
+    pay_dates = sorted(set(pay_dates))
+    if len(pay_dates) < 2:
+        return None
+
+    # Named schedules pin specific days of the month, so try them first
+    first, last = pay_dates[0], pay_dates[-1]
+    for schedule in (SEMI_MONTHLY, LAST_BUSINESS_DAY, MONTHLY):
+        if generate_paycheck_dates(first, last, first, schedule) == pay_dates:
+            return schedule
+
+    gaps = {(later - earlier).days for earlier, later in zip(pay_dates, pay_dates[1:])}
+    if len(gaps) == 1:
+        return gaps.pop()
+    return None
 
 
 def find_applicable_salary(date, salary_projections):
@@ -46,25 +144,24 @@ def find_applicable_salary(date, salary_projections):
 
     Args:
         date: The date to check
-        salary_projections: List of SalaryProjection objects
+        salary_projections: A SalaryIndex, or a list of SalaryProjection objects
 
     Returns:
-        SalaryProjection or None: The applicable salary projection
+        SalaryProjection or None: The applicable salary projection, following
+            the precedence rules of SalaryIndex for overlapping projections
     """
-    for projection in salary_projections:
-        start_date = projection.start_date
-        end_date = (
-            projection.end_date or datetime(2099, 12, 31).date()
-        )  # Far future if no end date
-
-        if start_date <= date <= end_date:
-            return projection
-
-    return None
+    if not isinstance(salary_projections, SalaryIndex):
+        salary_projections = SalaryIndex(salary_projections)
+    return salary_projections.find(date)
 
 
 def create_salary_paychecks(
-    user_id, first_paycheck_date, end_date=None, frequency=14, force_regenerate=False
+    user_id,
+    first_paycheck_date,
+    end_date=None,
+    frequency=14,
+    force_regenerate=False,
+    backfill_days=365,
 ):
     """Generate paychecks with automatic salary adjustments.
 
@@ -72,18 +169,30 @@ def create_salary_paychecks(
         user_id: User ID
         first_paycheck_date: Date of the first paycheck
         end_date: End date for generating paychecks (optional, defaults to 1 year ahead)
-        frequency: Days between paychecks (default 14 for biweekly)
-        force_regenerate: If True, regenerate even if paychecks exist
+        frequency: Days between paychecks (default 14 for biweekly) or a
+            named schedule from PAY_SCHEDULES
+        force_regenerate: If True, bring existing paychecks from
+            first_paycheck_date to end_date in line with the schedule instead
+            of refusing to run
+        backfill_days: How far before first_paycheck_date to fill in
+            missing paychecks (0 to start at first_paycheck_date)
+
+    Only the differences are written, all in a single transaction: paychecks
+    missing from the schedule are inserted and, when forced, ones with
+    outdated amounts are updated and ones off the schedule are deleted.
+    Paychecks before first_paycheck_date are never changed; schedule dates
+    in the backfill_days before it are only inserted where no paycheck
+    exists.
 
     Returns:
-        tuple: (success, message, list of created paychecks)
+        tuple: (success, message, summary of changes from diff_paychecks)
     """
     # Validate inputs
     if not isinstance(first_paycheck_date, (datetime, date)):
         try:
             first_paycheck_date = datetime.strptime(first_paycheck_date, "%Y-%m-%d").date()
         except:
-            return False, "Invalid first paycheck date format", []
+            return False, "Invalid first paycheck date format", {}
 
     if isinstance(first_paycheck_date, datetime):
         first_paycheck_date = first_paycheck_date.date()
@@ -95,11 +204,16 @@ def create_salary_paychecks(
         try:
             end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
         except:
-            return False, "Invalid end date format", []
+            return False, "Invalid end date format", {}
 
     if isinstance(end_date, datetime):
         end_date = end_date.date()
 
+    try:
+        frequency = parse_pay_frequency(frequency)
+    except ValueError as e:
+        return False, str(e), {}
+
     # Get all salary projections for the user, ordered by start date
     salary_projections = (
         SalaryProjection.query.filter_by(user_id=user_id)
@@ -108,7 +222,7 @@ def create_salary_paychecks(
     )
 
     if not salary_projections:
-        return False, "No salary projections found for this user", []
+        return False, "No salary projections found for this user", {}
 
     # Determine the earliest and latest possible dates
     earliest_date = min(proj.start_date for proj in salary_projections)
@@ -118,31 +232,21 @@ def create_salary_paychecks(
 
     # Adjust start and end dates based on projections
     start_date = max(
-        earliest_date, first_paycheck_date - timedelta(days=365)
-    )  # Allow back-calculation up to a year
+        earliest_date, first_paycheck_date - timedelta(days=backfill_days)
+    )  # Allow back-calculation, up to a year by default
     end_date = min(latest_date, end_date)
 
     # Check if we already have paychecks in this date range and not forcing regeneration
-    # Handle existing paychecks in this date range
-    existing_paychecks = (
-        Paycheck.query.filter_by(user_id=user_id, pay_type="Regular")
-        .filter(Paycheck.date >= first_paycheck_date, Paycheck.date <= end_date)
-        .all()
-    )
-    
-    if existing_paychecks:
-        if force_regenerate:
-            # Delete existing paychecks if forcing regeneration
-            for paycheck in existing_paychecks:
-                db.session.delete(paycheck)
-            try:
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                return False, f"Error deleting existing paychecks: {str(e)}", []
-        else:
+    if not force_regenerate:
+        already_generated = (
+            db.session.query(Paycheck.id)
+            .filter_by(user_id=user_id, pay_type="Regular")
+            .filter(Paycheck.date >= first_paycheck_date, Paycheck.date <= end_date)
+            .first()
+        )
+        if already_generated:
             # Don't proceed if we have existing paychecks and not forcing regeneration
-            return False, "Paychecks already exist in this date range", []
+            return False, "Paychecks already exist in this date range", {}
 
     # Generate paycheck dates
     paycheck_dates = generate_paycheck_dates(
@@ -150,40 +254,150 @@ def create_salary_paychecks(
     )
 
     if not paycheck_dates:
-        return False, "No paycheck dates were generated for the given range", []
-
-    # Create paychecks with the right salary for each date
-    created_paychecks = []
+        return False, "No paycheck dates were generated for the given range", {}
 
+    # Work out the amounts of every paycheck the schedule should have
+    salary_index = SalaryIndex(salary_projections)
+    pay_periods = periods_per_year(frequency)
+    desired = {}
     for pay_date in paycheck_dates:
         # Find the applicable salary for this date
-        salary = find_applicable_salary(pay_date, salary_projections)
+        salary = salary_index.find(pay_date)
 
         if not salary:
             continue  # Skip dates that don't have a salary projection
 
-        gross_biweekly = salary.calculate_biweekly_gross()
-        net_biweekly = salary.calculate_biweekly_net()
-
-        paycheck = Paycheck(
-            date=pay_date,
-            pay_type="Regular",
-            gross_amount=gross_biweekly,
-            taxable_amount=gross_biweekly,  # Assuming all is taxable
-            non_taxable_amount=0,
-            net_amount=net_biweekly,
-            user_id=user_id,
+        gross_pay = salary.calculate_period_gross(pay_periods)
+        desired[pay_date] = {
+            "gross_amount": gross_pay,
+            "taxable_amount": gross_pay,  # Assuming all is taxable
+            "non_taxable_amount": 0,
+            "net_amount": salary.calculate_period_net(pay_periods),
+        }
+
+    # Only paychecks from the first paycheck date on are regenerated, and only
+    # when forced; the back-calculated window before it just fills in dates
+    # that have no Regular paycheck yet
+    scheduled = {
+        pay_date: amounts
+        for pay_date, amounts in desired.items()
+        if pay_date >= first_paycheck_date
+    }
+    existing_paychecks = []
+    if force_regenerate:
+        existing_paychecks = (
+            Paycheck.query.filter_by(user_id=user_id, pay_type="Regular")
+            .filter(Paycheck.date >= first_paycheck_date, Paycheck.date <= end_date)
+            .order_by(Paycheck.id)
+            .all()
         )
-        db.session.add(paycheck)
-        created_paychecks.append(paycheck)
+
+    summary = diff_paychecks(existing_paychecks, scheduled)
+
+    backfill_dates = set(desired) - set(scheduled)
+    if backfill_dates:
+        paid_dates = set(
+            db.session.scalars(
+                select(Paycheck.date)
+                .filter_by(user_id=user_id, pay_type="Regular")
+                .filter(Paycheck.date >= start_date, Paycheck.date < first_paycheck_date)
+            )
+        )
+        summary["inserted"] = sorted(backfill_dates - paid_dates) + summary["inserted"]
 
     try:
+        apply_paycheck_diff(user_id, desired, summary)
         db.session.commit()
-        return (
-            True,
-            f"Successfully created {len(created_paychecks)} paychecks",
-            created_paychecks,
-        )
     except Exception as e:
         db.session.rollback()
-        return False, f"Error creating paychecks: {str(e)}", []
+        return False, f"Error creating paychecks: {str(e)}", {}
+
+    return True, describe_paycheck_changes(summary), summary
+
+
+def _amounts_match(paycheck, amounts):
+    """Compare a stored paycheck with the wanted amounts to the cent"""
+    return all(
+        round(getattr(paycheck, column), 2) == round(value, 2)
+        for column, value in amounts.items()
+    )
+
+
+def diff_paychecks(existing_paychecks, desired):
+    """Diff stored Regular paychecks against the wanted schedule by date
+
+    Args:
+        existing_paychecks: Stored paychecks within the schedule's range
+        desired: Mapping of pay date to the wanted amount columns
+
+    Returns:
+        dict: Dates to insert, paychecks to update (id -> date), ids to
+            delete and the number of unchanged paychecks
+    """
+    summary = {"inserted": [], "updated": {}, "deleted": [], "unchanged": 0}
+
+    seen_dates = set()
+    for paycheck in existing_paychecks:
+        amounts = desired.get(paycheck.date)
+        if amounts is None or paycheck.date in seen_dates:
+            # Off the schedule, or a duplicate of a date already kept
+            summary["deleted"].append(paycheck.id)
+            continue
+
+        seen_dates.add(paycheck.date)
+        if _amounts_match(paycheck, amounts):
+            summary["unchanged"] += 1
+        else:
+            summary["updated"][paycheck.id] = paycheck.date
+
+    summary["inserted"] = sorted(set(desired) - seen_dates)
+    return summary
+
+
+def apply_paycheck_diff(user_id, desired, summary):
+    """Apply a paycheck diff with one bulk statement per kind of change"""
+    if summary["deleted"]:
+        db.session.execute(
+            delete(Paycheck).where(Paycheck.id.in_(summary["deleted"])),
+            execution_options={"synchronize_session": False},
+        )
+
+    if summary["updated"]:
+        db.session.execute(
+            update(Paycheck),
+            [
+                dict(desired[pay_date], id=paycheck_id)
+                for paycheck_id, pay_date in summary["updated"].items()
+            ],
+        )
+
+    if summary["inserted"]:
+        now = datetime.utcnow()
+        db.session.execute(
+            insert(Paycheck),
+            [
+                dict(
+                    desired[pay_date],
+                    date=pay_date,
+                    pay_type="Regular",
+                    user_id=user_id,
+                    created_at=now,
+                )
+                for pay_date in summary["inserted"]
+            ],
+        )
+
+
+def describe_paycheck_changes(summary):
+    """Build the flash message for a paycheck diff"""
+    if not (summary["inserted"] or summary["updated"] or summary["deleted"]):
+        return f"Paychecks are already up to date ({summary['unchanged']} unchanged)"
+
+    if not (summary["updated"] or summary["deleted"] or summary["unchanged"]):
+        return f"Successfully created {len(summary['inserted'])} paychecks"
+
+    return (
+        f"Paychecks updated: {len(summary['inserted'])} added, "
+        f"{len(summary['updated'])} changed, {len(summary['deleted'])} removed, "
+        f"{summary['unchanged']} unchanged"
+    )
@@ -0,0 +1,425 @@
+# app/utils/read_model.py
+
+import base64
+import json
+from collections import namedtuple
+from datetime import date
+from operator import attrgetter
+
+from sqlalchemy import and_, case, false, func, or_, select, true
+
+from app import db
+from app.models import BudgetRollup, Expense, ExpenseCategory, Paycheck
+from app.utils.category_cache import category_names
+from app.utils.money import cents, from_cents, to_cents
+
+# Columns the read-only views need; selecting them directly skips building
+# ORM entities and registering them in the session's identity map
+PAYCHECK_COLUMNS = (
+    Paycheck.id,
+    Paycheck.date,
+    Paycheck.pay_type,
+    Paycheck.gross_amount,
+    Paycheck.net_amount,
+)
+EXPENSE_COLUMNS = (
+    Expense.id,
+    Expense.user_id,
+    Expense.date,
+    Expense.due_date,
+    Expense.category_id,
+    Expense.description,
+    Expense.amount,
+    Expense.paid,
+    Expense.recurring,
+    Expense.parent_expense_id,
+)
+ROLLUP_COLUMNS = tuple(
+    column
+    for column in BudgetRollup.__table__.columns
+    if column.name not in ("id", "user_id")
+)
+
+
+# Name of an expense's category, for statements that must sort on it or
+# return it; rows loaded in bulk take it from the category name map instead
+CATEGORY_NAME = (
+    select(ExpenseCategory.name)
+    .where(ExpenseCategory.id == Expense.category_id)
+    .scalar_subquery()
+)
+
+
+class ExpenseRow(
+    namedtuple("ExpenseRow", [column.key for column in EXPENSE_COLUMNS] + ["category"])
+):
+    """Read-only expense row with the helpers templates call on an Expense"""
+
+    __slots__ = ()
+
+    days_until_due = Expense.days_until_due
+    status = Expense.status
+
+
+def expense_statement(user_id):
+    """SELECT of a user's expense columns, to be narrowed by the caller"""
+    return select(*EXPENSE_COLUMNS).where(Expense.user_id == user_id)
+
+
+def load_expenses(statement):
+    """Execute an expense_statement and wrap each row in an ExpenseRow
+
+    Category names are filled in from the owner's category map, loaded once
+    per transaction, rather than joined in SQL.
+    """
+    rows = db.session.execute(statement).all()
+    if not rows:
+        return []
+    names = category_names(rows[0].user_id)
+    return [ExpenseRow(*row, names.get(row.category_id)) for row in rows]
+
+
+# Columns /expenses can be sorted by; the id breaks ties between equal values
+EXPENSE_SORT_COLUMNS = {
+    "date": Expense.date,
+    "due_date": Expense.due_date,
+    "amount": Expense.amount,
+    "category": CATEGORY_NAME,
+}
+
+
+def expense_summary(statement, occurrences=(), today=None):
+    """Total, unpaid and overdue amounts of the rows an expense_statement matches
+
+    The stored rows are summed in one GROUP BY category_id query with
+    conditional sums, so no row is loaded; occurrences expanded from
+    recurring series only exist in Python and are added on top. Amounts
+    are summed as integer cents and converted to dollars at the end.
+    Category names come from the category map.
+
+    Args:
+        statement: A filtered expense_statement
+        occurrences: Transient occurrences matching the same filters
+        today: Day overdue is measured against (default today)
+
+    Returns:
+        dict: count, total_amount, unpaid_amount, overdue_amount and
+        category_data (name/amount dicts, largest amount first)
+    """
+    today = today or date.today()
+    unpaid = or_(Expense.paid == False, Expense.paid.is_(None))
+    overdue = and_(unpaid, Expense.due_date.isnot(None), Expense.due_date < today)
+
+    amount = cents(Expense.amount)
+    summary = select(
+        Expense.user_id,
+        Expense.category_id,
+        func.count(),
+        func.sum(amount),
+        func.sum(case((unpaid, amount), else_=0)),
+        func.sum(case((overdue, amount), else_=0)),
+    ).group_by(Expense.user_id, Expense.category_id)
+    if statement.whereclause is not None:
+        summary = summary.where(statement.whereclause)
+
+    count = 0
+    total_amount = unpaid_amount = overdue_amount = 0
+    category_totals = {}
+    user_ids = {occurrence.user_id for occurrence in occurrences}
+    for (
+        user_id,
+        category_id,
+        rows,
+        total,
+        unpaid_total,
+        overdue_total,
+    ) in db.session.execute(summary):
+        count += rows
+        total_amount += total
+        unpaid_amount += unpaid_total
+        overdue_amount += overdue_total
+        category_totals[category_id] = total
+        user_ids.add(user_id)
+
+    for occurrence in occurrences:
+        amount = to_cents(occurrence.amount)
+        count += 1
+        total_amount += amount
+        category_totals[occurrence.category_id] = (
+            category_totals.get(occurrence.category_id, 0) + amount
+        )
+        if not occurrence.paid:
+            unpaid_amount += amount
+            if occurrence.due_date and occurrence.due_date < today:
+                overdue_amount += amount
+
+    names = {}
+    for user_id in user_ids:
+        names.update(category_names(user_id))
+    category_data = [
+        {"name": names.get(category_id), "amount": from_cents(amount)}
+        for category_id, amount in category_totals.items()
+    ]
+    category_data.sort(key=lambda item: item["amount"], reverse=True)
+    return {
+        "count": count,
+        "total_amount": from_cents(total_amount),
+        "unpaid_amount": from_cents(unpaid_amount),
+        "overdue_amount": from_cents(overdue_amount),
+        "category_data": category_data,
+    }
+
+
+def _sort_key(expense, sort_by):
+    """Position of an expense in ascending /expenses order
+
+    NULLs come first, as in SQLite. Stored rows sort before occurrences
+    with the same value and are ordered by id; occurrences, which have
+    no id, by their series and date.
+    """
+    value = getattr(expense, sort_by)
+    if expense.id is not None:
+        return (value is not None, value, 0, (expense.id,))
+    return (
+        value is not None,
+        value,
+        1,
+        (expense.parent_expense_id, expense.date.isoformat()),
+    )
+
+
+def encode_page_cursor(key):
+    """Encode a _sort_key as an opaque URL-safe token"""
+    not_null, value, rank, tiebreak = key
+    if isinstance(value, date):
+        value = value.isoformat()
+    position = [not_null, value, rank, list(tiebreak)]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_page_cursor(token, sort_by):
+    """Decode a token from encode_page_cursor for the given sort column
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        not_null, value, rank, tiebreak = json.loads(
+            base64.urlsafe_b64decode(token.encode())
+        )
+        if not_null and sort_by in ("date", "due_date"):
+            value = date.fromisoformat(value)
+        elif not_null and sort_by == "amount":
+            value = float(value)
+        elif not_null:
+            value = str(value)
+        else:
+            value = None
+        if rank == 0:
+            tiebreak = (int(tiebreak[0]),)
+        else:
+            rank, tiebreak = 1, (int(tiebreak[0]), str(tiebreak[1]))
+        return (bool(not_null), value, rank, tiebreak)
+    except (ValueError, TypeError, IndexError, AttributeError):
+        raise ValueError("Invalid page cursor")
+
+
+def _after_cursor(column, key, descending):
+    """WHERE clause for stored rows sorting after a _sort_key position"""
+    not_null, value, rank, tiebreak = key
+    if descending:
+        # A cursor on an occurrence is passed by every row with its value
+        tie = Expense.id < tiebreak[0] if rank == 0 else true()
+        if not not_null:
+            return and_(column.is_(None), tie)
+        return or_(
+            column < value, and_(column == value, tie), column.is_(None)
+        )
+
+    tie = Expense.id > tiebreak[0] if rank == 0 else false()
+    if not not_null:
+        return or_(and_(column.is_(None), tie), column.isnot(None))
+    return or_(column > value, and_(column == value, tie))
+
+
+def _is_after(position, key, descending):
+    return position < key if descending else position > key
+
+
+def expense_page(statement, sort_by="date", descending=True, after=None,
+                 per_page=100, occurrences=()):
+    """One keyset-paginated page of /expenses rows
+
+    Stored rows are fetched with a WHERE on the last position shown
+    instead of an OFFSET, so every page costs the same however deep it
+    is. Occurrences are merged in at their sort position.
+
+    Args:
+        statement: A filtered expense_statement
+        sort_by: Key of EXPENSE_SORT_COLUMNS
+        descending: Largest values first
+        after: Token from a previous page's next cursor, or None
+        per_page: Rows per page
+        occurrences: Transient occurrences matching the same filters
+
+    Returns:
+        tuple: (rows, next cursor or None on the last page)
+
+    Raises:
+        ValueError: If after is not a valid cursor
+    """
+    column = EXPENSE_SORT_COLUMNS[sort_by]
+    if descending:
+        ordering = (column.desc().nullslast(), Expense.id.desc())
+    else:
+        ordering = (column.asc().nullsfirst(), Expense.id)
+    statement = statement.order_by(*ordering)
+
+    candidates = occurrences
+    if after is not None:
+        key = decode_page_cursor(after, sort_by)
+        statement = statement.where(_after_cursor(column, key, descending))
+        candidates = [
+            occurrence
+            for occurrence in occurrences
+            if _is_after(_sort_key(occurrence, sort_by), key, descending)
+        ]
+
+    rows = load_expenses(statement.limit(per_page + 1))
+    if candidates:
+        rows = sorted(
+            rows + list(candidates),
+            key=lambda expense: _sort_key(expense, sort_by),
+            reverse=descending,
+        )
+
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    return rows, encode_page_cursor(_sort_key(rows[-1], sort_by))
+
+
+def _in_range(statement, column, start_date, end_date):
+    if start_date is not None:
+        statement = statement.where(column >= start_date)
+    if end_date is not None:
+        statement = statement.where(column <= end_date)
+    return statement
+
+
+def paycheck_rows(user_id, start_date=None, end_date=None, descending=False, limit=None):
+    """A user's paychecks as row tuples ordered by date
+
+    Args:
+        user_id: Owner of the paychecks
+        start_date: Optional first date to include
+        end_date: Optional last date to include
+        descending: Newest first instead of oldest first
+        limit: Optional maximum number of rows
+
+    Returns:
+        list: Rows with the PAYCHECK_COLUMNS attributes
+    """
+    statement = _in_range(
+        select(*PAYCHECK_COLUMNS).where(Paycheck.user_id == user_id),
+        Paycheck.date,
+        start_date,
+        end_date,
+    ).order_by(Paycheck.date.desc() if descending else Paycheck.date)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return db.session.execute(statement).all()
+
+
+def expense_rows(user_id, start_date=None, end_date=None, descending=False, limit=None):
+    """A user's expenses as ExpenseRows ordered by date (see paycheck_rows)"""
+    statement = _in_range(
+        expense_statement(user_id), Expense.date, start_date, end_date
+    ).order_by(Expense.date.desc() if descending else Expense.date)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return load_expenses(statement)
+
+
+def rollup_rows(user_id, start_date, end_date):
+    """A user's BudgetRollup rows within a range as row tuples ordered by day"""
+    statement = _in_range(
+        select(*ROLLUP_COLUMNS).where(BudgetRollup.user_id == user_id),
+        BudgetRollup.day,
+        start_date,
+        end_date,
+    ).order_by(BudgetRollup.day)
+    return db.session.execute(statement).all()
+
+
+def iso_date(value):
+    return value.strftime("%Y-%m-%d") if value is not None else None
+
+
+def to_float(value):
+    return float(value) if value is not None else None
+
+
+def compile_serializer(fields):
+    """Build a function turning a row into a JSON-ready dict
+
+    The attribute getters and converters are resolved once, so serializing
+    a row is a single pass with no per-field lookups or type checks.
+
+    Args:
+        fields: (output key, attribute name, converter or None) triples
+
+    Returns:
+        callable: row -> dict
+    """
+    getters = tuple(
+        (key, attrgetter(attribute), converter)
+        for key, attribute, converter in fields
+    )
+
+    def serialize(row):
+        return {
+            key: converter(get(row)) if converter else get(row)
+            for key, get, converter in getters
+        }
+
+    return serialize
+
+
+serialize_dashboard_paycheck = compile_serializer(
+    (
+        ("date", "date", iso_date),
+        ("gross_amount", "gross_amount", to_float),
+        ("net_amount", "net_amount", to_float),
+        ("pay_type", "pay_type", None),
+    )
+)
+serialize_dashboard_expense = compile_serializer(
+    (
+        ("date", "date", iso_date),
+        ("amount", "amount", to_float),
+        ("category", "category", None),
+        ("description", "description", None),
+    )
+)
+serialize_budget_paycheck = compile_serializer(
+    (
+        ("id", "id", None),
+        ("date", "date", iso_date),
+        ("pay_type", "pay_type", None),
+        ("gross_amount", "gross_amount", to_float),
+        ("net_amount", "net_amount", to_float),
+    )
+)
+serialize_budget_expense = compile_serializer(
+    (
+        ("id", "id", None),
+        ("date", "date", iso_date),
+        ("description", "description", None),
+        ("category", "category", None),
+        ("amount", "amount", to_float),
+        ("paid", "paid", None),
+        ("recurring", "recurring", None),
+        ("parent_expense_id", "parent_expense_id", None),
+    )
+)
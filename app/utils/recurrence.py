@@ -0,0 +1,236 @@
+# app/utils/recurrence.py
+
+import threading
+from calendar import monthrange
+from collections import OrderedDict
+from datetime import timedelta
+from sqlalchemy import inspect
+
+DAYS = "days"
+MONTHS = "months"
+
+# Legacy Expense.frequency strings, with the spacing get_frequency_days uses
+LEGACY_FREQUENCIES = {
+    "daily": (DAYS, 1),
+    "weekly": (DAYS, 7),
+    "bi-weekly": (DAYS, 14),
+    "monthly": (MONTHS, 1),
+    "quarterly": (DAYS, 90),
+    "semi-annually": (DAYS, 182),
+    "annually": (DAYS, 365),
+}
+
+
+class RecurrenceRule:
+    """A fixed-interval schedule anchored at a date.
+
+    Occurrence k of a schedule is anchor + k * interval, so the k-th
+    occurrence, the first occurrence on or after a date and the number of
+    occurrences in a range are all computed directly instead of stepping
+    through the schedule one period at a time. k may be negative for dates
+    before the anchor.
+
+    Monthly schedules always add whole months to the anchor, so a series
+    anchored on the 31st falls on the last day of shorter months and returns
+    to the 31st afterwards.
+    """
+
+    def __init__(self, unit, interval):
+        if unit not in (DAYS, MONTHS):
+            raise ValueError(f"Unknown recurrence unit: {unit}")
+        if not interval or interval < 1:
+            raise ValueError(f"Recurrence interval must be positive, got {interval}")
+        self.unit = unit
+        self.interval = interval
+
+    def __repr__(self):
+        return f"RecurrenceRule({self.unit!r}, {self.interval})"
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, RecurrenceRule)
+            and self.unit == other.unit
+            and self.interval == other.interval
+        )
+
+    def __hash__(self):
+        return hash((self.unit, self.interval))
+
+    def nth(self, anchor, k):
+        """Return occurrence k of the schedule starting at anchor"""
+        if self.unit == DAYS:
+            return anchor + timedelta(days=k * self.interval)
+
+        # Same as adding relativedelta(months=...): keep the anchor's day,
+        # clamped to the length of the target month
+        year, month = divmod(
+            anchor.year * 12 + anchor.month - 1 + k * self.interval, 12
+        )
+        day = min(anchor.day, monthrange(year, month + 1)[1])
+        return anchor.replace(year=year, month=month + 1, day=day)
+
+    def index_on_or_after(self, anchor, day):
+        """Return the smallest k whose occurrence falls on or after day"""
+        if self.unit == DAYS:
+            # Ceiling division of the day offset by the interval
+            return -((anchor - day).days // self.interval)
+
+        months = (day.year - anchor.year) * 12 + (day.month - anchor.month)
+        k = months // self.interval
+        # Occurrence k lands in or before day's month and k + 1 after it
+        if self.nth(anchor, k) < day:
+            k += 1
+        return k
+
+    def index_after(self, anchor, day):
+        """Return the smallest k whose occurrence falls strictly after day"""
+        return self.index_on_or_after(anchor, day + timedelta(days=1))
+
+    def first_on_or_after(self, anchor, day):
+        """Return the first occurrence on or after day"""
+        return self.nth(anchor, self.index_on_or_after(anchor, day))
+
+    def first_after(self, anchor, day):
+        """Return the first occurrence strictly after day"""
+        return self.nth(anchor, self.index_after(anchor, day))
+
+    def count_between(self, anchor, start_date, end_date):
+        """Count the occurrences within start_date..end_date inclusive"""
+        if end_date < start_date:
+            return 0
+        return self.index_after(anchor, end_date) - self.index_on_or_after(
+            anchor, start_date
+        )
+
+    def dates(self, anchor, first_index, end_date):
+        """Yield occurrences from index first_index up to end_date inclusive"""
+        if self.unit == DAYS:
+            # Day steps are exact, so just keep adding the interval
+            step = timedelta(days=self.interval)
+            current = self.nth(anchor, first_index)
+            while current <= end_date:
+                yield current
+                current += step
+            return
+
+        k = first_index
+        current = self.nth(anchor, k)
+        while current <= end_date:
+            yield current
+            k += 1
+            current = self.nth(anchor, k)
+
+    def dates_between(self, anchor, start_date, end_date):
+        """Yield the occurrences within start_date..end_date inclusive"""
+        return self.dates(
+            anchor, self.index_on_or_after(anchor, start_date), end_date
+        )
+
+
+def rule_for_days(days):
+    """Return a rule repeating every given number of days"""
+    return RecurrenceRule(DAYS, days)
+
+
+def rule_for_expense(expense):
+    """Build the recurrence rule of an expense
+
+    Follows Expense.get_frequency_days: frequency_type/frequency_value win
+    over the legacy frequency string, and recurring expenses without a
+    usable frequency repeat bi-weekly. Year rules step whole calendar years
+    instead of 365 days so they keep their date across leap years.
+
+    Args:
+        expense: The expense to read the frequency from
+
+    Returns:
+        RecurrenceRule or None: None if the expense does not recur
+    """
+    if not expense.recurring:
+        return None
+
+    if expense.frequency_type and expense.frequency_value:
+        value = expense.frequency_value
+        if expense.frequency_type == "days":
+            return RecurrenceRule(DAYS, value)
+        elif expense.frequency_type == "weeks":
+            return RecurrenceRule(DAYS, value * 7)
+        elif expense.frequency_type == "months":
+            return RecurrenceRule(MONTHS, value)
+        elif expense.frequency_type == "years":
+            return RecurrenceRule(MONTHS, value * 12)
+
+    if expense.frequency in LEGACY_FREQUENCIES:
+        return RecurrenceRule(*LEGACY_FREQUENCIES[expense.frequency])
+
+    # Default to bi-weekly if no valid frequency found
+    return RecurrenceRule(DAYS, 14)
+
+
+class RuleCache:
+    """Bounded LRU of compiled recurrence rules keyed by (expense id, updated_at).
+
+    Any edit of a saved expense bumps updated_at, so a changed frequency
+    never hits a stale entry. Expenses that are unsaved or have unflushed
+    changes are compiled directly and bypass the cache.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._rules = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, expense):
+        """Return the compiled rule of an expense (None if it does not recur)"""
+        if expense.id is None or expense.updated_at is None:
+            return rule_for_expense(expense)
+
+        state = inspect(expense, raiseerr=False)
+        if state is not None and state.modified:
+            return rule_for_expense(expense)
+
+        key = (expense.id, expense.updated_at)
+        with self._lock:
+            if key in self._rules:
+                self.hits += 1
+                self._rules.move_to_end(key)
+                return self._rules[key]
+            self.misses += 1
+
+        rule = rule_for_expense(expense)
+
+        with self._lock:
+            self._rules[key] = rule
+            self._rules.move_to_end(key)
+            while len(self._rules) > self.maxsize:
+                self._rules.popitem(last=False)
+        return rule
+
+    def stats(self):
+        """Return the cache counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._rules),
+                "maxsize": self.maxsize,
+            }
+
+    def clear(self):
+        """Drop every cached rule and reset the counters"""
+        with self._lock:
+            self._rules.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+rule_cache = RuleCache()
+
+
+def compiled_rule(expense):
+    """Return the cached recurrence rule of an expense"""
+    return rule_cache.get(expense)
@@ -1,69 +1,159 @@
-from datetime import datetime, timedelta, date
+import heapq
 from app.models import Expense, db
+from app.utils.recurrence import compiled_rule
+
+
+class RecurringOccurrence:
+    """Read-only projection of one virtual occurrence of a recurring expense.
+
+    Unlike a transient Expense it carries no SQLAlchemy state, so it can never
+    be autoflushed into the session and costs a fraction of the memory. It
+    answers the Expense attributes the views read; having no row of its own,
+    its id is None.
+    """
+
+    __slots__ = (
+        "date",
+        "due_date",
+        "amount",
+        "category_id",
+        "description",
+        "parent_expense_id",
+        "user_id",
+        "paid",
+    )
+
+    def __init__(
+        self,
+        date,
+        amount,
+        category_id,
+        parent_expense_id,
+        user_id,
+        paid=False,
+        due_date=None,
+        description=None,
+    ):
+        set_field = super().__setattr__
+        set_field("date", date)
+        set_field("due_date", due_date)
+        set_field("amount", amount)
+        set_field("category_id", category_id)
+        set_field("description", description)
+        set_field("parent_expense_id", parent_expense_id)
+        set_field("user_id", user_id)
+        set_field("paid", paid)
+
+    # Occurrences are not stored and are not series themselves
+    id = None
+    recurring = False
+    frequency = None
+
+    # Name of the category, looked up like Expense.category
+    category = Expense.category
+    days_until_due = Expense.days_until_due
+    status = Expense.status
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other):
+        if not isinstance(other, RecurringOccurrence):
+            return NotImplemented
+        return all(
+            getattr(self, field) == getattr(other, field) for field in self.__slots__
+        )
+
+    def __hash__(self):
+        return hash((self.parent_expense_id, self.date))
+
+    def __repr__(self):
+        return (
+            f"<RecurringOccurrence {self.parent_expense_id} "
+            f"{self.date.isoformat()} {self.amount}>"
+        )
+
+
+def _series_occurrences(base_expense, start_date, end_date):
+    """Yield the occurrences of one recurring expense within the range"""
+    # Skip if no valid frequency
+    rule = compiled_rule(base_expense)
+    if rule is None:
+        return
+
+    # Determine the first occurrence (always start AFTER the initial expense date)
+    anchor = base_expense.date
+    first_index = 1
+
+    # Ensure we start at the correct point and do not include the original expense date
+    if base_expense.start_date and base_expense.start_date > rule.nth(anchor, 1):
+        anchor = base_expense.start_date
+        first_index = 0
+
+    # Jump straight to the first occurrence on or after the global start_date
+    first_index = max(first_index, rule.index_on_or_after(anchor, start_date))
+
+    # Set end date, respecting the base expense's end_date
+    actual_end_date = min(base_expense.end_date or end_date, end_date)
+
+    description = f"{base_expense.description} (Recurring)"
+    for current_date in rule.dates(anchor, first_index, actual_end_date):
+        yield RecurringOccurrence(
+            date=current_date,
+            due_date=base_expense.due_date,
+            amount=base_expense.amount,
+            category_id=base_expense.category_id,
+            description=description,
+            paid=False,  # Virtual recurrences are unpaid by default
+            parent_expense_id=base_expense.id,  # Link to the parent expense
+            user_id=base_expense.user_id,
+        )
 
 
 def generate_recurring_expenses(user_id, start_date, end_date):
+    """Lazily expand a user's recurring expenses over a date range
+
+    Occurrences are yielded in date order across all series, so callers can
+    stop early or stream long horizons without building ORM objects.
+    Occurrences matching an existing expense (same date, category and
+    amount) are left out.
+
+    Args:
+        user_id: User whose recurring expenses to expand
+        start_date: First day of the range
+        end_date: Last day of the range
+
+    Yields:
+        RecurringOccurrence: Virtual occurrences ordered by date
+    """
     # Find all recurring expenses for the user
     recurring_expenses = Expense.query.filter_by(user_id=user_id, recurring=True).all()
 
     # Get all existing expense dates within this range to avoid duplicates
-    existing_dates = set()
-    for expense in (
-        Expense.query.filter_by(user_id=user_id)
-        .filter(Expense.date > start_date, Expense.date <= end_date)
+    existing_dates = set(
+        db.session.query(Expense.date, Expense.category_id, Expense.amount)
+        .filter(
+            Expense.user_id == user_id,
+            Expense.date > start_date,
+            Expense.date <= end_date,
+        )
         .all()
-    ):
-        key = (expense.date, expense.category, expense.amount)
-        existing_dates.add(key)
-
-    generated_expenses = []
-
-    for base_expense in recurring_expenses:
-        # Skip if no valid frequency
-        freq_days = base_expense.get_frequency_days()
-        if not freq_days:
-            continue
-
-        # Determine the first occurrence (always start AFTER the initial expense date)
-        current_date = base_expense.date + timedelta(days=freq_days)
-
-        # Ensure we start at the correct point and do not include the original expense date
-        if base_expense.start_date:
-            current_date = max(current_date, base_expense.start_date)
-
-        # Ensure we start after the global start_date, but also do not include base_expense.date
-        while current_date <= base_expense.date or current_date < start_date:
-            current_date += timedelta(days=freq_days)
-
-        # Set end date, respecting the base expense's end_date
-        actual_end_date = min(base_expense.end_date or end_date, end_date)
-
-        # Generate all occurrences in date range
-        while current_date <= actual_end_date:
-            # Create a key to check against existing expenses
-            key = (current_date, base_expense.category, base_expense.amount)
-
-            # Only create if no matching expense exists
-            if key not in existing_dates:
-                # Create the virtual recurring expense
-                recurring_expense = Expense(
-                    date=current_date,
-                    due_date=base_expense.due_date,
-                    category=base_expense.category,
-                    category_id=base_expense.category_id,
-                    description=f"{base_expense.description} (Recurring)",
-                    amount=base_expense.amount,
-                    paid=False,  # Virtual recurrences are unpaid by default
-                    recurring=False,  # These are materialized instances
-                    parent_expense_id=base_expense.id,  # Link to the parent expense
-                    user_id=base_expense.user_id,
-                )
-                generated_expenses.append(recurring_expense)
-
-                # Add this to existing dates to prevent duplicates
-                existing_dates.add(key)
-
-            # Move to next occurrence
-            current_date += timedelta(days=freq_days)
-
-    return generated_expenses
+    )
+
+    series = [
+        _series_occurrences(base_expense, start_date, end_date)
+        for base_expense in recurring_expenses
+    ]
+
+    for occurrence in heapq.merge(*series, key=lambda occurrence: occurrence.date):
+        # Create a key to check against existing expenses
+        key = (occurrence.date, occurrence.category_id, occurrence.amount)
+
+        # Only yield if no matching expense exists
+        if key not in existing_dates:
+            # Add this to existing dates to prevent duplicates
+            existing_dates.add(key)
+            yield occurrence
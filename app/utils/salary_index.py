@@ -0,0 +1,81 @@
+# app/utils/salary_index.py
+
+from bisect import bisect_right
+from datetime import timedelta
+
+from app.models import SalaryProjection
+
+
+def projection_precedence(projection):
+    """Sort key deciding which of several overlapping projections applies
+
+    The projection that started most recently wins, since a new projection
+    usually supersedes an open-ended older one (a raise, for example). Ties
+    go to the current projection, then to the most recently created one.
+    """
+    return (projection.start_date, bool(projection.is_current), projection.id or 0)
+
+
+class SalaryIndex:
+    """Sorted interval index over a user's salary projections.
+
+    Overlapping projections are flattened into disjoint segments up front,
+    each holding the projection that takes precedence there, so a lookup is
+    one bisect over the segment start dates.
+    """
+
+    def __init__(self, projections):
+        self.projections = list(projections)
+
+        # Every date on which the applicable projection can change
+        boundaries = set()
+        for projection in self.projections:
+            boundaries.add(projection.start_date)
+            if projection.end_date:
+                boundaries.add(projection.end_date + timedelta(days=1))
+
+        self._starts = []
+        self._winners = []
+        for boundary in sorted(boundaries):
+            covering = [
+                projection
+                for projection in self.projections
+                if projection.start_date <= boundary
+                and (projection.end_date is None or boundary <= projection.end_date)
+            ]
+            winner = max(covering, key=projection_precedence) if covering else None
+
+            # Merge segments won by the same projection (or by none)
+            if self._winners and self._winners[-1] is winner:
+                continue
+            self._starts.append(boundary)
+            self._winners.append(winner)
+
+    @classmethod
+    def for_user(cls, user_id):
+        """Build the index from a user's projections with a single query
+
+        Nothing is cached between calls: each call reads the projections
+        again, so edits made by any process are seen. A user has only a
+        few projections, so checking whether a cached index was still
+        current would cost as much as this query.
+        """
+        return cls(SalaryProjection.query.filter_by(user_id=user_id).all())
+
+    def __len__(self):
+        return len(self.projections)
+
+    def find(self, day):
+        """Return the projection applying on a date, or None
+
+        Args:
+            day: The date to look up
+
+        Returns:
+            SalaryProjection or None: The covering projection with the
+                highest precedence
+        """
+        position = bisect_right(self._starts, day) - 1
+        if position < 0:
+            return None
+        return self._winners[position]
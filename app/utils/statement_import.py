@@ -0,0 +1,450 @@
+# app/utils/statement_import.py
+
+import csv
+import hashlib
+import re
+from collections import namedtuple
+from datetime import date, datetime
+
+from sqlalchemy.dialects.sqlite import insert
+
+from app import db
+from app.models import Expense, ExpenseCategory, Paycheck
+from app.utils.bulk_ingest import income_values, link_categories
+
+# One transaction from a bank statement; amounts below zero left the account
+StatementTransaction = namedtuple(
+    "StatementTransaction", ["date", "amount", "description"]
+)
+
+STATEMENT_FORMATS = ("csv", "ofx")
+
+# Header names banks use for each column, compared lowercased
+DATE_COLUMNS = ("date", "transaction date", "posted date", "posting date", "trans. date")
+AMOUNT_COLUMNS = ("amount", "transaction amount")
+DEBIT_COLUMNS = ("debit", "withdrawal", "withdrawals")
+CREDIT_COLUMNS = ("credit", "deposit", "deposits")
+DESCRIPTION_COLUMNS = ("description", "payee", "name", "details", "memo")
+
+CSV_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%Y/%m/%d", "%d.%m.%Y")
+
+DEFAULT_CATEGORY = "Uncategorized"
+DEFAULT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_description(description):
+    """Lowercase a description and collapse punctuation and whitespace"""
+    return _NON_WORD.sub(" ", (description or "").lower()).strip()
+
+
+def content_hash(user_id, transaction, occurrence=0):
+    """Hash identifying an imported transaction
+
+    Args:
+        user_id: Owner of the transaction
+        transaction: The StatementTransaction
+        occurrence: How many identical transactions came before it in the
+            same statement, so genuine repeats (two coffees on one day) are
+            kept while re-imports still match
+
+    Returns:
+        str: Hex digest stored in import_hash
+    """
+    key = "|".join(
+        (
+            str(user_id),
+            transaction.date.isoformat(),
+            f"{transaction.amount:.2f}",
+            normalize_description(transaction.description),
+            str(occurrence),
+        )
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _parse_csv_date(value):
+    value = value.strip()
+    try:
+        # Fast path for ISO dates, the most common export format
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    for date_format in CSV_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date {value!r}")
+
+
+def _parse_csv_amount(value):
+    value = value.strip().replace("$", "").replace(",", "")
+    if not value:
+        return 0.0
+    if value.startswith("(") and value.endswith(")"):
+        # Accounting notation for negative amounts
+        return -float(value[1:-1])
+    return float(value)
+
+
+def _find_column(header, names):
+    for name in names:
+        if name in header:
+            return header.index(name)
+    return None
+
+
+def parse_csv(lines):
+    """Parse a CSV bank statement lazily, one transaction at a time
+
+    The header row decides which columns hold the date, the description and
+    either a signed amount or separate debit and credit columns.
+
+    Args:
+        lines: Iterable of text lines, such as an open file
+
+    Yields:
+        tuple: (row number, StatementTransaction or None, error or None)
+
+    Raises:
+        ValueError: If the header has no recognizable date or amount column
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [column.strip().lower() for column in header]
+
+    date_column = _find_column(header, DATE_COLUMNS)
+    amount_column = _find_column(header, AMOUNT_COLUMNS)
+    debit_column = _find_column(header, DEBIT_COLUMNS)
+    credit_column = _find_column(header, CREDIT_COLUMNS)
+    description_column = _find_column(header, DESCRIPTION_COLUMNS)
+    if date_column is None or (amount_column is None and debit_column is None):
+        raise ValueError("CSV header needs a date column and an amount or debit column")
+
+    for row in reader:
+        row_number = reader.line_num
+        if not any(field.strip() for field in row):
+            continue
+        try:
+            transaction_date = _parse_csv_date(row[date_column])
+            if amount_column is not None:
+                amount = _parse_csv_amount(row[amount_column])
+            else:
+                amount = -abs(_parse_csv_amount(row[debit_column]))
+                if credit_column is not None:
+                    amount += abs(_parse_csv_amount(row[credit_column]))
+            description = (
+                row[description_column].strip()
+                if description_column is not None
+                else ""
+            )
+        except (ValueError, IndexError) as e:
+            yield row_number, None, str(e) or "Missing columns"
+            continue
+
+        yield row_number, StatementTransaction(
+            transaction_date, amount, description
+        ), None
+
+
+def _ofx_transaction(fields):
+    posted = fields.get("DTPOSTED", "")
+    try:
+        transaction_date = datetime.strptime(posted[:8], "%Y%m%d").date()
+    except ValueError:
+        raise ValueError(f"Invalid DTPOSTED {posted!r}")
+    try:
+        amount = float(fields.get("TRNAMT", "").replace(",", "."))
+    except ValueError:
+        raise ValueError(f"Invalid TRNAMT {fields.get('TRNAMT')!r}")
+    description = fields.get("NAME") or fields.get("MEMO") or ""
+    return StatementTransaction(transaction_date, amount, description)
+
+
+def parse_ofx(chunks):
+    """Parse an OFX or QFX statement lazily, one transaction at a time
+
+    Both SGML (OFX 1.x, without closing tags) and XML statements are read
+    as a stream of tags, so the file is never loaded whole.
+
+    Args:
+        chunks: Iterable of text chunks or lines, such as an open file
+
+    Yields:
+        tuple: (transaction number, StatementTransaction or None, error or None)
+    """
+    current = None
+    number = 0
+
+    def finish():
+        nonlocal current, number
+        fields, current = current, None
+        number += 1
+        try:
+            return number, _ofx_transaction(fields), None
+        except ValueError as e:
+            return number, None, str(e)
+
+    def handle(closing, tag, value):
+        nonlocal current
+        tag = tag.upper()
+        finished = []
+        if tag == "STMTTRN":
+            # SGML statements may leave STMTTRN unclosed until the next one
+            if current is not None:
+                finished.append(finish())
+            if not closing:
+                current = {}
+        elif current is not None:
+            if closing and tag not in current:
+                # The enclosing list closed over an unclosed transaction
+                finished.append(finish())
+            elif not closing:
+                current[tag] = value.strip()
+        return finished
+
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        # Only tags followed by another "<" are known to be complete
+        cut = buffer.rfind("<")
+        if cut <= 0:
+            continue
+        text, buffer = buffer[:cut], buffer[cut:]
+        for match in _OFX_TAG.findall(text):
+            yield from handle(*match)
+
+    for match in _OFX_TAG.findall(buffer):
+        yield from handle(*match)
+    if current is not None:
+        yield finish()
+
+
+def detect_format(filename, head=""):
+    """Guess a statement's format from its file name or first characters"""
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    if extension in ("ofx", "qfx"):
+        return "ofx"
+    if extension == "csv":
+        return "csv"
+    if "OFXHEADER" in head or "<OFX>" in head.upper():
+        return "ofx"
+    return "csv"
+
+
+def parse_statement(lines, statement_format):
+    """Parse a statement of the given format (see STATEMENT_FORMATS)"""
+    if statement_format == "ofx":
+        return parse_ofx(lines)
+    if statement_format == "csv":
+        return parse_csv(lines)
+    raise ValueError(f"Unknown statement format: {statement_format}")
+
+
+class CategoryRules:
+    """Assign categories to statement descriptions by keyword
+
+    Rules are (keyword, category) pairs matched in order against the
+    normalized description; the first keyword contained in it wins.
+    """
+
+    def __init__(self, rules=(), default=DEFAULT_CATEGORY):
+        self.rules = [
+            (normalize_description(keyword), category)
+            for keyword, category in rules
+            if normalize_description(keyword)
+        ]
+        self.default = default
+
+    @classmethod
+    def for_user(cls, user_id, rules=None, default=DEFAULT_CATEGORY):
+        """Explicit rules first, then the user's category names as keywords
+
+        Args:
+            user_id: User whose categories to match
+            rules: Optional mapping of keyword to category name
+            default: Category for descriptions no rule matches
+        """
+        names = [
+            name
+            for (name,) in db.session.query(ExpenseCategory.name).filter(
+                ExpenseCategory.user_id == user_id
+            )
+        ]
+        return cls(
+            list((rules or {}).items()) + [(name, name) for name in names], default
+        )
+
+    def categorize(self, description):
+        normalized = f" {normalize_description(description)} "
+        for keyword, category in self.rules:
+            if f" {keyword} " in normalized:
+                return category
+        return self.default
+
+
+class StatementImporter:
+    """Import parsed statement transactions in batches, skipping duplicates
+
+    Money leaving the account becomes a paid Expense and deposits become
+    Other Income paychecks. Each row carries a content hash, and the unique
+    (user_id, import_hash) index makes the database drop rows imported
+    before, so no per-row lookups are needed.
+    """
+
+    def __init__(self, user_id, rules=None, batch_size=DEFAULT_BATCH_SIZE):
+        self.user_id = user_id
+        self.rules = rules or CategoryRules.for_user(user_id)
+        self.batch_size = batch_size
+        self.rows = 0
+        self.inserted = {"expenses": 0, "income": 0}
+        self.duplicates = 0
+        self.error_count = 0
+        self.errors = []
+        self._occurrences = {}
+        self._expenses = []
+        self._income = []
+
+    def add_error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "error": message})
+
+    def add(self, transaction):
+        """Map one transaction to a row and queue it"""
+        self.rows += 1
+        if not transaction.amount:
+            return
+
+        key = (
+            transaction.date,
+            round(transaction.amount, 2),
+            normalize_description(transaction.description),
+        )
+        occurrence = self._occurrences.get(key, 0)
+        self._occurrences[key] = occurrence + 1
+        import_hash = content_hash(self.user_id, transaction, occurrence)
+
+        now = datetime.utcnow()
+        if transaction.amount < 0:
+            category = self.rules.categorize(transaction.description)
+            self._expenses.append(
+                {
+                    "date": transaction.date,
+                    "category": category,
+                    "description": transaction.description[:200],
+                    "amount": -transaction.amount,
+                    "paid": True,  # Statement rows have already cleared
+                    "recurring": False,
+                    "user_id": self.user_id,
+                    "created_at": now,
+                    "updated_at": now,
+                    "import_hash": import_hash,
+                }
+            )
+        else:
+            values = income_values(
+                {
+                    "date": transaction.date,
+                    "income_type": "otherIncome",
+                    "amount": transaction.amount,
+                },
+                self.user_id,
+            )
+            self._income.append(
+                dict(values, created_at=now, import_hash=import_hash)
+            )
+
+        if len(self._expenses) + len(self._income) >= self.batch_size:
+            self.flush()
+
+    def _insert(self, model, rows):
+        """Insert the rows whose hashes are not stored yet
+
+        Known hashes are looked up with one indexed query per batch; the
+        unique index still guards against rows committed meanwhile.
+        """
+        if not rows:
+            return 0
+
+        existing = {
+            import_hash
+            for (import_hash,) in db.session.query(model.import_hash).filter(
+                model.user_id == self.user_id,
+                model.import_hash.in_([row["import_hash"] for row in rows]),
+            )
+        }
+        rows = [row for row in rows if row["import_hash"] not in existing]
+        if not rows:
+            return 0
+
+        statement = insert(model).on_conflict_do_nothing(
+            index_elements=["user_id", "import_hash"]
+        )
+        result = db.session.execute(
+            statement, rows, execution_options={"dml_strategy": "raw"}
+        )
+        return result.rowcount
+
+    def flush(self):
+        """Write the queued rows in one transaction"""
+        expenses, self._expenses = self._expenses, []
+        income, self._income = self._income, []
+        if not (expenses or income):
+            return
+
+        try:
+            link_categories(self.user_id, expenses)
+            inserted_expenses = self._insert(Expense, expenses)
+            inserted_income = self._insert(Paycheck, income)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self.add_error(None, f"{len(expenses) + len(income)} rows not saved: {e}")
+            return
+
+        self.inserted["expenses"] += inserted_expenses
+        self.inserted["income"] += inserted_income
+        self.duplicates += len(expenses) + len(income) - inserted_expenses - inserted_income
+
+    def run(self, parsed):
+        """Import every transaction from parse_statement
+
+        Returns:
+            dict: The report from summary()
+        """
+        for row_number, transaction, error in parsed:
+            if error:
+                self.rows += 1
+                self.add_error(row_number, error)
+            else:
+                self.add(transaction)
+        self.flush()
+        return self.summary()
+
+    def summary(self):
+        return {
+            "rows": self.rows,
+            "inserted": dict(self.inserted),
+            "duplicates": self.duplicates,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+
+def describe_import(summary):
+    """Build the flash message for a statement import"""
+    message = (
+        f"Imported {summary['inserted']['expenses']} expenses and "
+        f"{summary['inserted']['income']} income entries from "
+        f"{summary['rows']} rows; {summary['duplicates']} duplicates skipped"
+    )
+    if summary["error_count"]:
+        message += f", {summary['error_count']} rows could not be read"
+    return message
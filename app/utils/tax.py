@@ -0,0 +1,159 @@
+# app/utils/tax.py
+
+from bisect import bisect_right
+from functools import lru_cache
+
+# Federal income tax brackets for single filers by tax year, as
+# (lower bound of taxable income, marginal rate) pairs in ascending order
+TAX_BRACKETS = {
+    2023: (
+        (0, 0.10),
+        (11000, 0.12),
+        (44725, 0.22),
+        (95375, 0.24),
+        (182100, 0.32),
+        (231250, 0.35),
+        (578125, 0.37),
+    ),
+    2024: (
+        (0, 0.10),
+        (11600, 0.12),
+        (47150, 0.22),
+        (100525, 0.24),
+        (191950, 0.32),
+        (243725, 0.35),
+        (609350, 0.37),
+    ),
+    2025: (
+        (0, 0.10),
+        (11925, 0.12),
+        (48475, 0.22),
+        (103350, 0.24),
+        (197300, 0.32),
+        (250525, 0.35),
+        (626350, 0.37),
+    ),
+    2026: (
+        (0, 0.10),
+        (12400, 0.12),
+        (50400, 0.22),
+        (105700, 0.24),
+        (201775, 0.32),
+        (256225, 0.35),
+        (640600, 0.37),
+    ),
+}
+
+# Pay periods per year assumed when annualizing a single paycheck
+DEFAULT_PERIODS_PER_YEAR = 26
+
+
+def table_year(year):
+    """Return the bracket year to use for a tax year
+
+    Years without their own table use the closest earlier one, and years
+    before the first table use the first.
+    """
+    years = sorted(TAX_BRACKETS)
+    position = bisect_right(years, year) - 1
+    return years[max(position, 0)]
+
+
+@lru_cache(maxsize=None)
+def compile_brackets(year):
+    """Compile a year's brackets into lookup arrays
+
+    Returns:
+        tuple: (lower bounds, rates, tax owed at each lower bound)
+    """
+    brackets = TAX_BRACKETS[table_year(year)]
+    bounds = tuple(lower for lower, _ in brackets)
+    rates = tuple(rate for _, rate in brackets)
+
+    # Tax owed on all income below each bracket, so a lookup is one bisect
+    base_tax = [0.0]
+    for i in range(1, len(brackets)):
+        base_tax.append(base_tax[-1] + (bounds[i] - bounds[i - 1]) * rates[i - 1])
+
+    return bounds, rates, tuple(base_tax)
+
+
+def income_tax(taxable_income, year):
+    """Calculate the annual income tax on an amount of taxable income
+
+    Args:
+        taxable_income: Annual taxable income
+        year: Tax year whose brackets to use
+
+    Returns:
+        float: Tax owed
+    """
+    if taxable_income <= 0:
+        return 0.0
+
+    bounds, rates, base_tax = compile_brackets(year)
+    i = bisect_right(bounds, taxable_income) - 1
+    return base_tax[i] + (taxable_income - bounds[i]) * rates[i]
+
+
+def income_taxes(taxable_incomes, year):
+    """Calculate the annual income tax on many amounts at once
+
+    The brackets are compiled once and bound to locals, so each amount
+    costs a single bisect.
+
+    Args:
+        taxable_incomes: Iterable of annual taxable incomes
+        year: Tax year whose brackets to use
+
+    Returns:
+        list: Tax owed on each amount, in order
+    """
+    bounds, rates, base_tax = compile_brackets(year)
+    locate = bisect_right
+
+    taxes = []
+    append = taxes.append
+    for amount in taxable_incomes:
+        if amount <= 0:
+            append(0.0)
+            continue
+        i = locate(bounds, amount) - 1
+        append(base_tax[i] + (amount - bounds[i]) * rates[i])
+    return taxes
+
+
+def paycheck_tax(taxable_amount, year, periods_per_year=DEFAULT_PERIODS_PER_YEAR):
+    """Withholding for one paycheck, by annualizing its taxable amount
+
+    Args:
+        taxable_amount: Taxable pay in the paycheck
+        year: Tax year of the pay date
+        periods_per_year: Paychecks per year (26 for biweekly)
+
+    Returns:
+        float: Tax withheld from the paycheck
+    """
+    return income_tax(taxable_amount * periods_per_year, year) / periods_per_year
+
+
+def paycheck_nets(
+    gross_amounts, taxable_amounts, year, periods_per_year=DEFAULT_PERIODS_PER_YEAR
+):
+    """Net pay for many paychecks of the same year in one call
+
+    Args:
+        gross_amounts: Gross pay of each paycheck
+        taxable_amounts: Taxable pay of each paycheck, in the same order
+        year: Tax year of the pay dates
+        periods_per_year: Paychecks per year (26 for biweekly)
+
+    Returns:
+        list: Net pay of each paycheck
+    """
+    taxes = income_taxes(
+        (amount * periods_per_year for amount in taxable_amounts), year
+    )
+    return [
+        gross - tax / periods_per_year for gross, tax in zip(gross_amounts, taxes)
+    ]
@@ -0,0 +1,105 @@
+# benchmarks/bench_budget_engine.py
+"""Compare the old nested-loop period assignment with the bisect engine.
+
+Run from the project root:
+
+    python -m benchmarks.bench_budget_engine
+"""
+import random
+import timeit
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from app.utils.budget_engine import build_periods, calculate_budget
+
+CATEGORIES = ["Rent", "Groceries", "Utilities", "Fuel", "Insurance", "Dining"]
+CATEGORY_NAMES = dict(enumerate(CATEGORIES, 1))
+
+
+def make_data(weeks, expenses_per_day=3, seed=42):
+    """Build biweekly paychecks and random expenses covering the given weeks"""
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    end = start + timedelta(weeks=weeks)
+
+    paychecks = []
+    current = start
+    while current <= end:
+        paychecks.append(
+            SimpleNamespace(date=current, pay_type="Regular", net_amount=2500.0)
+        )
+        current += timedelta(days=14)
+
+    expenses = []
+    days = (end - start).days + 1
+    for i in range(days * expenses_per_day):
+        category_id = rng.choice(list(CATEGORY_NAMES))
+        expenses.append(
+            SimpleNamespace(
+                id=i,
+                date=start + timedelta(days=rng.randrange(days)),
+                category_id=category_id,
+                # The name each expense row used to store alongside the id
+                category=CATEGORY_NAMES[category_id],
+                amount=round(rng.uniform(5, 500), 2),
+                paid=rng.random() < 0.3,
+            )
+        )
+    expenses.sort(key=lambda e: e.date)
+    return paychecks, expenses, start, end
+
+
+def legacy_assign(periods, expenses):
+    """The nested loop previously used by main.budget"""
+    period_data = {p["id"]: {"expenses": {}, "total_expenses": 0} for p in periods}
+    for expense in expenses:
+        for period in periods:
+            if period["start_date"] <= expense.date <= period["end_date"]:
+                totals = period_data[period["id"]]
+                category = expense.category.lower()
+                if category not in totals["expenses"]:
+                    totals["expenses"][category] = 0
+                if not expense.paid:
+                    totals["expenses"][category] += float(expense.amount)
+                    totals["total_expenses"] += float(expense.amount)
+                break
+    return period_data
+
+
+def main():
+    print(f"{'weeks':>6} {'periods':>8} {'expenses':>9} {'legacy ms':>10} {'engine ms':>10} {'speedup':>8}")
+    for weeks in (4, 13, 26, 52, 104, 260):
+        paychecks, expenses, start, end = make_data(weeks)
+        periods = build_periods(paychecks, start, end)
+
+        # Sanity check: both paths must produce the same buckets, to the cent
+        _, period_data, _, _ = calculate_budget(
+            paychecks, expenses, start, end, category_names=CATEGORY_NAMES
+        )
+        legacy = legacy_assign(periods, expenses)
+        for period_id, totals in legacy.items():
+            assert {
+                category: round(amount, 2)
+                for category, amount in totals["expenses"].items()
+            } == period_data[period_id]["expenses"]
+
+        runs = 5
+        legacy_time = timeit.timeit(lambda: legacy_assign(periods, expenses), number=runs) / runs
+        engine_time = (
+            timeit.timeit(
+                lambda: calculate_budget(
+                    paychecks, expenses, start, end, category_names=CATEGORY_NAMES
+                ),
+                number=runs,
+            )
+            / runs
+        )
+        print(
+            f"{weeks:>6} {len(periods):>8} {len(expenses):>9} "
+            f"{legacy_time * 1000:>10.2f} {engine_time * 1000:>10.2f} "
+            f"{legacy_time / engine_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
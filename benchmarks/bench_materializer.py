@@ -0,0 +1,129 @@
+# benchmarks/bench_materializer.py
+"""Compare per-object ORM materialization with the bulk INSERT path.
+
+Runs against a throwaway in-memory SQLite database. From the project root:
+
+    python -m benchmarks.bench_materializer
+"""
+import time
+from datetime import date, timedelta
+
+from config import Config
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    WTF_CSRF_ENABLED = False
+
+
+FREQUENCIES = {
+    "daily": ("days", 1),
+    "weekly": ("weeks", 1),
+    "monthly": ("months", 1),
+}
+HORIZONS = (1, 5, 10)
+
+
+def legacy_materialize(expense, end_date):
+    """The previous implementation: query existing rows, add one object per date"""
+    from app import db
+    from app.models import Expense
+    from app.utils.expense_materializer import materialization_dates
+
+    existing_dates = {
+        instance.date
+        for instance in Expense.query.filter_by(
+            user_id=expense.user_id, parent_expense_id=expense.id
+        ).all()
+    }
+    existing_dates.add(expense.date)
+
+    created = 0
+    for occurrence_date in materialization_dates(expense, end_date):
+        if occurrence_date in existing_dates:
+            continue
+        db.session.add(
+            Expense(
+                date=occurrence_date,
+                parent_expense_id=expense.id,
+                category_id=expense.category_id,
+                description=expense.description,
+                amount=expense.amount,
+                paid=False,
+                recurring=False,
+                user_id=expense.user_id,
+            )
+        )
+        created += 1
+    db.session.flush()
+    return created
+
+
+def make_parent(user_id, frequency_type, frequency_value):
+    from app import db
+    from app.models import Expense, ExpenseCategory
+
+    category = ExpenseCategory(name="Bench", user_id=user_id)
+    db.session.add(category)
+    db.session.flush()
+
+    expense = Expense(
+        date=date.today(),
+        category_id=category.id,
+        description="Benchmark series",
+        amount=12.5,
+        recurring=True,
+        frequency_type=frequency_type,
+        frequency_value=frequency_value,
+        user_id=user_id,
+    )
+    db.session.add(expense)
+    db.session.flush()
+    return expense
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    from app import create_app, db
+    from app.models import User
+    from app.utils.expense_materializer import materialize_expense
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        user = User(username="bench", email="bench@example.com")
+        user.set_password("bench")
+        db.session.add(user)
+        db.session.commit()
+
+        print(f"{'series':>8} {'years':>6} {'rows':>7} {'legacy ms':>10} {'bulk ms':>10} {'speedup':>8}")
+        for name, (frequency_type, frequency_value) in FREQUENCIES.items():
+            for years in HORIZONS:
+                end_date = date.today() + timedelta(days=365 * years)
+
+                parent = make_parent(user.id, frequency_type, frequency_value)
+                legacy_rows, legacy_time = timed(
+                    lambda: legacy_materialize(parent, end_date)
+                )
+                db.session.rollback()
+
+                parent = make_parent(user.id, frequency_type, frequency_value)
+                bulk_rows, bulk_time = timed(
+                    lambda: materialize_expense(parent, end_date)
+                )
+                db.session.rollback()
+
+                assert legacy_rows == bulk_rows
+                print(
+                    f"{name:>8} {years:>6} {bulk_rows:>7} "
+                    f"{legacy_time * 1000:>10.1f} {bulk_time * 1000:>10.1f} "
+                    f"{legacy_time / bulk_time:>7.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
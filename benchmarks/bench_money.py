@@ -0,0 +1,302 @@
+# benchmarks/bench_money.py
+"""Check integer-cents totals against the float path they replaced.
+
+Seeds random expenses and paychecks, then computes the /expenses summary
+and the budget periods twice: with the integer-cents code in the app, and
+with plain float sums the way the views used to. Every total is compared
+with the exact decimal sum of the seeded amounts; the cents path must match
+it exactly, and the float path must stay within half a cent. Runs against
+a throwaway in-memory SQLite database. From the project root:
+
+    python -m benchmarks.bench_money
+
+With --check only the smallest size is run, once, and the script exits
+non-zero if any total disagrees; that takes a few seconds and is meant to
+run as a CI step:
+
+    python -m benchmarks.bench_money --check
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from config import Config
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    WTF_CSRF_ENABLED = False
+
+
+SIZES = (1000, 10000, 50000)
+REPEAT = 3
+CATEGORIES = 8
+
+# Largest difference from the exact total the float path is allowed
+HALF_CENT = 0.005
+
+
+def seed(user_id, size, start_date, rng):
+    """Insert random expenses and biweekly paychecks
+
+    Returns:
+        tuple: (expense rows, paycheck rows) as inserted, with dollar amounts
+    """
+    from sqlalchemy import insert
+
+    from app import db
+    from app.models import Expense, ExpenseCategory, Paycheck
+
+    categories = [
+        ExpenseCategory(name=f"Category {i}", user_id=user_id)
+        for i in range(CATEGORIES)
+    ]
+    db.session.add_all(categories)
+    db.session.flush()
+
+    expenses = []
+    for i in range(size):
+        cents = rng.randrange(1, 200000)
+        expenses.append(
+            {
+                "date": start_date + timedelta(days=rng.randrange(365)),
+                "due_date": start_date + timedelta(days=rng.randrange(365)),
+                "category_id": categories[i % CATEGORIES].id,
+                "description": f"Expense {i}",
+                # The dollar float a form or the API would hand over
+                "amount": cents / 100,
+                "paid": rng.random() < 0.3,
+                "recurring": False,
+                "user_id": user_id,
+            }
+        )
+    db.session.execute(insert(Expense), expenses)
+
+    paychecks = []
+    for i in range(26):
+        net_cents = rng.randrange(150000, 350000)
+        paychecks.append(
+            {
+                "date": start_date + timedelta(days=14 * i),
+                "pay_type": "Regular",
+                "gross_amount": 4000,
+                "taxable_amount": 4000,
+                "non_taxable_amount": 0,
+                "net_amount": net_cents / 100,
+                "user_id": user_id,
+            }
+        )
+    db.session.execute(insert(Paycheck), paychecks)
+    db.session.commit()
+    return expenses, paychecks
+
+
+def exact(amount):
+    return Decimal(str(amount))
+
+
+def cents_summary(user_id, today):
+    from app.utils.read_model import expense_statement, expense_summary
+
+    return expense_summary(expense_statement(user_id), today=today)
+
+
+def float_summary(user_id, today):
+    """Sum each row's float amount in Python, as /expenses used to"""
+    from app.utils.read_model import expense_rows
+
+    summary = {"total_amount": 0.0, "unpaid_amount": 0.0, "overdue_amount": 0.0}
+    for expense in expense_rows(user_id):
+        summary["total_amount"] += expense.amount
+        if not expense.paid:
+            summary["unpaid_amount"] += expense.amount
+            if expense.due_date and expense.due_date < today:
+                summary["overdue_amount"] += expense.amount
+    return summary
+
+
+def exact_summary(expenses, today):
+    summary = {name: Decimal(0) for name in ("total_amount", "unpaid_amount", "overdue_amount")}
+    for expense in expenses:
+        amount = exact(expense["amount"])
+        summary["total_amount"] += amount
+        if not expense["paid"]:
+            summary["unpaid_amount"] += amount
+            if expense["due_date"] < today:
+                summary["overdue_amount"] += amount
+    return summary
+
+
+def cents_budget(user_id, start_date, end_date):
+    from app.utils.budget_engine import calculate_budget_from_rollups
+    from app.utils.read_model import paycheck_rows, rollup_rows
+
+    _, period_data, _, _ = calculate_budget_from_rollups(
+        paycheck_rows(user_id, start_date, end_date),
+        rollup_rows(user_id, start_date, end_date),
+        start_date,
+        end_date,
+    )
+    return {
+        period_id: (totals["income"]["total"], totals["total_expenses"], totals["endingBalance"])
+        for period_id, totals in period_data.items()
+    }
+
+
+def float_budget(user_id, start_date, end_date):
+    """Bucket rows into periods summing floats, as the budget engine used to"""
+    from app.utils.budget_engine import build_periods, locate_period
+    from app.utils.read_model import expense_rows, paycheck_rows
+
+    paychecks = paycheck_rows(user_id, start_date, end_date)
+    periods = build_periods(paychecks, start_date, end_date)
+    period_ends = [period["end_date"] for period in periods]
+    totals = {period["id"]: [0.0, 0.0] for period in periods}
+
+    for period in periods:
+        for paycheck in period["paychecks"]:
+            totals[period["id"]][0] += float(paycheck.net_amount)
+    for expense in expense_rows(user_id, start_date, end_date):
+        index = locate_period(period_ends, periods, expense.date)
+        if index is not None and not expense.paid:
+            totals[periods[index]["id"]][1] += float(expense.amount)
+
+    balance = 0.0
+    budget = {}
+    for period in periods:
+        income, spent = totals[period["id"]]
+        balance += income - spent
+        budget[period["id"]] = (income, spent, balance)
+    return budget
+
+
+def exact_budget(expenses, paychecks, user_id, start_date, end_date):
+    from app.utils.budget_engine import build_periods, locate_period
+    from app.utils.read_model import paycheck_rows
+
+    periods = build_periods(paycheck_rows(user_id, start_date, end_date), start_date, end_date)
+    period_ends = [period["end_date"] for period in periods]
+    totals = {period["id"]: [Decimal(0), Decimal(0)] for period in periods}
+
+    for paycheck in paychecks:
+        index = locate_period(period_ends, periods, paycheck["date"])
+        totals[periods[index]["id"]][0] += exact(paycheck["net_amount"])
+    for expense in expenses:
+        index = locate_period(period_ends, periods, expense["date"])
+        if index is not None and not expense["paid"]:
+            totals[periods[index]["id"]][1] += exact(expense["amount"])
+
+    balance = Decimal(0)
+    budget = {}
+    for period in periods:
+        income, spent = totals[period["id"]]
+        balance += income - spent
+        budget[period["id"]] = (income, spent, balance)
+    return budget
+
+
+def compare(got, expected):
+    """Largest difference between matching values, and whether all are exact
+
+    Returns:
+        tuple: (max absolute difference, every value equal to the cent)
+    """
+    worst = 0.0
+    exact_match = True
+    for key, values in expected.items():
+        got_values = got[key] if isinstance(values, tuple) else (got[key],)
+        expected_values = values if isinstance(values, tuple) else (values,)
+        for value, expected_value in zip(got_values, expected_values):
+            difference = abs(Decimal(repr(value)) - expected_value)
+            worst = max(worst, float(difference))
+            exact_match &= difference == 0
+    return worst, exact_match
+
+
+def timed(fn, repeat=REPEAT):
+    """Best wall time over repeat runs"""
+    from app import db
+
+    best = float("inf")
+    for _ in range(repeat):
+        db.session.remove()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only run the smallest size once and exit non-zero on a mismatch",
+    )
+    args = parser.parse_args(argv)
+    sizes = SIZES[:1] if args.check else SIZES
+    repeat = 1 if args.check else REPEAT
+
+    from app import create_app, db
+    from app.models import User
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        rng = random.Random(25)
+        start_date = date(2026, 1, 1)
+        end_date = start_date + timedelta(days=364)
+        today = start_date + timedelta(days=180)
+
+        print(
+            f"{'rows':>7} {'check':>8} {'float ms':>9} {'cents ms':>9} "
+            f"{'float err':>10} {'cents err':>10}"
+        )
+        failures = []
+        for size in sizes:
+            user = User(username=f"bench{size}", email=f"bench{size}@example.com")
+            user.set_password("bench")
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+            expenses, paychecks = seed(user_id, size, start_date, rng)
+
+            checks = (
+                (
+                    "summary",
+                    lambda: float_summary(user_id, today),
+                    lambda: cents_summary(user_id, today),
+                    exact_summary(expenses, today),
+                ),
+                (
+                    "budget",
+                    lambda: float_budget(user_id, start_date, end_date),
+                    lambda: cents_budget(user_id, start_date, end_date),
+                    exact_budget(expenses, paychecks, user_id, start_date, end_date),
+                ),
+            )
+            for name, float_path, cents_path, expected in checks:
+                float_result, float_time = timed(float_path, repeat)
+                cents_result, cents_time = timed(cents_path, repeat)
+
+                float_error, _ = compare(float_result, expected)
+                cents_error, cents_exact = compare(cents_result, expected)
+                if not cents_exact:
+                    failures.append(f"{size} {name}: cents path is off by {cents_error}")
+                if float_error >= HALF_CENT:
+                    failures.append(f"{size} {name}: float path is off by {float_error}")
+
+                print(
+                    f"{size:>7} {name:>8} {float_time * 1000:>9.1f} "
+                    f"{cents_time * 1000:>9.1f} {float_error:>10.2e} {cents_error:>10.2e}"
+                )
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# benchmarks/bench_paycheck_schedule.py
+"""Compare the step-by-step paycheck schedule with the arithmetic one.
+
+The schedule is anchored at the end of the range so the legacy loop has to
+build the whole range backwards. From the project root:
+
+    python -m benchmarks.bench_paycheck_schedule
+"""
+import time
+from datetime import date, timedelta
+
+from app.utils.paycheck_generator import (
+    LAST_BUSINESS_DAY,
+    MONTHLY,
+    SEMI_MONTHLY,
+    generate_paycheck_dates,
+)
+
+SPANS = (10, 30, 50)
+DAY_FREQUENCIES = (7, 14)
+NAMED_SCHEDULES = (SEMI_MONTHLY, MONTHLY, LAST_BUSINESS_DAY)
+REPEAT = 5
+
+
+def legacy_paycheck_dates(start_date, end_date, first_paycheck_date, frequency=14):
+    """The previous implementation: step one period at a time, insert(0) backwards"""
+    paycheck_dates = []
+    current_date = first_paycheck_date
+
+    if first_paycheck_date > start_date:
+        backwards_date = first_paycheck_date
+        while True:
+            backwards_date = backwards_date - timedelta(days=frequency)
+            if backwards_date < start_date:
+                break
+            paycheck_dates.insert(0, backwards_date)
+
+    while current_date <= end_date:
+        if current_date >= start_date:
+            paycheck_dates.append(current_date)
+        current_date = current_date + timedelta(days=frequency)
+
+    return paycheck_dates
+
+
+def timed(fn):
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    print(f"{'schedule':>18} {'years':>6} {'dates':>7} {'legacy ms':>10} {'new ms':>8} {'speedup':>8}")
+    for years in SPANS:
+        start_date = date(2000, 1, 1)
+        end_date = start_date + timedelta(days=365 * years)
+
+        for frequency in DAY_FREQUENCIES:
+            legacy, legacy_time = timed(
+                lambda: legacy_paycheck_dates(start_date, end_date, end_date, frequency)
+            )
+            new, new_time = timed(
+                lambda: generate_paycheck_dates(start_date, end_date, end_date, frequency)
+            )
+            assert legacy == new
+            print(
+                f"{str(frequency) + ' days':>18} {years:>6} {len(new):>7} "
+                f"{legacy_time * 1000:>10.2f} {new_time * 1000:>8.2f} "
+                f"{legacy_time / new_time:>7.1f}x"
+            )
+
+        for schedule in NAMED_SCHEDULES:
+            dates, new_time = timed(
+                lambda: generate_paycheck_dates(start_date, end_date, end_date, schedule)
+            )
+            assert dates == sorted(set(dates))
+            print(
+                f"{schedule:>18} {years:>6} {len(dates):>7} {'-':>10} "
+                f"{new_time * 1000:>8.2f} {'-':>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
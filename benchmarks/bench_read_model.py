@@ -0,0 +1,186 @@
+# benchmarks/bench_read_model.py
+"""Compare ORM entity loading with the column-tuple read model.
+
+Measures what the budget view does per request: load a year of paychecks
+and expenses and serialize them for JSON. Runs against a throwaway
+in-memory SQLite database. From the project root:
+
+    python -m benchmarks.bench_read_model
+"""
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from config import Config
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    WTF_CSRF_ENABLED = False
+
+
+SIZES = (1000, 10000, 50000)
+REPEAT = 5
+
+
+def legacy_request(user_id, start_date, end_date):
+    """Hydrate entities and serialize them, like the views used to"""
+    from app.models import Expense, Paycheck
+
+    paychecks = (
+        Paycheck.query.filter_by(user_id=user_id)
+        .filter(Paycheck.date >= start_date, Paycheck.date <= end_date)
+        .order_by(Paycheck.date)
+        .all()
+    )
+    expenses = (
+        Expense.query.filter_by(user_id=user_id)
+        .filter(Expense.date >= start_date, Expense.date <= end_date)
+        .order_by(Expense.date)
+        .all()
+    )
+    return [
+        {
+            "id": paycheck.id,
+            "date": paycheck.date.strftime("%Y-%m-%d"),
+            "pay_type": paycheck.pay_type,
+            "gross_amount": float(paycheck.gross_amount),
+            "net_amount": float(paycheck.net_amount),
+        }
+        for paycheck in paychecks
+    ] + [
+        {
+            "id": expense.id,
+            "date": expense.date.strftime("%Y-%m-%d"),
+            "description": expense.description,
+            "category": expense.category,
+            "amount": float(expense.amount),
+            "paid": expense.paid,
+            "recurring": expense.recurring,
+            "parent_expense_id": expense.parent_expense_id,
+        }
+        for expense in expenses
+    ]
+
+
+def read_model_request(user_id, start_date, end_date):
+    from app.utils.read_model import (
+        expense_rows,
+        paycheck_rows,
+        serialize_budget_expense,
+        serialize_budget_paycheck,
+    )
+
+    return [
+        serialize_budget_paycheck(paycheck)
+        for paycheck in paycheck_rows(user_id, start_date, end_date)
+    ] + [
+        serialize_budget_expense(expense)
+        for expense in expense_rows(user_id, start_date, end_date)
+    ]
+
+
+def measure(fn):
+    """Best wall time over REPEAT runs, and peak traced memory of one run"""
+    from app import db
+
+    best = float("inf")
+    for _ in range(REPEAT):
+        # Start each request with an empty identity map, as a new request would
+        db.session.remove()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+
+    db.session.remove()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.session.remove()
+    return result, best, peak
+
+
+def seed(user_id, size, start_date):
+    from sqlalchemy import insert
+
+    from app import db
+    from app.models import Expense, ExpenseCategory, Paycheck
+
+    categories = [
+        ExpenseCategory(name=f"Category {i}", user_id=user_id) for i in range(12)
+    ]
+    db.session.add_all(categories)
+    db.session.flush()
+
+    db.session.execute(
+        insert(Expense),
+        [
+            {
+                "date": start_date + timedelta(days=i % 365),
+                "category_id": categories[i % 12].id,
+                "description": f"Expense {i}",
+                "amount": 5 + i % 200,
+                "paid": i % 3 == 0,
+                "recurring": False,
+                "user_id": user_id,
+            }
+            for i in range(size)
+        ],
+    )
+    db.session.execute(
+        insert(Paycheck),
+        [
+            {
+                "date": start_date + timedelta(days=14 * i),
+                "pay_type": "Regular",
+                "gross_amount": 3000,
+                "taxable_amount": 3000,
+                "non_taxable_amount": 0,
+                "net_amount": 2300,
+                "user_id": user_id,
+            }
+            for i in range(26)
+        ],
+    )
+    db.session.commit()
+
+
+def main():
+    from app import create_app, db
+    from app.models import User
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        start_date = date(2026, 1, 1)
+        end_date = start_date + timedelta(days=364)
+
+        print(
+            f"{'rows':>7} {'orm ms':>8} {'rows ms':>8} {'speedup':>8} "
+            f"{'orm KiB':>9} {'rows KiB':>9}"
+        )
+        for size in SIZES:
+            user = User(username=f"bench{size}", email=f"bench{size}@example.com")
+            user.set_password("bench")
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+            seed(user_id, size, start_date)
+
+            legacy, legacy_time, legacy_peak = measure(
+                lambda: legacy_request(user_id, start_date, end_date)
+            )
+            rows, rows_time, rows_peak = measure(
+                lambda: read_model_request(user_id, start_date, end_date)
+            )
+
+            assert legacy == rows
+            print(
+                f"{size:>7} {legacy_time * 1000:>8.1f} {rows_time * 1000:>8.1f} "
+                f"{legacy_time / rows_time:>7.1f}x "
+                f"{legacy_peak / 1024:>9.0f} {rows_peak / 1024:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/bench_tax.py
+"""Compare the per-object tax loop with the compiled batch API.
+
+Pure Python, no database needed. From the project root:
+
+    python -m benchmarks.bench_tax
+"""
+import random
+import time
+
+from app.utils.tax import TAX_BRACKETS, paycheck_nets, paycheck_tax
+
+SIZES = (1000, 10000, 100000)
+YEAR = 2026
+PERIODS = 26
+
+
+def legacy_net(gross, taxable, year):
+    """Walk every bracket for every paycheck, like Paycheck.calculate_net used to"""
+    brackets = TAX_BRACKETS[year]
+    annual = taxable * PERIODS
+    tax = 0.0
+    for i, (lower, rate) in enumerate(brackets):
+        upper = brackets[i + 1][0] if i + 1 < len(brackets) else float("inf")
+        if annual > lower:
+            tax += (min(annual, upper) - lower) * rate
+    return gross - tax / PERIODS
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    random.seed(14)
+    print(f"{'paychecks':>10} {'loop ms':>9} {'scalar ms':>10} {'batch ms':>9} {'speedup':>8}")
+    for size in SIZES:
+        grosses = [random.uniform(500, 20000) for _ in range(size)]
+
+        legacy, legacy_time = timed(
+            lambda: [legacy_net(gross, gross, YEAR) for gross in grosses]
+        )
+        scalar, scalar_time = timed(
+            lambda: [gross - paycheck_tax(gross, YEAR, PERIODS) for gross in grosses]
+        )
+        batch, batch_time = timed(lambda: paycheck_nets(grosses, grosses, YEAR, PERIODS))
+
+        assert all(abs(a - b) < 1e-6 for a, b in zip(legacy, batch))
+        assert all(abs(a - b) < 1e-6 for a, b in zip(scalar, batch))
+        print(
+            f"{size:>10} {legacy_time * 1000:>9.1f} {scalar_time * 1000:>10.1f} "
+            f"{batch_time * 1000:>9.1f} {legacy_time / batch_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,13 @@ class Config:
     ) or "sqlite:///" + os.path.join(BASE_DIR, "finance.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # How recurring expenses are stored: "materialized" writes a row per
+    # occurrence, "series" keeps only the rule plus per-occurrence overrides
+    # and expands occurrences when they are read
+    RECURRING_EXPENSE_STORAGE = (
+        os.environ.get("RECURRING_EXPENSE_STORAGE") or "materialized"
+    )
+
     # Enhanced Security Settings
     SECRET_KEY = os.environ.get("SECRET_KEY") or os.urandom(24)
     WTF_CSRF_ENABLED = True
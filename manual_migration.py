@@ -8,6 +8,44 @@ sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 from app import create_app, db
 from sqlalchemy import text
 
+# Rows updated per transaction when backfilling a column
+BACKFILL_BATCH = 5000
+
+# Float dollar columns converted to integer cents, as (table, column, nullable)
+MONEY_COLUMNS = (
+    ("paycheck", "gross_amount", False),
+    ("paycheck", "taxable_amount", False),
+    ("paycheck", "non_taxable_amount", False),
+    ("paycheck", "net_amount", False),
+    ("expense", "amount", False),
+    ("expense_override", "amount", True),
+)
+
+
+def update_in_batches(table, statement, batch_size=BACKFILL_BATCH):
+    """Run an UPDATE over a table in id ranges, committing each range
+
+    Keeps a large table from being held in one long write transaction.
+    The statement must limit itself with "id BETWEEN :first AND :last".
+
+    Returns:
+        int: Number of rows updated
+    """
+    first_id, last_id = db.session.execute(
+        text(f"SELECT MIN(id), MAX(id) FROM {table}")
+    ).fetchone()
+    if first_id is None:
+        return 0
+
+    updated = 0
+    for batch_start in range(first_id, last_id + 1, batch_size):
+        updated += db.session.execute(
+            text(statement),
+            {"first": batch_start, "last": batch_start + batch_size - 1},
+        ).rowcount
+        db.session.commit()
+    return updated
+
 
 def run_migration():
     print("Starting manual database migration...")
@@ -74,6 +112,330 @@ def run_migration():
                 )
             )
 
+        if "materialized_through" not in columns:
+            print("Adding materialized_through column to expense table...")
+            db.session.execute(
+                text("ALTER TABLE expense ADD COLUMN materialized_through DATE")
+            )
+
+            # Start each series' watermark at its latest materialized instance
+            print("Initializing materialized_through from existing instances...")
+            db.session.execute(
+                text(
+                    """
+            UPDATE expense
+            SET materialized_through = (
+                SELECT MAX(child.date) FROM expense AS child
+                WHERE child.parent_expense_id = expense.id
+            )
+            WHERE recurring = 1 AND parent_expense_id IS NULL
+            """
+                )
+            )
+
+        # Enforce one materialized instance per parent and date so bulk
+        # materialization can rely on ON CONFLICT DO NOTHING
+        result = db.session.execute(
+            text(
+                "SELECT name FROM sqlite_master WHERE type='index' AND name='uq_expense_parent_date'"
+            )
+        )
+        if not result.fetchone():
+            print("Removing duplicate materialized expense instances...")
+            removed = db.session.execute(
+                text(
+                    """
+            DELETE FROM expense
+            WHERE parent_expense_id IS NOT NULL
+              AND id NOT IN (
+                SELECT MIN(id) FROM expense
+                WHERE parent_expense_id IS NOT NULL
+                GROUP BY parent_expense_id, date
+              )
+            """
+                )
+            ).rowcount
+            print(f"Removed {removed} duplicate instances.")
+
+            print("Adding unique index on expense (parent_expense_id, date)...")
+            db.session.execute(
+                text(
+                    "CREATE UNIQUE INDEX uq_expense_parent_date ON expense (parent_expense_id, date)"
+                )
+            )
+
+        # Content hashes let statement imports skip rows already imported
+        for table in ("expense", "paycheck"):
+            result = db.session.execute(text(f"PRAGMA table_info({table})"))
+            if "import_hash" not in {row[1] for row in result.fetchall()}:
+                print(f"Adding import_hash column to {table} table...")
+                db.session.execute(
+                    text(f"ALTER TABLE {table} ADD COLUMN import_hash VARCHAR(64)")
+                )
+
+            index_name = f"uq_{table}_user_import_hash"
+            result = db.session.execute(
+                text(
+                    f"SELECT name FROM sqlite_master WHERE type='index' AND name='{index_name}'"
+                )
+            )
+            if not result.fetchone():
+                print(f"Adding unique index on {table} (user_id, import_hash)...")
+                db.session.execute(
+                    text(
+                        f"CREATE UNIQUE INDEX {index_name} ON {table} (user_id, import_hash)"
+                    )
+                )
+
+        # Synced rows report updated_at, which older paycheck and category
+        # rows never had; start them at their creation time
+        for table in ("paycheck", "expense_category"):
+            result = db.session.execute(text(f"PRAGMA table_info({table})"))
+            if "updated_at" not in {row[1] for row in result.fetchall()}:
+                print(f"Adding updated_at column to {table} table...")
+                db.session.execute(
+                    text(f"ALTER TABLE {table} ADD COLUMN updated_at DATETIME")
+                )
+                db.session.execute(
+                    text(
+                        f"UPDATE {table} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)"
+                    )
+                )
+
+        # Delta sync now reads sync_version (added below) instead of updated_at
+        for table in ("paycheck", "expense"):
+            db.session.execute(text(f"DROP INDEX IF EXISTS ix_{table}_user_updated_at"))
+
+        result = db.session.execute(
+            text(
+                "SELECT name FROM sqlite_master WHERE type='index' AND name='ix_expense_user_date_id'"
+            )
+        )
+        if not result.fetchone():
+            print("Adding index on expense (user_id, date, id)...")
+            db.session.execute(
+                text("CREATE INDEX ix_expense_user_date_id ON expense (user_id, date, id)")
+            )
+
+        # The tombstone table for deleted rows is created by db.create_all()
+
+        # Category names are unique per user rather than across all users;
+        # SQLite can only drop the old global UNIQUE (name) by rebuilding
+        result = db.session.execute(
+            text(
+                "SELECT name FROM sqlite_master WHERE type='index' "
+                "AND tbl_name='expense_category' AND name LIKE 'sqlite_autoindex_%'"
+            )
+        )
+        if result.fetchone():
+            print("Removing the global unique constraint on category names...")
+            db.session.execute(
+                text(
+                    """
+            CREATE TABLE expense_category_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name VARCHAR(50) NOT NULL,
+                description VARCHAR(200),
+                color VARCHAR(7) DEFAULT '#6B7280',
+                user_id INTEGER NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME,
+                FOREIGN KEY (user_id) REFERENCES user (id)
+            )
+            """
+                )
+            )
+            db.session.execute(
+                text(
+                    """
+            INSERT INTO expense_category_new
+                (id, name, description, color, user_id, created_at, updated_at)
+            SELECT id, name, description, color, user_id, created_at, updated_at
+            FROM expense_category
+            """
+                )
+            )
+            db.session.execute(text("DROP TABLE expense_category"))
+            db.session.execute(
+                text("ALTER TABLE expense_category_new RENAME TO expense_category")
+            )
+
+        # Expenses now reference their category by id only: link every
+        # expense to a category of its owner, then drop the name column
+        result = db.session.execute(text("PRAGMA table_info(expense)"))
+        if "category" in {row[1] for row in result.fetchall()}:
+            # The old search index and its triggers read expense.category
+            from app.utils.expense_search import drop_search_index
+
+            drop_search_index(db.session.connection())
+
+            print("Creating categories for uncategorized expense names...")
+            created = db.session.execute(
+                text(
+                    """
+            INSERT INTO expense_category (name, color, user_id, created_at, updated_at)
+            SELECT MIN(e.category), '#6B7280', e.user_id,
+                   CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+            FROM expense AS e
+            WHERE NOT EXISTS (
+                SELECT 1 FROM expense_category AS c
+                WHERE c.id = e.category_id AND c.user_id = e.user_id
+            )
+              AND NOT EXISTS (
+                SELECT 1 FROM expense_category AS c
+                WHERE c.user_id = e.user_id AND lower(c.name) = lower(e.category)
+            )
+            GROUP BY e.user_id, lower(e.category)
+            """
+                )
+            ).rowcount
+            print(f"Created {created} categories.")
+
+            print("Linking expenses to their categories...")
+            linked = update_in_batches(
+                "expense",
+                """
+            UPDATE expense
+            SET category_id = (
+                SELECT MIN(c.id) FROM expense_category AS c
+                WHERE c.user_id = expense.user_id
+                  AND lower(c.name) = lower(expense.category)
+            )
+            WHERE id BETWEEN :first AND :last
+              AND NOT EXISTS (
+                SELECT 1 FROM expense_category AS c
+                WHERE c.id = expense.category_id AND c.user_id = expense.user_id
+            )
+            """,
+            )
+            print(f"Linked {linked} expenses.")
+
+            unlinked = db.session.execute(
+                text("SELECT COUNT(*) FROM expense WHERE category_id IS NULL")
+            ).scalar()
+            if unlinked:
+                raise RuntimeError(f"{unlinked} expenses could not be linked to a category")
+
+            print("Dropping the category column from expense table...")
+            db.session.execute(text("ALTER TABLE expense DROP COLUMN category"))
+
+        result = db.session.execute(
+            text(
+                "SELECT name FROM sqlite_master WHERE type='index' AND name='ix_expense_user_category'"
+            )
+        )
+        if not result.fetchone():
+            print("Adding index on expense (user_id, category_id)...")
+            db.session.execute(
+                text(
+                    "CREATE INDEX ix_expense_user_category ON expense (user_id, category_id)"
+                )
+            )
+
+        # Amounts are stored as integer cents. SQLite cannot change a
+        # column's type, so each float column is copied into a new INTEGER
+        # column in batches, then swapped in under the old name
+        for table, column, nullable in MONEY_COLUMNS:
+            result = db.session.execute(text(f"PRAGMA table_info({table})"))
+            column_types = {row[1]: row[2].upper() for row in result.fetchall()}
+            if column not in column_types or column_types[column] == "INTEGER":
+                continue
+
+            print(f"Converting {table}.{column} to integer cents...")
+            if f"{column}_cents" not in column_types:
+                constraint = "" if nullable else " NOT NULL DEFAULT 0"
+                db.session.execute(
+                    text(
+                        f"ALTER TABLE {table} ADD COLUMN {column}_cents INTEGER{constraint}"
+                    )
+                )
+            converted = update_in_batches(
+                table,
+                f"""
+            UPDATE {table}
+            SET {column}_cents = CAST(ROUND({column} * 100) AS INTEGER)
+            WHERE id BETWEEN :first AND :last
+            """,
+            )
+            db.session.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+            db.session.execute(
+                text(f"ALTER TABLE {table} RENAME COLUMN {column}_cents TO {column}")
+            )
+            print(f"Converted {converted} rows.")
+
+        # Rollups are derived, so a table still holding float totals is
+        # recreated with integer cents columns rather than converted
+        result = db.session.execute(text("PRAGMA table_info(budget_rollup)"))
+        rollup_types = {row[1]: row[2].upper() for row in result.fetchall()}
+        if rollup_types.get("income_total", "INTEGER") != "INTEGER":
+            print("Recreating budget_rollup table with integer cents...")
+            from app.models import BudgetRollup
+
+            BudgetRollup.__table__.drop(db.session.connection())
+            BudgetRollup.__table__.create(db.session.connection())
+
+        # Full-text search index over expenses, kept current by triggers
+        print("Rebuilding expense search index...")
+        from app.utils.expense_search import create_search_index, rebuild_search_index
+
+        create_search_index(db.session.connection())
+        indexed = rebuild_search_index(db.session.connection())
+        print(f"Indexed {indexed} expenses.")
+
+        # The budget_rollup table itself is created by db.create_all(); fill it
+        # from the existing expenses and paychecks
+        print("Rebuilding budget rollups...")
+        from app.models import User
+        from app.utils.budget_rollup import rebuild_rollups
+
+        user_ids = [row.id for row in db.session.query(User.id).all()]
+        written = rebuild_rollups(db.session.connection(), user_ids)
+        print(f"Wrote {written} rollup rows.")
+
+        # Delta sync resumes from the change version of the last commit it
+        # saw. Added after the table rebuilds above so it isn't dropped with
+        # them; existing rows all start at version 1. The change_sequence
+        # table itself is created by db.create_all()
+        from app.utils.change_tracking import create_sync_triggers
+
+        for table in ("paycheck", "expense", "expense_category"):
+            result = db.session.execute(text(f"PRAGMA table_info({table})"))
+            if "sync_version" not in {row[1] for row in result.fetchall()}:
+                print(f"Adding sync_version column to {table} table...")
+                db.session.execute(
+                    text(f"ALTER TABLE {table} ADD COLUMN sync_version INTEGER")
+                )
+
+            for index_name, definition in (
+                (f"ix_{table}_user_sync_version", "(user_id, sync_version)"),
+                (f"ix_{table}_sync_pending", "(id) WHERE sync_version IS NULL"),
+            ):
+                result = db.session.execute(
+                    text(
+                        f"SELECT name FROM sqlite_master WHERE type='index' AND name='{index_name}'"
+                    )
+                )
+                if not result.fetchone():
+                    print(f"Adding index {index_name}...")
+                    db.session.execute(
+                        text(f"CREATE INDEX {index_name} ON {table} {definition}")
+                    )
+
+        create_sync_triggers(db.session.connection())
+        result = db.session.execute(text("SELECT value FROM change_sequence"))
+        if result.fetchone() is None:
+            db.session.execute(text("INSERT INTO change_sequence (value) VALUES (1)"))
+        db.session.commit()
+
+        for table in ("paycheck", "expense", "expense_category"):
+            stamped = update_in_batches(
+                table,
+                f"UPDATE {table} SET sync_version = 1 "
+                "WHERE sync_version IS NULL AND id BETWEEN :first AND :last",
+            )
+            if stamped:
+                print(f"Set the sync version of {stamped} {table} rows.")
+
         # Commit the transaction
         db.session.commit()
         print("Migration completed successfully!")